@@ -0,0 +1,70 @@
+"""Add geo_cell columns to organizations and buildings
+
+Revision ID: 3b9f1c2a7d41
+Revises: 
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from geo import grid_cell
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9f1c2a7d41'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+GEO_TABLES = ('organizations', 'buildings')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    for table_name in GEO_TABLES:
+        # Таблицы, созданные через create_all, уже содержат колонку
+        columns = {column['name'] for column in inspector.get_columns(table_name)}
+        if 'geo_cell' not in columns:
+            with op.batch_alter_table(table_name) as batch_op:
+                batch_op.add_column(sa.Column('geo_cell', sa.Integer(), nullable=True))
+                batch_op.create_index(f'ix_{table_name}_geo_cell', ['geo_cell'])
+
+        # Заполняем ячейки сетки для существующих записей
+        table = sa.table(
+            table_name,
+            sa.column('id', sa.Integer),
+            sa.column('latitude', sa.Float),
+            sa.column('longitude', sa.Float),
+            sa.column('geo_cell', sa.Integer),
+        )
+        rows = bind.execute(
+            sa.select(table.c.id, table.c.latitude, table.c.longitude)
+            .where(table.c.geo_cell.is_(None))
+        ).all()
+        updates = [
+            {'row_id': row_id, 'geo_cell': grid_cell(latitude, longitude)}
+            for row_id, latitude, longitude in rows
+            if latitude is not None and longitude is not None
+        ]
+        if updates:
+            bind.execute(
+                table.update()
+                .where(table.c.id == sa.bindparam('row_id'))
+                .values(geo_cell=sa.bindparam('geo_cell')),
+                updates
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table_name in GEO_TABLES:
+        with op.batch_alter_table(table_name) as batch_op:
+            batch_op.drop_index(f'ix_{table_name}_geo_cell')
+            batch_op.drop_column('geo_cell')
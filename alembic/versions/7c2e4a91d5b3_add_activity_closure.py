@@ -0,0 +1,65 @@
+"""Add activity_closure table for the activity hierarchy
+
+Revision ID: 7c2e4a91d5b3
+Revises: 3b9f1c2a7d41
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2e4a91d5b3'
+down_revision: Union[str, Sequence[str], None] = '3b9f1c2a7d41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    # Таблица, созданная через create_all, уже существует
+    if not inspector.has_table('activity_closure'):
+        op.create_table(
+            'activity_closure',
+            sa.Column('ancestor_id', sa.Integer(), sa.ForeignKey('activities.id'), primary_key=True),
+            sa.Column('descendant_id', sa.Integer(), sa.ForeignKey('activities.id'), primary_key=True),
+            sa.Column('depth', sa.Integer(), nullable=False),
+        )
+        op.create_index('ix_activity_closure_descendant_id', 'activity_closure', ['descendant_id'])
+        op.create_index('ix_activity_closure_ancestor_depth', 'activity_closure', ['ancestor_id', 'depth'])
+
+    # Заполняем замыкание по текущим значениям parent_id
+    activities = sa.table('activities', sa.column('id', sa.Integer), sa.column('parent_id', sa.Integer))
+    closure = sa.table(
+        'activity_closure',
+        sa.column('ancestor_id', sa.Integer),
+        sa.column('descendant_id', sa.Integer),
+        sa.column('depth', sa.Integer),
+    )
+    parents = dict(bind.execute(sa.select(activities.c.id, activities.c.parent_id)).all())
+
+    rows = []
+    for activity_id in parents:
+        ancestor_id, depth, visited = activity_id, 0, set()
+        # visited защищает от циклов в некорректных данных
+        while ancestor_id is not None and ancestor_id not in visited:
+            visited.add(ancestor_id)
+            rows.append({'ancestor_id': ancestor_id, 'descendant_id': activity_id, 'depth': depth})
+            ancestor_id, depth = parents.get(ancestor_id), depth + 1
+
+    bind.execute(sa.delete(closure))
+    if rows:
+        bind.execute(closure.insert(), rows)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_activity_closure_ancestor_depth', table_name='activity_closure')
+    op.drop_index('ix_activity_closure_descendant_id', table_name='activity_closure')
+    op.drop_table('activity_closure')
@@ -0,0 +1,44 @@
+"""Add full-text search index for organizations
+
+Revision ID: 9d4f2b6e8a15
+Revises: 7c2e4a91d5b3
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from models import ORGANIZATION_SEARCH_TABLE, POSTGRES_SEARCH_DDL, SQLITE_SEARCH_DDL
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4f2b6e8a15'
+down_revision: Union[str, Sequence[str], None] = '7c2e4a91d5b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Все выражения идемпотентны (IF NOT EXISTS), индекс SQLite перестраивается по текущим данным
+    dialect_name = op.get_bind().dialect.name
+    if dialect_name == 'sqlite':
+        statements = SQLITE_SEARCH_DDL
+    elif dialect_name == 'postgresql':
+        statements = POSTGRES_SEARCH_DDL
+    else:
+        statements = []
+    for statement in statements:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect_name = op.get_bind().dialect.name
+    if dialect_name == 'sqlite':
+        for trigger in ('insert', 'update', 'delete'):
+            op.execute(f'DROP TRIGGER IF EXISTS organizations_search_{trigger}')
+        op.execute(f'DROP TABLE IF EXISTS {ORGANIZATION_SEARCH_TABLE}')
+    elif dialect_name == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_organizations_search')
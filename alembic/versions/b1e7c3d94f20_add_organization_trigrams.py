@@ -0,0 +1,58 @@
+"""Add organization_trigrams table for fuzzy name search
+
+Revision ID: b1e7c3d94f20
+Revises: 9d4f2b6e8a15
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from text_search import name_trigrams
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b1e7c3d94f20'
+down_revision: Union[str, Sequence[str], None] = '9d4f2b6e8a15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    # Таблица, созданная через create_all, уже существует
+    if not inspector.has_table('organization_trigrams'):
+        op.create_table(
+            'organization_trigrams',
+            sa.Column('trigram', sa.String(3), primary_key=True),
+            sa.Column('organization_id', sa.Integer(), sa.ForeignKey('organizations.id'), primary_key=True),
+        )
+        op.create_index('ix_organization_trigrams_organization_id', 'organization_trigrams', ['organization_id'])
+
+    # Заполняем индекс триграмм по текущим названиям
+    organizations = sa.table('organizations', sa.column('id', sa.Integer), sa.column('name', sa.String))
+    trigrams = sa.table(
+        'organization_trigrams',
+        sa.column('trigram', sa.String),
+        sa.column('organization_id', sa.Integer),
+    )
+    rows = [
+        {'trigram': trigram, 'organization_id': organization_id}
+        for organization_id, name in bind.execute(sa.select(organizations.c.id, organizations.c.name))
+        for trigram in name_trigrams(name or '')
+    ]
+
+    bind.execute(sa.delete(trigrams))
+    if rows:
+        bind.execute(trigrams.insert(), rows)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_organization_trigrams_organization_id', table_name='organization_trigrams')
+    op.drop_table('organization_trigrams')
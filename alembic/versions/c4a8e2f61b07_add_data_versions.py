@@ -0,0 +1,42 @@
+"""Add data_versions table for ETag versions
+
+Revision ID: c4a8e2f61b07
+Revises: b1e7c3d94f20
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4a8e2f61b07'
+down_revision: Union[str, Sequence[str], None] = 'b1e7c3d94f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+VERSIONED_TABLES = ('organizations', 'buildings', 'activities')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    # Таблица, созданная через create_all, уже существует вместе со строками версий
+    if inspector.has_table('data_versions'):
+        return
+
+    data_versions = op.create_table(
+        'data_versions',
+        sa.Column('table_name', sa.String(64), primary_key=True),
+        sa.Column('version', sa.Integer(), nullable=False),
+    )
+    op.bulk_insert(data_versions, [{'table_name': table_name, 'version': 0} for table_name in VERSIONED_TABLES])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('data_versions')
@@ -0,0 +1,64 @@
+"""Add suggest_keys table for word-prefix suggestions
+
+Revision ID: d7b3f9a25c18
+Revises: c4a8e2f61b07
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from text_search import name_keys
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7b3f9a25c18'
+down_revision: Union[str, Sequence[str], None] = 'c4a8e2f61b07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    # Таблица, созданная через create_all, уже существует
+    if not inspector.has_table('suggest_keys'):
+        # Диапазон по префиксу требует побайтового сравнения ключей
+        key_type = sa.String(255, collation='C') if bind.dialect.name == 'postgresql' else sa.String(255)
+        op.create_table(
+            'suggest_keys',
+            sa.Column('key', key_type, primary_key=True),
+            sa.Column('kind', sa.String(16), primary_key=True),
+            sa.Column('item_id', sa.Integer(), primary_key=True),
+        )
+        op.create_index('ix_suggest_keys_item', 'suggest_keys', ['kind', 'item_id'])
+
+    # Заполняем ключи по текущим названиям организаций и деятельностей
+    suggest_keys = sa.table(
+        'suggest_keys',
+        sa.column('key', sa.String),
+        sa.column('kind', sa.String),
+        sa.column('item_id', sa.Integer),
+    )
+    rows = []
+    for table_name, kind in (('organizations', 'organization'), ('activities', 'activity')):
+        source = sa.table(table_name, sa.column('id', sa.Integer), sa.column('name', sa.String))
+        rows.extend(
+            {'key': key, 'kind': kind, 'item_id': item_id}
+            for item_id, name in bind.execute(sa.select(source.c.id, source.c.name))
+            for key in set(name_keys(name or ''))
+        )
+
+    bind.execute(sa.delete(suggest_keys))
+    if rows:
+        bind.execute(suggest_keys.insert(), rows)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_suggest_keys_item', table_name='suggest_keys')
+    op.drop_table('suggest_keys')
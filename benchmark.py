@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Нагрузочные замеры эндпоинтов API на синтетических наборах данных разного объема
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from statistics import mean
+from typing import Dict, List, Optional, Tuple
+import sqlalchemy
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from config import settings
+from database import Base, get_async_db, get_async_database_url
+from main import app
+from models import Activity, Organization
+from seed_data import generate_large_dataset
+
+
+# Объемы наборов данных (число организаций) по умолчанию
+DEFAULT_SIZES = [1000, 10000]
+
+# Число замеров и разогревочных запросов на каждый эндпоинт
+DEFAULT_REQUESTS = 30
+WARMUP_REQUESTS = 3
+
+# Допустимое замедление относительно базового прогона (0.2 - на 20%)
+DEFAULT_THRESHOLD = 0.2
+
+# Метрика задержки, по которой прогон сравнивается с базовым
+COMPARED_PERCENTILE = "p50_ms"
+
+# Точка поиска для геозапросов - центр Москвы (самый плотный кластер синтетических данных)
+BENCHMARK_POINT = (55.7558, 37.6176)
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Перцентиль по методу ближайшего ранга"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def benchmark_scenarios(samples: Dict[str, int]) -> List[Tuple[str, str, str, dict]]:
+    """Замеряемые запросы: (название, метод, путь, параметры или тело запроса)"""
+    latitude, longitude = BENCHMARK_POINT
+    return [
+        ("organization", "GET", f"/api/v1/organizations/{samples['organization_id']}", {}),
+        ("organizations_search", "GET", "/api/v1/organizations/search", {"name": "рога"}),
+        ("organizations_fuzzy_search", "GET", "/api/v1/organizations/search", {"name": "мастар", "fuzzy": True}),
+        ("organizations_suggest", "GET", "/api/v1/organizations/suggest", {"q": "мер"}),
+        ("building_organizations", "GET", f"/api/v1/buildings/{samples['building_id']}/organizations", {}),
+        ("buildings", "GET", "/api/v1/buildings/", {}),
+        ("activities_tree", "GET", "/api/v1/activities/", {}),
+        (
+            "activity_hierarchy", "GET",
+            f"/api/v1/activities/{samples['activity_id']}/organizations/hierarchy",
+            {"level": 3, "include_total": True}
+        ),
+        ("geo_radius", "POST", "/api/v1/organizations/geo/radius", {"latitude": latitude, "longitude": longitude, "radius_km": 2.0}),
+        (
+            "geo_rectangle", "POST", "/api/v1/organizations/geo/rectangle",
+            {"min_lat": latitude - 0.02, "max_lat": latitude + 0.02, "min_lon": longitude - 0.03, "max_lon": longitude + 0.03}
+        ),
+        ("geo_nearest", "GET", "/api/v1/organizations/geo/nearest", {"lat": latitude, "lon": longitude, "k": 20}),
+    ]
+
+
+async def prepare_dataset(database_path: Path, size: int, seed: int) -> AsyncEngine:
+    """Создает (или переиспользует) базу с синтетическим набором и возвращает её движок"""
+    database_url = f"sqlite:///{database_path}"
+    if not database_path.exists():
+        sync_engine = create_engine(database_url)
+        Base.metadata.create_all(bind=sync_engine)
+        sync_engine.dispose()
+
+        async_engine = create_async_engine(get_async_database_url(database_url))
+        async with async_sessionmaker(bind=async_engine, expire_on_commit=False)() as db:
+            await generate_large_dataset(db, organizations=size, seed=seed)
+        await async_engine.dispose()
+
+    return create_async_engine(get_async_database_url(database_url))
+
+
+async def dataset_samples(async_engine: AsyncEngine) -> Dict[str, int]:
+    """ID, на которых замеряются запросы: самое заполненное здание, первая корневая деятельность"""
+    async with async_sessionmaker(bind=async_engine)() as db:
+        organization_id = (await db.execute(select(func.min(Organization.id)))).scalar_one()
+        building_id = (await db.execute(
+            select(Organization.building_id)
+            .group_by(Organization.building_id)
+            .order_by(func.count().desc(), Organization.building_id)
+            .limit(1)
+        )).scalar_one()
+        activity_id = (await db.execute(
+            select(func.min(Activity.id)).where(Activity.parent_id.is_(None))
+        )).scalar_one()
+    return {"organization_id": organization_id, "building_id": building_id, "activity_id": activity_id}
+
+
+def measure_scenario(client: TestClient, statements: List[str], method: str, path: str, payload: dict, requests: int) -> dict:
+    """Задержки (мс), число SQL-запросов и пиковая память (КБ) одного эндпоинта"""
+    def send():
+        if method == "GET":
+            response = client.get(path, params=payload)
+        else:
+            response = client.post(path, json=payload)
+        if response.status_code != 200:
+            raise RuntimeError(f"{method} {path}: {response.status_code} {response.text[:200]}")
+        return response
+
+    for _ in range(WARMUP_REQUESTS):
+        send()
+
+    latencies = []
+    query_counts = []
+    for _ in range(requests):
+        statements.clear()
+        started = time.perf_counter()
+        send()
+        latencies.append((time.perf_counter() - started) * 1000)
+        query_counts.append(len(statements))
+
+    # Память замеряется отдельным запросом: трассировка выделений замедляет выполнение
+    tracemalloc.start()
+    response = send()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "requests": requests,
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        "mean_ms": round(mean(latencies), 3),
+        "max_ms": round(max(latencies), 3),
+        "queries": max(query_counts),
+        "peak_memory_kb": round(peak / 1024, 1),
+        "response_bytes": len(response.content),
+    }
+
+
+async def run_size(data_dir: Path, size: int, seed: int, requests: int) -> Dict[str, dict]:
+    """Замеры всех эндпоинтов на наборе данных одного объема"""
+    print(f"\n📦 Набор данных: {size} организаций")
+    async_engine = await prepare_dataset(data_dir / f"benchmark_{size}_{seed}.db", size, seed)
+    samples = await dataset_samples(async_engine)
+    session_factory = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with session_factory() as db:
+            yield db
+
+    statements: List[str] = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", count_statement)
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    results = {}
+    try:
+        # Клиент без контекстного менеджера: события запуска приложения (индексы в памяти
+        # по основной базе данных) не выполняются
+        client = TestClient(app, headers={"X-API-Key": settings.API_KEY})
+        for name, method, path, payload in benchmark_scenarios(samples):
+            results[name] = await asyncio.to_thread(
+                measure_scenario, client, statements, method, path, payload, requests
+            )
+            print(
+                f"   {name:<28} p50 {results[name]['p50_ms']:>9.2f} мс   p95 {results[name]['p95_ms']:>9.2f} мс   "
+                f"запросов {results[name]['queries']:>3}   память {results[name]['peak_memory_kb']:>9.1f} КБ"
+            )
+    finally:
+        app.dependency_overrides.pop(get_async_db, None)
+        event.remove(async_engine.sync_engine, "before_cursor_execute", count_statement)
+        await async_engine.dispose()
+    return results
+
+
+def run_benchmark(sizes: List[int], seed: int, requests: int, data_dir: Optional[Path] = None) -> dict:
+    """Замеры на всех объемах данных; результат сохраняется в JSON"""
+    with tempfile.TemporaryDirectory() as temporary_dir:
+        directory = data_dir or Path(temporary_dir)
+        directory.mkdir(parents=True, exist_ok=True)
+        results = {
+            str(size): asyncio.run(run_size(directory, size, seed, requests))
+            for size in sizes
+        }
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "platform": platform.platform(),
+        },
+        "seed": seed,
+        "results": results,
+    }
+
+
+def compare_with_baseline(current: dict, baseline: dict, threshold: float) -> List[str]:
+    """
+    Регрессии относительно базового прогона: задержка выросла больше чем на threshold
+    или увеличилось число SQL-запросов. Сравниваются только общие объемы и эндпоинты
+    """
+    regressions = []
+    for size, scenarios in current["results"].items():
+        for name, stats in scenarios.items():
+            base = baseline.get("results", {}).get(size, {}).get(name)
+            if base is None:
+                continue
+            if stats[COMPARED_PERCENTILE] > base[COMPARED_PERCENTILE] * (1 + threshold):
+                regressions.append(
+                    f"{size}/{name}: {COMPARED_PERCENTILE} {base[COMPARED_PERCENTILE]} -> {stats[COMPARED_PERCENTILE]}"
+                )
+            if stats["queries"] > base["queries"]:
+                regressions.append(f"{size}/{name}: запросов {base['queries']} -> {stats['queries']}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Замеры производительности эндпоинтов API")
+    parser.add_argument(
+        "--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+        help="Объемы наборов данных (число организаций) через запятую"
+    )
+    parser.add_argument("--requests", type=int, default=DEFAULT_REQUESTS, help="Замеров на эндпоинт")
+    parser.add_argument("--seed", type=int, default=42, help="Начальное значение генератора данных")
+    parser.add_argument("--data-dir", type=Path, help="Каталог для баз данных (переиспользуются между запусками)")
+    parser.add_argument("--output", type=Path, default=Path("benchmark_results.json"), help="Файл результатов")
+    parser.add_argument("--baseline", type=Path, help="Результаты базового прогона для сравнения")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Допустимое замедление (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    print(f"⏱  Замеры на наборах {sizes}, {args.requests} запросов на эндпоинт")
+    current = run_benchmark(sizes, args.seed, args.requests, args.data_dir)
+    args.output.write_text(json.dumps(current, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"\n📄 Результаты сохранены в {args.output}")
+
+    if args.baseline is None:
+        return 0
+
+    regressions = compare_with_baseline(current, json.loads(args.baseline.read_text(encoding="utf-8")), args.threshold)
+    if regressions:
+        print(f"\n❌ Регрессии относительно {args.baseline}:")
+        for regression in regressions:
+            print(f"   {regression}")
+        return 1
+    print(f"\n✅ Регрессий относительно {args.baseline} нет")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
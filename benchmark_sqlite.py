@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Пропускная способность чтения SQLite во время записи: стандартный журнал
+против рабочего режима (WAL и PRAGMA из настроек SQLITE_*)
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+from sqlalchemy import create_engine, event, insert, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from benchmark import percentile
+from database import Base, apply_sqlite_pragmas, engine_options, get_async_database_url
+from geo import grid_cell
+from models import Organization, Phone
+from seed_data import generate_large_dataset
+
+
+# Режимы сравнения: стандартные настройки SQLite и рабочий режим
+PROFILES = ("default", "tuned")
+
+DEFAULT_ORGANIZATIONS = 20000
+DEFAULT_READERS = 4
+DEFAULT_DURATION = 5.0
+
+
+async def generate_database(database_path: Path, organizations: int, seed: int) -> None:
+    """База с синтетическим набором данных в стандартном режиме журнала"""
+    database_url = f"sqlite:///{database_path}"
+    sync_engine = create_engine(database_url)
+    Base.metadata.create_all(bind=sync_engine)
+    sync_engine.dispose()
+
+    async_engine = create_async_engine(get_async_database_url(database_url))
+    async with async_sessionmaker(bind=async_engine, expire_on_commit=False)() as db:
+        await generate_large_dataset(db, organizations=organizations, seed=seed)
+    await async_engine.dispose()
+
+
+def run_profile(database_path: Path, profile: str, readers: int, duration: float) -> Dict[str, float]:
+    """
+    Читатели выбирают организации с телефонами по случайному ID и ячейке сетки,
+    писатель в это время добавляет организации по одной в транзакции
+    """
+    database_url = f"sqlite:///{database_path}"
+    options = engine_options(database_url)
+    options["pool_size"] = readers + 1
+    engine = create_engine(database_url, **options)
+    if profile == "tuned":
+        event.listen(engine, "connect", apply_sqlite_pragmas)
+
+    with engine.connect() as connection:
+        max_id = connection.execute(select(Organization.id).order_by(Organization.id.desc()).limit(1)).scalar_one()
+        building_id = connection.execute(select(Organization.building_id).limit(1)).scalar_one()
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    read_latencies: List[float] = []
+    counters = {"writes": 0, "read_errors": 0, "write_errors": 0}
+
+    def reader(seed: int):
+        rng = random.Random(seed)
+        latencies = []
+        errors = 0
+        with engine.connect() as connection:
+            while not stop.is_set():
+                organization_id = rng.randint(1, max_id)
+                started = time.perf_counter()
+                try:
+                    row = connection.execute(
+                        select(Organization.geo_cell).where(Organization.id == organization_id)
+                    ).first()
+                    connection.execute(
+                        select(Organization.id, Organization.name, Phone.number)
+                        .join(Phone, Phone.organization_id == Organization.id)
+                        .where(Organization.geo_cell == (row.geo_cell if row else 0))
+                        .limit(50)
+                    ).all()
+                    connection.rollback()
+                except OperationalError:
+                    errors += 1
+                    connection.rollback()
+                    continue
+                latencies.append(time.perf_counter() - started)
+        with lock:
+            read_latencies.extend(latencies)
+            counters["read_errors"] += errors
+
+    def writer():
+        rng = random.Random(0)
+        with engine.connect() as connection:
+            while not stop.is_set():
+                latitude, longitude = 55.75 + rng.gauss(0, 0.05), 37.62 + rng.gauss(0, 0.09)
+                try:
+                    with connection.begin():
+                        organization_id = connection.execute(insert(Organization).values(
+                            name=f"Новая организация {counters['writes']}",
+                            latitude=latitude,
+                            longitude=longitude,
+                            geo_cell=grid_cell(latitude, longitude),
+                            building_id=building_id
+                        )).inserted_primary_key[0]
+                        connection.execute(insert(Phone).values(number="8-800-000", type="work", organization_id=organization_id))
+                    counters["writes"] += 1
+                except OperationalError:
+                    counters["write_errors"] += 1
+
+    threads = [threading.Thread(target=reader, args=(seed,)) for seed in range(readers)]
+    threads.append(threading.Thread(target=writer))
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    return {
+        "reads_per_second": round(len(read_latencies) / duration, 1),
+        "read_p50_ms": round(percentile(read_latencies, 0.50) * 1000, 3) if read_latencies else None,
+        "read_p95_ms": round(percentile(read_latencies, 0.95) * 1000, 3) if read_latencies else None,
+        "writes_per_second": round(counters["writes"] / duration, 1),
+        "read_errors": counters["read_errors"],
+        "write_errors": counters["write_errors"],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Чтение SQLite во время записи: стандартный и рабочий режимы")
+    parser.add_argument("--organizations", type=int, default=DEFAULT_ORGANIZATIONS, help="Объем набора данных")
+    parser.add_argument("--readers", type=int, default=DEFAULT_READERS, help="Число потоков чтения")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION, help="Длительность замера в секундах")
+    parser.add_argument("--seed", type=int, default=42, help="Начальное значение генератора данных")
+    parser.add_argument("--output", type=Path, help="Файл для результатов в JSON")
+    args = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        base_path = Path(directory) / "base.db"
+        print(f"🌱 Генерация {args.organizations} организаций...")
+        asyncio.run(generate_database(base_path, args.organizations, args.seed))
+
+        for profile in PROFILES:
+            # Каждый режим - на своей копии: режим журнала WAL сохраняется в файле базы
+            database_path = Path(directory) / f"{profile}.db"
+            shutil.copy(base_path, database_path)
+            results[profile] = run_profile(database_path, profile, args.readers, args.duration)
+            stats = results[profile]
+            print(
+                f"   {profile:<8} чтений/с {stats['reads_per_second']:>9}   p95 {stats['read_p95_ms']} мс   "
+                f"записей/с {stats['writes_per_second']:>7}   ошибок чтения {stats['read_errors']}, "
+                f"записи {stats['write_errors']}"
+            )
+
+    if args.output:
+        args.output.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"📄 Результаты сохранены в {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
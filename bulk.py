@@ -0,0 +1,210 @@
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import (
+    SUGGESTION_ACTIVITY,
+    SUGGESTION_ORGANIZATION,
+    Activity,
+    Building,
+    Organization,
+    Phone,
+    activity_closure,
+    bump_data_versions_statement,
+    organization_activity,
+    organization_trigrams,
+    suggest_key_rows,
+    suggest_keys
+)
+from geo import grid_cell
+from schemas import BulkItemResult, BulkResponse
+from text_search import name_trigrams
+
+
+# Статусы элементов массовой операции
+BULK_STATUS_CREATED = "created"
+BULK_STATUS_ERROR = "error"
+
+
+def chunked(items: list, size: int) -> Iterable[list]:
+    """Разбивает список на части не длиннее size"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+async def existing_ids(db: AsyncSession, id_column, ids: Set[int]) -> Set[int]:
+    """Какие из ID существуют - одним запросом"""
+    if not ids:
+        return set()
+    result = await db.execute(select(id_column).where(id_column.in_(ids)))
+    return set(result.scalars().all())
+
+
+async def activity_levels(db: AsyncSession, ids: Set[int]) -> Dict[int, int]:
+    """Уровни вложенности существующих деятельностей из ids - одним запросом"""
+    if not ids:
+        return {}
+    result = await db.execute(select(Activity.id, Activity.level).where(Activity.id.in_(ids)))
+    return {activity_id: level or 1 for activity_id, level in result.all()}
+
+
+async def insert_returning_ids(db: AsyncSession, table, rows: List[dict]) -> List[int]:
+    """
+    Вставляет строки одним executemany (пачками многострочных INSERT) и возвращает
+    их ID в порядке строк. SQLite не гарантирует порядок RETURNING, но выдает ID
+    по возрастанию в порядке VALUES и держит блокировку записи до конца транзакции,
+    поэтому отсортированные ID соответствуют порядку строк
+    """
+    if db.bind.dialect.name == "sqlite":
+        result = await db.execute(insert(table).returning(table.c.id), rows)
+        return sorted(result.scalars().all())
+
+    result = await db.execute(
+        insert(table).returning(table.c.id, sort_by_parameter_order=True),
+        rows
+    )
+    return list(result.scalars().all())
+
+
+async def insert_buildings(db: AsyncSession, rows: List[dict]) -> List[int]:
+    """Вставляет здания через Core (ячейка сетки вычисляется здесь, события ORM не срабатывают)"""
+    building_ids = await insert_returning_ids(db, Building.__table__, [
+        {**row, "geo_cell": grid_cell(row["latitude"], row["longitude"])}
+        for row in rows
+    ])
+    await db.execute(bump_data_versions_statement("buildings"))
+    return building_ids
+
+
+async def insert_activities(db: AsyncSession, rows: List[dict]) -> List[int]:
+    """
+    Вставляет деятельности через Core вместе с ключами подсказок и строками таблицы
+    замыкания: предки новой деятельности - сама деятельность и предки её родителя.
+    Уровень вложенности вычисляется по числу предков родителя
+    """
+    parent_ids = {row["parent_id"] for row in rows if row.get("parent_id") is not None}
+    ancestors: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+    if parent_ids:
+        result = await db.execute(
+            select(activity_closure.c.descendant_id, activity_closure.c.ancestor_id, activity_closure.c.depth)
+            .where(activity_closure.c.descendant_id.in_(parent_ids))
+        )
+        for descendant_id, ancestor_id, depth in result.all():
+            ancestors[descendant_id].append((ancestor_id, depth))
+
+    activity_ids = await insert_returning_ids(db, Activity.__table__, [
+        {
+            "name": row["name"],
+            "description": row.get("description"),
+            "parent_id": row.get("parent_id"),
+            "level": len(ancestors.get(row.get("parent_id"), [])) + 1
+        }
+        for row in rows
+    ])
+
+    closure_rows = []
+    for activity_id, row in zip(activity_ids, rows):
+        closure_rows.append({"ancestor_id": activity_id, "descendant_id": activity_id, "depth": 0})
+        closure_rows.extend(
+            {"ancestor_id": ancestor_id, "descendant_id": activity_id, "depth": depth + 1}
+            for ancestor_id, depth in ancestors.get(row.get("parent_id"), [])
+        )
+    await db.execute(insert(activity_closure), closure_rows)
+    keys = [
+        key_row
+        for activity_id, row in zip(activity_ids, rows)
+        for key_row in suggest_key_rows(SUGGESTION_ACTIVITY, activity_id, row["name"])
+    ]
+    if keys:
+        await db.execute(insert(suggest_keys), keys)
+    await db.execute(bump_data_versions_statement("activities"))
+    return activity_ids
+
+
+async def insert_organizations(db: AsyncSession, rows: List[dict]) -> List[int]:
+    """
+    Вставляет организации через Core вместе с телефонами, связями с деятельностями,
+    триграммами и ключами подсказок названий; строка - поля организации плюс phones и activity_ids
+    """
+    organization_ids = await insert_returning_ids(db, Organization.__table__, [
+        {
+            "name": row["name"],
+            "description": row.get("description"),
+            "address": row.get("address"),
+            "latitude": row.get("latitude"),
+            "longitude": row.get("longitude"),
+            "geo_cell": grid_cell(row.get("latitude"), row.get("longitude")),
+            "building_id": row["building_id"]
+        }
+        for row in rows
+    ])
+
+    phones = []
+    links = []
+    trigrams = []
+    keys = []
+    for organization_id, row in zip(organization_ids, rows):
+        phones.extend(
+            {"number": phone["number"], "type": phone.get("type", "mobile"), "organization_id": organization_id}
+            for phone in row.get("phones", [])
+        )
+        links.extend(
+            {"organization_id": organization_id, "activity_id": activity_id}
+            for activity_id in set(row.get("activity_ids", []))
+        )
+        trigrams.extend(
+            {"trigram": trigram, "organization_id": organization_id}
+            for trigram in name_trigrams(row["name"])
+        )
+        keys.extend(suggest_key_rows(SUGGESTION_ORGANIZATION, organization_id, row["name"]))
+
+    if phones:
+        await db.execute(insert(Phone.__table__), phones)
+    if links:
+        await db.execute(insert(organization_activity), links)
+    if trigrams:
+        await db.execute(insert(organization_trigrams), trigrams)
+    if keys:
+        await db.execute(insert(suggest_keys), keys)
+    await db.execute(bump_data_versions_statement("organizations"))
+    return organization_ids
+
+
+async def bulk_create(
+    db: AsyncSession,
+    rows: List[dict],
+    errors: Dict[int, str],
+    insert_rows: Callable[[AsyncSession, List[dict]], Awaitable[List[int]]],
+    chunk_size: int
+) -> List[BulkItemResult]:
+    """
+    Вставляет строки, не отклоненные проверкой (errors: позиция -> ошибка), частями
+    по chunk_size, каждая часть - в своей транзакции. При ошибке БД откатывается
+    только её часть. Возвращает статус каждого элемента в порядке запроса
+    """
+    results: List[Optional[BulkItemResult]] = [
+        BulkItemResult(index=index, status=BULK_STATUS_ERROR, error=errors[index]) if index in errors else None
+        for index in range(len(rows))
+    ]
+    valid = [(index, row) for index, row in enumerate(rows) if index not in errors]
+
+    for chunk in chunked(valid, chunk_size):
+        try:
+            ids = await insert_rows(db, [row for _, row in chunk])
+            await db.commit()
+        except SQLAlchemyError:
+            await db.rollback()
+            for index, _ in chunk:
+                results[index] = BulkItemResult(index=index, status=BULK_STATUS_ERROR, error="Database error")
+            continue
+        for (index, _), item_id in zip(chunk, ids):
+            results[index] = BulkItemResult(index=index, status=BULK_STATUS_CREATED, id=item_id)
+
+    return results
+
+
+def bulk_response(results: List[BulkItemResult]) -> BulkResponse:
+    """Ответ массовой операции со сводкой"""
+    created = sum(1 for result in results if result.status == BULK_STATUS_CREATED)
+    return BulkResponse(results=results, created=created, failed=len(results) - created)
@@ -0,0 +1,180 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Set, Tuple
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import settings
+from database import get_async_db
+from dependencies import verify_api_key
+from models import data_versions
+from streaming import wants_ndjson
+
+
+# Префикс путей API, ответы которых кэшируются
+CACHED_PATH_PREFIX = "/api/v1/"
+
+# Таблицы, от которых зависят ответы с организациями
+ORGANIZATION_TABLES = ("organizations", "buildings", "activities")
+
+
+class LRUCache:
+    """
+    Кэш в памяти процесса с ограничением числа записей (вытесняются давно
+    не использованные) и временем жизни записей. Любой объект с методами
+    get, set, clear и stats может заменить его в качестве response_cache
+    """
+
+    def __init__(self, max_size: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # Увеличивается при каждом сбросе; ответ, вычисленный до сброса, не сохраняется
+        self.generation = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Значение по ключу или None, если его нет или срок жизни истек"""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= self._clock():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None) -> None:
+        """Сохраняет значение; generation - поколение кэша на момент начала вычисления"""
+        if generation is not None and generation != self.generation:
+            return
+        self._entries[key] = (self._clock() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Сбрасывает кэш (после изменения данных)"""
+        self._entries.clear()
+        self.generation += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Счетчики для мониторинга"""
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+async def load_data_versions(db: AsyncSession, tables: Iterable[str]) -> Dict[str, int]:
+    """Текущие версии таблиц из БД одним запросом (без моделей ORM)"""
+    result = await db.execute(
+        select(data_versions.c.table_name, data_versions.c.version)
+        .where(data_versions.c.table_name.in_(sorted(tables)))
+    )
+    return dict(result.all())
+
+
+def compute_etag(versions: Dict[str, int], request: Request) -> str:
+    """Сильный ETag ответа на запрос, зависящего от таблиц с версиями versions"""
+    version_list = ",".join(f"{table_name}={version}" for table_name, version in sorted(versions.items()))
+    representation = "ndjson" if wants_ndjson(request) else "json"
+    payload = f"{request.url.path}?{request.url.query}|{representation}|{version_list}"
+    return '"' + hashlib.sha1(payload.encode()).hexdigest() + '"'
+
+
+def parse_if_none_match(header: Optional[str]) -> Set[str]:
+    """ETag из заголовка If-None-Match (слабые ETag сравниваются как сильные)"""
+    if not header:
+        return set()
+    return {tag.strip().removeprefix("W/") for tag in header.split(",")}
+
+
+def etag_matches(etag: str, header: Optional[str]) -> bool:
+    """Совпадает ли ETag с заголовком If-None-Match"""
+    tags = parse_if_none_match(header)
+    return "*" in tags or etag in tags
+
+
+def conditional_get(*tables: str):
+    """
+    Зависимость для GET-эндпоинтов: выставляет ETag по версиям таблиц и отвечает 304,
+    если клиент прислал тот же ETag, - одним запросом версий, без загрузки данных и сериализации
+    """
+    async def dependency(
+        request: Request,
+        response: Response,
+        api_key: str = Depends(verify_api_key),
+        db: AsyncSession = Depends(get_async_db)
+    ):
+        etag = compute_etag(await load_data_versions(db, tables), request)
+        if etag_matches(etag, request.headers.get("if-none-match")):
+            raise HTTPException(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+    return dependency
+
+
+def response_cache_key(request: Request) -> Tuple[str, Tuple[Tuple[str, str], ...]]:
+    """Ключ кэша: путь и отсортированные параметры запроса"""
+    return request.url.path, tuple(sorted(request.query_params.multi_items()))
+
+
+def data_changed(*tables: str) -> None:
+    """
+    Отмечает изменение таблиц; вызывается обработчиками записи после commit и
+    сбрасывает кэш ответов процесса. Версии таблиц для ETag увеличиваются в БД
+    в транзакции записи (models.data_versions)
+    """
+    response_cache.clear()
+
+
+def response_cache_stats() -> Dict[str, Any]:
+    """Состояние кэша ответов для мониторинга"""
+    return {"enabled": settings.RESPONSE_CACHE_ENABLED, **response_cache.stats()}
+
+
+async def response_cache_middleware(request: Request, call_next):
+    """
+    Отдает ответы GET-запросов к API из кэша; кэшируются только успешные
+    JSON-ответы (потоковые NDJSON-ответы - нет). API ключ проверяется до обращения к кэшу
+    """
+    if (
+        not settings.RESPONSE_CACHE_ENABLED
+        or request.method != "GET"
+        or not request.url.path.startswith(CACHED_PATH_PREFIX)
+        or request.headers.get("x-api-key") != settings.API_KEY
+        or wants_ndjson(request)
+    ):
+        return await call_next(request)
+
+    key = response_cache_key(request)
+    cached = response_cache.get(key)
+    if cached is not None:
+        body, headers = cached
+        if "etag" in headers and etag_matches(headers["etag"], request.headers.get("if-none-match")):
+            return Response(status_code=304, headers={"ETag": headers["etag"]})
+        return Response(content=body, headers=headers)
+
+    generation = response_cache.generation
+    response = await call_next(request)
+    if response.status_code != 200 or response.headers.get("content-type") != "application/json":
+        return response
+
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    headers = dict(response.headers)
+    response_cache.set(key, (body, headers), generation)
+    return Response(content=body, status_code=response.status_code, headers=headers)
+
+
+# Кэш процесса; используется, если включен в настройках
+response_cache = LRUCache(settings.RESPONSE_CACHE_SIZE, settings.RESPONSE_CACHE_TTL)
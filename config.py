@@ -9,6 +9,26 @@ class Settings:
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./organizations.db")
     TEST_DATABASE_URL: str = os.getenv("TEST_DATABASE_URL", "sqlite:///./test.db")
     
+    # Пул соединений; незаданные параметры выбираются по СУБД (см. database.py)
+    DB_POOL_SIZE: Optional[int] = int(os.getenv("DB_POOL_SIZE")) if os.getenv("DB_POOL_SIZE") else None
+    DB_MAX_OVERFLOW: Optional[int] = int(os.getenv("DB_MAX_OVERFLOW")) if os.getenv("DB_MAX_OVERFLOW") else None
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: Optional[int] = int(os.getenv("DB_POOL_RECYCLE")) if os.getenv("DB_POOL_RECYCLE") else None
+    DB_POOL_PRE_PING: Optional[bool] = (
+        os.getenv("DB_POOL_PRE_PING").lower() == "true" if os.getenv("DB_POOL_PRE_PING") else None
+    )
+    
+    # Рабочий режим SQLite: PRAGMA, выполняемые на каждом новом соединении
+    SQLITE_TUNING_ENABLED: bool = os.getenv("SQLITE_TUNING_ENABLED", "False").lower() == "true"
+    SQLITE_JOURNAL_MODE: str = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    SQLITE_CACHE_SIZE: int = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # отрицательное - в КиБ
+    SQLITE_TEMP_STORE: str = os.getenv("SQLITE_TEMP_STORE", "MEMORY")
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    # Период PRAGMA optimize и контрольной точки WAL в секундах (0 - не выполнять)
+    SQLITE_MAINTENANCE_INTERVAL: float = float(os.getenv("SQLITE_MAINTENANCE_INTERVAL", "300"))
+    
     # API ключ
     API_KEY: str = os.getenv("API_KEY", "your-secret-api-key-here")
     
@@ -16,6 +36,37 @@ class Settings:
     APP_NAME: str = "REST API Organizations Directory"
     APP_VERSION: str = "1.0.0"
     DEBUG: bool = os.getenv("DEBUG", "False").lower() == "true"
+    
+    # Глубина загрузки дочерних деятельностей в ответах
+    ACTIVITY_TREE_DEPTH: int = int(os.getenv("ACTIVITY_TREE_DEPTH", "3"))
+    
+    # Геопоиск
+    GEO_INDEX_ENABLED: bool = os.getenv("GEO_INDEX_ENABLED", "False").lower() == "true"
+    
+    # Подсказки при вводе (префиксный индекс названий в памяти)
+    SUGGEST_INDEX_ENABLED: bool = os.getenv("SUGGEST_INDEX_ENABLED", "False").lower() == "true"
+    
+    # Массовое создание: размер части, вставляемой в одной транзакции
+    BULK_CHUNK_SIZE: int = int(os.getenv("BULK_CHUNK_SIZE", "1000"))
+    
+    # Кэш ответов GET-запросов в памяти процесса
+    RESPONSE_CACHE_ENABLED: bool = os.getenv("RESPONSE_CACHE_ENABLED", "False").lower() == "true"
+    RESPONSE_CACHE_SIZE: int = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+    RESPONSE_CACHE_TTL: float = float(os.getenv("RESPONSE_CACHE_TTL", "60"))
+    
+    # Метрики запросов (/metrics) и заголовок Server-Timing
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "True").lower() == "true"
+    
+    # Сколько SQL-запросов может выполнить один запрос API без предупреждения в лог
+    QUERY_BUDGET: int = int(os.getenv("QUERY_BUDGET", "20"))
+    
+    # Журнал медленных SQL-запросов с планами выполнения
+    SLOW_QUERY_LOG_ENABLED: bool = os.getenv("SLOW_QUERY_LOG_ENABLED", "True").lower() == "true"
+    SLOW_QUERY_THRESHOLD_MS: float = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+    SLOW_QUERY_EXPLAIN: bool = os.getenv("SLOW_QUERY_EXPLAIN", "True").lower() == "true"
+    SLOW_QUERY_LOG_FILE: str = os.getenv("SLOW_QUERY_LOG_FILE", "")
+    SLOW_QUERY_LOG_MAX_BYTES: int = int(os.getenv("SLOW_QUERY_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+    SLOW_QUERY_LOG_BACKUPS: int = int(os.getenv("SLOW_QUERY_LOG_BACKUPS", "5"))
 
 
 # Создаем экземпляр настроек
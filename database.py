@@ -1,17 +1,167 @@
-from sqlalchemy import create_engine
+import asyncio
+import logging
+from typing import List
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from config import settings
+from instrumentation import instrument_engine
+from pool_metrics import TimedAsyncAdaptedQueuePool, TimedQueuePool, pool_metrics
+from slow_queries import configure_slow_query_file, register_slow_query_log
+
+
+logger = logging.getLogger(__name__)
+
+# Асинхронные драйверы для поддерживаемых СУБД
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def get_async_database_url(database_url: str) -> str:
+    """Преобразует URL базы данных для использования асинхронного драйвера"""
+    url = make_url(database_url)
+    async_driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if async_driver is None:
+        return database_url
+    return url.set(drivername=async_driver).render_as_string(hide_password=False)
+
+
+# Параметры пула соединений по умолчанию для СУБД. SQLite выполняет запись
+# последовательно, поэтому небольшого пула достаточно, а соединения с локальным
+# файлом не нужно проверять и пересоздавать; PostgreSQL - пул под конкурентные
+# запросы с проверкой соединений, которые сервер или балансировщик мог закрыть
+POOL_DEFAULTS = {
+    "sqlite": {"pool_size": 5, "max_overflow": 5, "pool_recycle": -1, "pool_pre_ping": False},
+    "postgresql": {"pool_size": 10, "max_overflow": 20, "pool_recycle": 1800, "pool_pre_ping": True},
+}
+
+
+def engine_options(database_url: str, is_async: bool = False) -> dict:
+    """Параметры create_engine/create_async_engine: пул по СУБД с учетом настроек"""
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    options = {"pool_logging_name": "async" if is_async else "sync"}
+
+    if backend == "sqlite":
+        if not is_async:
+            # Соединения пула используются из разных потоков
+            options["connect_args"] = {"check_same_thread": False}
+        if url.database in (None, "", ":memory:"):
+            # База в памяти существует, пока открыто её единственное соединение
+            options["poolclass"] = StaticPool
+            return options
+
+    defaults = POOL_DEFAULTS.get(backend, POOL_DEFAULTS["postgresql"])
+    configured = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    options.update({
+        name: value if value is not None else defaults[name]
+        for name, value in configured.items()
+    })
+    options["pool_timeout"] = settings.DB_POOL_TIMEOUT
+    options["poolclass"] = TimedAsyncAdaptedQueuePool if is_async else TimedQueuePool
+    return options
+
+
+def sqlite_pragmas() -> List[str]:
+    """
+    PRAGMA рабочего режима SQLite: журнал WAL (чтение не блокируется записью),
+    синхронизация с диском только на контрольных точках, отображение файла в память,
+    увеличенный кэш страниц, временные таблицы в памяти и ожидание блокировки записи
+    """
+    return [
+        f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}",
+        f"PRAGMA cache_size={settings.SQLITE_CACHE_SIZE}",
+        f"PRAGMA temp_store={settings.SQLITE_TEMP_STORE}",
+        f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}",
+    ]
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Выполняет PRAGMA рабочего режима на новом соединении"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in sqlite_pragmas():
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+def tune_sqlite_engine(engine: Engine) -> None:
+    """Подключает рабочий режим SQLite к движку (для асинхронного - к его sync_engine)"""
+    if (
+        engine.dialect.name == "sqlite"
+        and settings.SQLITE_TUNING_ENABLED
+        and not event.contains(engine, "connect", apply_sqlite_pragmas)
+    ):
+        event.listen(engine, "connect", apply_sqlite_pragmas)
+
+
+async def run_sqlite_maintenance(engine: AsyncEngine, interval: float) -> None:
+    """
+    Периодически обновляет статистику планировщика (PRAGMA optimize по всем таблицам,
+    а не только использованным соединением) и переносит журнал WAL в файл базы
+    данных, усекая его (контрольная точка)
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with engine.connect() as connection:
+                await connection.exec_driver_sql("PRAGMA optimize=0x10002")
+                await connection.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+        except SQLAlchemyError as error:
+            logger.warning("SQLite maintenance failed: %s", error)
+
 
 # Создание движка базы данных
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {}
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
+
+# Создание асинхронного движка базы данных
+async_engine = create_async_engine(
+    get_async_database_url(settings.DATABASE_URL),
+    **engine_options(settings.DATABASE_URL, is_async=True)
 )
 
+# Рабочий режим SQLite
+tune_sqlite_engine(engine)
+tune_sqlite_engine(async_engine.sync_engine)
+
+# Метрики пулов соединений
+pool_metrics.register("sync", engine)
+pool_metrics.register("async", async_engine.sync_engine)
+
+# Учет SQL-запросов в замерах запросов API
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+
+# Журнал медленных SQL-запросов
+register_slow_query_log(engine)
+register_slow_query_log(async_engine.sync_engine)
+configure_slow_query_file()
+
 # Создание фабрики сессий
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Создание фабрики асинхронных сессий
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # Базовый класс для моделей
 Base = declarative_base()
 
@@ -22,4 +172,10 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    """Dependency для получения асинхронной сессии базы данных"""
+    async with AsyncSessionLocal() as db:
+        yield db
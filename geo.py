@@ -0,0 +1,138 @@
+import math
+from typing import List, Optional, Tuple
+from sqlalchemy import false, or_
+
+
+# Радиус Земли в километрах
+EARTH_RADIUS_KM = 6371.0
+
+# Размер ячейки пространственной сетки в градусах (~1.1 км по широте)
+GRID_CELL_DEGREES = 0.01
+GRID_ROWS = int(round(180 / GRID_CELL_DEGREES))
+GRID_COLUMNS = int(round(360 / GRID_CELL_DEGREES))
+
+# Максимальное число строк сетки, для которых строятся диапазоны по отдельности;
+# при большем охвате используется одна полоса по широте
+MAX_GRID_ROWS = 32
+
+# Запас в градусах, компенсирующий погрешность вычислений с плавающей точкой
+BOUNDING_BOX_EPSILON = 1e-9
+
+# Начальный радиус поиска ближайших организаций и максимальный радиус
+# (половина окружности Земли - покрывает всю поверхность)
+NEAREST_START_RADIUS_KM = 1.0
+MAX_SEARCH_RADIUS_KM = math.pi * EARTH_RADIUS_KM
+
+
+def grid_row(latitude: float) -> int:
+    """Номер строки сетки для широты"""
+    return min(max(int((latitude + 90) / GRID_CELL_DEGREES), 0), GRID_ROWS - 1)
+
+
+def grid_column(longitude: float) -> int:
+    """Номер столбца сетки для долготы"""
+    return min(max(int((longitude + 180) / GRID_CELL_DEGREES), 0), GRID_COLUMNS - 1)
+
+
+def grid_cell(latitude: Optional[float], longitude: Optional[float]) -> Optional[int]:
+    """
+    Вычисляет номер ячейки сетки для точки (строки нумеруются с юга на север,
+    столбцы - с запада на восток), None если координаты не заданы
+    """
+    if latitude is None or longitude is None:
+        return None
+    return grid_row(latitude) * GRID_COLUMNS + grid_column(longitude)
+
+
+def split_longitude_range(min_lon: float, max_lon: float) -> List[Tuple[float, float]]:
+    """
+    Приводит диапазон долгот к [-180, 180], разбивая его на два
+    при пересечении антимеридиана
+    """
+    if max_lon - min_lon >= 360:
+        return [(-180.0, 180.0)]
+    if min_lon < -180:
+        return [(min_lon + 360, 180.0), (-180.0, max_lon)]
+    if max_lon > 180:
+        return [(min_lon, 180.0), (-180.0, max_lon - 360)]
+    return [(min_lon, max_lon)]
+
+
+def rectangle_longitude_ranges(min_lon: float, max_lon: float) -> List[Tuple[float, float]]:
+    """
+    Диапазоны долгот прямоугольной области; min_lon > max_lon означает,
+    что область пересекает антимеридиан
+    """
+    if min_lon > max_lon:
+        return [(min_lon, 180.0), (-180.0, max_lon)]
+    return [(min_lon, max_lon)]
+
+
+def radius_bounding_box(
+    latitude: float,
+    longitude: float,
+    radius_km: float
+) -> Tuple[float, float, List[Tuple[float, float]]]:
+    """
+    Вычисляет ограничивающую область для круга на сфере:
+    (минимальная широта, максимальная широта, диапазоны долгот)
+    """
+    angular_radius = radius_km / EARTH_RADIUS_KM
+    delta_lat = math.degrees(angular_radius) + BOUNDING_BOX_EPSILON
+    min_lat = latitude - delta_lat
+    max_lat = latitude + delta_lat
+
+    # Круг накрывает полюс - подходят все долготы
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90.0), min(max_lat, 90.0), [(-180.0, 180.0)]
+
+    ratio = math.sin(angular_radius) / math.cos(math.radians(latitude))
+    if ratio >= 1:
+        return min_lat, max_lat, [(-180.0, 180.0)]
+
+    delta_lon = math.degrees(math.asin(ratio)) + BOUNDING_BOX_EPSILON
+    return min_lat, max_lat, split_longitude_range(longitude - delta_lon, longitude + delta_lon)
+
+
+def grid_cell_ranges(
+    min_lat: float,
+    max_lat: float,
+    longitude_ranges: List[Tuple[float, float]]
+) -> List[Tuple[int, int]]:
+    """
+    Покрывает область диапазонами номеров ячеек сетки (включительно).
+    Смежные диапазоны объединяются
+    """
+    first_row = grid_row(min_lat)
+    last_row = grid_row(max_lat)
+
+    if last_row - first_row + 1 > MAX_GRID_ROWS:
+        return [(first_row * GRID_COLUMNS, last_row * GRID_COLUMNS + GRID_COLUMNS - 1)]
+
+    ranges = []
+    for row in range(first_row, last_row + 1):
+        for min_lon, max_lon in longitude_ranges:
+            ranges.append((
+                row * GRID_COLUMNS + grid_column(min_lon),
+                row * GRID_COLUMNS + grid_column(max_lon)
+            ))
+
+    if not ranges:
+        return []
+
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        last_start, last_end = merged[-1]
+        if start <= last_end + 1:
+            merged[-1] = (last_start, max(last_end, end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def grid_cell_filter(column, ranges: List[Tuple[int, int]]):
+    """SQL-условие попадания номера ячейки в один из диапазонов"""
+    if not ranges:
+        return false()
+    return or_(*(column.between(start, end) for start, end in ranges))
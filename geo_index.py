@@ -0,0 +1,128 @@
+from bisect import bisect_left, bisect_right
+from itertools import compress
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from geo import (
+    MAX_SEARCH_RADIUS_KM,
+    NEAREST_START_RADIUS_KM,
+    grid_cell,
+    grid_cell_ranges,
+    radius_bounding_box,
+    rectangle_longitude_ranges
+)
+from models import Organization
+from utils import sort_by_distance, within_radius_mask
+
+
+class GeoIndex:
+    """
+    Пространственный индекс координат организаций в памяти процесса.
+    Точки хранятся отсортированными по номеру ячейки сетки (см. geo.py),
+    поэтому область поиска сводится к нескольким бинарным поискам
+    """
+
+    def __init__(self):
+        self._cells: List[int] = []
+        self._points: List[Tuple[int, float, float]] = []
+        self._positions: Dict[int, int] = {}
+        self.ready = False
+
+    def __len__(self) -> int:
+        return len(self._cells)
+
+    def build(self, points: Iterable[Tuple[int, Optional[float], Optional[float]]]) -> None:
+        """Перестраивает индекс по набору точек (id, широта, долгота)"""
+        entries = sorted(
+            (grid_cell(latitude, longitude), organization_id, latitude, longitude)
+            for organization_id, latitude, longitude in points
+            if latitude is not None and longitude is not None
+        )
+        self._cells = [entry[0] for entry in entries]
+        self._points = [entry[1:] for entry in entries]
+        self._positions = {entry[1]: entry[0] for entry in entries}
+        self.ready = True
+
+    def add(self, organization_id: int, latitude: Optional[float], longitude: Optional[float]) -> None:
+        """Добавляет или перемещает точку организации"""
+        self.remove(organization_id)
+        if latitude is None or longitude is None:
+            return
+
+        cell = grid_cell(latitude, longitude)
+        position = bisect_right(self._cells, cell)
+        self._cells.insert(position, cell)
+        self._points.insert(position, (organization_id, latitude, longitude))
+        self._positions[organization_id] = cell
+
+    def remove(self, organization_id: int) -> None:
+        """Удаляет точку организации из индекса"""
+        cell = self._positions.pop(organization_id, None)
+        if cell is None:
+            return
+
+        start = bisect_left(self._cells, cell)
+        end = bisect_right(self._cells, cell)
+        for position in range(start, end):
+            if self._points[position][0] == organization_id:
+                del self._cells[position]
+                del self._points[position]
+                return
+
+    def _candidates(self, min_lat: float, max_lat: float, longitude_ranges: List[Tuple[float, float]]):
+        """Точки из ячеек сетки, покрывающих область"""
+        for start, end in grid_cell_ranges(min_lat, max_lat, longitude_ranges):
+            first = bisect_left(self._cells, start)
+            last = bisect_right(self._cells, end)
+            yield from self._points[first:last]
+
+    def search_radius(self, latitude: float, longitude: float, radius_km: float) -> List[int]:
+        """ID организаций в радиусе от точки (по возрастанию)"""
+        min_lat, max_lat, longitude_ranges = radius_bounding_box(latitude, longitude, radius_km)
+        candidates = list(self._candidates(min_lat, max_lat, longitude_ranges))
+        if not candidates:
+            return []
+
+        organization_ids, latitudes, longitudes = zip(*candidates)
+        mask = within_radius_mask(latitude, longitude, latitudes, longitudes, radius_km)
+        return sorted(compress(organization_ids, mask))
+
+    def nearest(self, latitude: float, longitude: float, k: int) -> List[Tuple[int, float]]:
+        """
+        k ближайших организаций (id, расстояние в км) по возрастанию расстояния;
+        радиус поиска удваивается, пока не найдется k точек
+        """
+        radius_km = NEAREST_START_RADIUS_KM
+        while True:
+            min_lat, max_lat, longitude_ranges = radius_bounding_box(latitude, longitude, radius_km)
+            nearest = sort_by_distance(
+                latitude, longitude,
+                self._candidates(min_lat, max_lat, longitude_ranges),
+                radius_km
+            )
+            if len(nearest) >= k or len(nearest) == len(self) or radius_km >= MAX_SEARCH_RADIUS_KM:
+                return nearest[:k]
+            radius_km *= 2
+
+    def search_rectangle(self, min_lat: float, max_lat: float, min_lon: float, max_lon: float) -> List[int]:
+        """ID организаций в прямоугольной области (по возрастанию)"""
+        longitude_ranges = rectangle_longitude_ranges(min_lon, max_lon)
+        return sorted(
+            organization_id
+            for organization_id, point_lat, point_lon in self._candidates(min_lat, max_lat, longitude_ranges)
+            if min_lat <= point_lat <= max_lat
+            and any(range_min <= point_lon <= range_max for range_min, range_max in longitude_ranges)
+        )
+
+
+async def build_geo_index(db: AsyncSession, index: GeoIndex) -> None:
+    """Строит индекс по таблице организаций"""
+    result = await db.execute(
+        select(Organization.id, Organization.latitude, Organization.longitude)
+        .filter(Organization.latitude.is_not(None), Organization.longitude.is_not(None))
+    )
+    index.build(result.all())
+
+
+# Индекс процесса; заполняется при старте приложения, если включен в настройках
+geo_index = GeoIndex()
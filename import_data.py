@@ -0,0 +1,479 @@
+import argparse
+import asyncio
+import csv
+import json
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Union
+from sqlalchemy import DDL, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from bulk import insert_activities, insert_buildings, insert_organizations
+from config import settings
+from database import AsyncSessionLocal, async_engine
+from models import (
+    MAX_ACTIVITY_LEVEL,
+    Activity,
+    Building,
+    Organization,
+    Phone,
+    POSTGRES_SEARCH_DDL,
+    SQLITE_SEARCH_DDL,
+    organization_trigrams,
+    suggest_keys
+)
+
+
+# Форматы файлов импорта по расширению
+FILE_FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+# Разделитель списков (телефоны, деятельности) в ячейке CSV
+LIST_SEPARATOR = ";"
+
+# Как часто выводится прогресс импорта, в секундах
+PROGRESS_INTERVAL = 5.0
+
+# Сколько ошибок в строках выводится подробно
+MAX_REPORTED_ERRORS = 20
+
+# Вторичные индексы, которые можно удалить на время загрузки (индекс таблицы
+# замыкания по потомку не удаляется: по нему вставка деятельностей ищет предков родителя)
+DEFERRABLE_INDEX_TABLES = {
+    "buildings": [Building.__table__],
+    "activities": [Activity.__table__, suggest_keys],
+    "organizations": [Organization.__table__, Phone.__table__, organization_trigrams, suggest_keys],
+}
+
+# Полнотекстовый индекс организаций: как отключить его на время загрузки;
+# после загрузки он создается заново и перестраивается по DDL из models.py
+SEARCH_INDEX_DROP_DDL = {
+    "sqlite": ["DROP TRIGGER IF EXISTS organizations_search_insert"],
+    "postgresql": ["DROP INDEX IF EXISTS ix_organizations_search"],
+}
+SEARCH_INDEX_CREATE_DDL = {
+    "sqlite": SQLITE_SEARCH_DDL,
+    "postgresql": POSTGRES_SEARCH_DDL,
+}
+
+
+class ImportReport:
+    """Итоги импорта: прочитанные, загруженные и пропущенные строки, скорость"""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self.started = clock()
+        self.rows = 0
+        self.imported = 0
+        self.skipped = 0
+        self.errors: List[str] = []
+
+    def error(self, message: str, rows: int = 1) -> None:
+        """Учитывает пропущенные строки (одну или пачку) и причину"""
+        self.skipped += rows
+        self.errors.append(message)
+
+    @property
+    def elapsed(self) -> float:
+        return self._clock() - self.started
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.imported / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"прочитано {self.rows}, загружено {self.imported}, пропущено {self.skipped} "
+            f"за {self.elapsed:.1f} с ({self.rows_per_second:.0f} строк/с)"
+        )
+
+
+def detect_format(path: Path, file_format: Optional[str] = None) -> str:
+    """Формат файла: явно указанный или по расширению"""
+    if file_format:
+        return file_format
+    try:
+        return FILE_FORMATS[path.suffix.lower()]
+    except KeyError:
+        raise ValueError(f"Не удалось определить формат файла {path}, укажите --format")
+
+
+def read_records(path: Path, file_format: str) -> Iterator[Union[dict, str]]:
+    """
+    Построчно читает записи из CSV (с заголовком) или JSONL, не загружая файл в память.
+    Строки JSONL разбираются при импорте (decode_record), чтобы ошибка в одной строке
+    пропускала только её
+    """
+    with open(path, encoding="utf-8", newline="") as file:
+        if file_format == "csv":
+            yield from csv.DictReader(file)
+            return
+        for line in file:
+            if line.strip():
+                yield line
+
+
+def decode_record(record: Union[dict, str]) -> dict:
+    """Запись из строки JSONL или уже разобранная запись CSV"""
+    if isinstance(record, str):
+        try:
+            record = json.loads(record)
+        except json.JSONDecodeError as error:
+            raise ValueError(f"Некорректный JSON: {error}")
+    if not isinstance(record, dict):
+        raise ValueError("Запись должна быть JSON-объектом")
+    return record
+
+
+def optional_text(value) -> Optional[str]:
+    """Пустые значения CSV считаются отсутствующими"""
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def optional_float(value) -> Optional[float]:
+    value = optional_text(value)
+    return float(value) if value is not None else None
+
+
+def coordinate(value: Optional[float], field: str, limit: float) -> Optional[float]:
+    """Координата в допустимых пределах (как в схемах API)"""
+    if value is not None and not -limit <= value <= limit:
+        raise ValueError(f"Значение {field} вне диапазона от -{limit:g} до {limit:g}: {value:g}")
+    return value
+
+
+def list_field(value) -> List:
+    """Список из JSON-массива или из ячейки CSV со значениями через LIST_SEPARATOR"""
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return value
+    return [item.strip() for item in str(value).split(LIST_SEPARATOR) if item.strip()]
+
+
+def required_text(record: dict, field: str) -> str:
+    value = optional_text(record.get(field))
+    if value is None:
+        raise ValueError(f"Не заполнено поле {field}")
+    return value
+
+
+async def load_name_map(db: AsyncSession, id_column, name_column) -> Dict[str, int]:
+    """Соответствие название -> ID, читаемое потоком (при повторах - первый ID)"""
+    names: Dict[str, int] = {}
+    result = await db.stream(select(name_column, id_column).order_by(id_column))
+    async for name, item_id in result:
+        names.setdefault(name, item_id)
+    return names
+
+
+async def load_ids(db: AsyncSession, id_column) -> Set[int]:
+    """Множество существующих ID, читаемое потоком"""
+    result = await db.stream(select(id_column))
+    return {item_id async for item_id in result.scalars()}
+
+
+async def load_activity_levels(db: AsyncSession) -> Dict[int, int]:
+    """Уровни вложенности существующих деятельностей по ID, читаемые потоком"""
+    result = await db.stream(select(Activity.id, Activity.level))
+    return {activity_id: level or 1 async for activity_id, level in result}
+
+
+def phone_field(value) -> dict:
+    """Телефон: строка с номером или объект с полями number и type"""
+    if not isinstance(value, dict):
+        value = {"number": value}
+    number = optional_text(value.get("number"))
+    if number is None:
+        raise ValueError("Не заполнен номер телефона")
+    phone = {"number": number}
+    phone_type = optional_text(value.get("type"))
+    if phone_type is not None:
+        phone["type"] = phone_type
+    return phone
+
+
+class BuildingImporter:
+    """Здания: name, address, latitude, longitude"""
+
+    insert_rows = staticmethod(insert_buildings)
+
+    async def prepare(self, db: AsyncSession) -> None:
+        pass
+
+    def needs_flush(self, record: dict) -> bool:
+        return False
+
+    def row(self, record: dict) -> dict:
+        return {
+            "name": required_text(record, "name"),
+            "address": required_text(record, "address"),
+            "latitude": coordinate(float(required_text(record, "latitude")), "latitude", 90),
+            "longitude": coordinate(float(required_text(record, "longitude")), "longitude", 180),
+        }
+
+    def inserted(self, rows: List[dict], ids: List[int]) -> None:
+        pass
+
+    def failed(self, rows: List[dict]) -> None:
+        pass
+
+
+class ActivityImporter:
+    """
+    Деятельности: name, description и родитель - parent (название) или parent_id.
+    Родитель должен встречаться в файле раньше дочерних деятельностей, уровень
+    вложенности не должен превышать MAX_ACTIVITY_LEVEL
+    """
+
+    insert_rows = staticmethod(insert_activities)
+
+    def __init__(self):
+        self.activity_ids: Dict[str, int] = {}
+        self.activity_levels: Dict[int, int] = {}
+        self.pending_names = set()
+
+    async def prepare(self, db: AsyncSession) -> None:
+        self.activity_ids = await load_name_map(db, Activity.id, Activity.name)
+        self.activity_levels = await load_activity_levels(db)
+
+    def needs_flush(self, record: dict) -> bool:
+        # Родитель еще в текущей пачке: его ID появится только после её вставки
+        return optional_text(record.get("parent")) in self.pending_names
+
+    def row(self, record: dict) -> dict:
+        name = required_text(record, "name")
+        parent_id = optional_text(record.get("parent_id"))
+        parent_name = optional_text(record.get("parent"))
+        if parent_id is None and parent_name is not None:
+            if parent_name not in self.activity_ids:
+                raise ValueError(f"Родительская деятельность не найдена: {parent_name}")
+            parent_id = self.activity_ids[parent_name]
+        elif parent_id is not None and int(parent_id) not in self.activity_levels:
+            raise ValueError(f"Родительская деятельность не найдена: ID {parent_id}")
+
+        level = 1
+        if parent_id is not None:
+            level = self.activity_levels[int(parent_id)] + 1
+            if level > MAX_ACTIVITY_LEVEL:
+                raise ValueError(f"Превышен уровень вложенности деятельностей ({MAX_ACTIVITY_LEVEL})")
+        self.pending_names.add(name)
+        return {
+            "name": name,
+            "description": optional_text(record.get("description")),
+            "parent_id": int(parent_id) if parent_id is not None else None,
+            "level": level,
+        }
+
+    def inserted(self, rows: List[dict], ids: List[int]) -> None:
+        for row, activity_id in zip(rows, ids):
+            self.activity_ids.setdefault(row["name"], activity_id)
+            self.activity_levels[activity_id] = row["level"]
+        self.pending_names.clear()
+
+    def failed(self, rows: List[dict]) -> None:
+        # Дочерние деятельности не вставленной пачки будут пропущены как без родителя
+        self.pending_names.clear()
+
+
+class OrganizationImporter:
+    """
+    Организации: name, description, address, latitude, longitude, здание - building
+    (название) или building_id, phones и activities (названия) - списками
+    """
+
+    insert_rows = staticmethod(insert_organizations)
+
+    def __init__(self):
+        self.building_ids: Dict[str, int] = {}
+        self.known_building_ids: Set[int] = set()
+        self.activity_ids: Dict[str, int] = {}
+
+    async def prepare(self, db: AsyncSession) -> None:
+        self.building_ids = await load_name_map(db, Building.id, Building.name)
+        self.known_building_ids = await load_ids(db, Building.id)
+        self.activity_ids = await load_name_map(db, Activity.id, Activity.name)
+
+    def needs_flush(self, record: dict) -> bool:
+        return False
+
+    def row(self, record: dict) -> dict:
+        building_id = optional_text(record.get("building_id"))
+        building_name = optional_text(record.get("building"))
+        if building_id is None:
+            if building_name not in self.building_ids:
+                raise ValueError(f"Здание не найдено: {building_name}")
+            building_id = self.building_ids[building_name]
+        elif int(building_id) not in self.known_building_ids:
+            raise ValueError(f"Здание не найдено: ID {building_id}")
+
+        activity_ids = []
+        for activity_name in list_field(record.get("activities")):
+            if activity_name not in self.activity_ids:
+                raise ValueError(f"Деятельность не найдена: {activity_name}")
+            activity_ids.append(self.activity_ids[activity_name])
+
+        return {
+            "name": required_text(record, "name"),
+            "description": optional_text(record.get("description")),
+            "address": optional_text(record.get("address")),
+            "latitude": coordinate(optional_float(record.get("latitude")), "latitude", 90),
+            "longitude": coordinate(optional_float(record.get("longitude")), "longitude", 180),
+            "building_id": int(building_id),
+            "phones": [phone_field(phone) for phone in list_field(record.get("phones"))],
+            "activity_ids": activity_ids,
+        }
+
+    def inserted(self, rows: List[dict], ids: List[int]) -> None:
+        pass
+
+    def failed(self, rows: List[dict]) -> None:
+        pass
+
+
+IMPORTERS = {
+    "buildings": BuildingImporter,
+    "activities": ActivityImporter,
+    "organizations": OrganizationImporter,
+}
+
+
+async def drop_indexes(db: AsyncSession, entity: str) -> None:
+    """Удаляет вторичные и полнотекстовые индексы таблиц на время загрузки"""
+    connection = await db.connection()
+    for index_table in DEFERRABLE_INDEX_TABLES[entity]:
+        for index in index_table.indexes:
+            await connection.run_sync(index.drop, checkfirst=True)
+    if entity == "organizations":
+        for statement in SEARCH_INDEX_DROP_DDL.get(db.bind.dialect.name, []):
+            await connection.execute(DDL(statement))
+    await db.commit()
+
+
+async def create_indexes(db: AsyncSession, entity: str) -> None:
+    """Создает индексы заново после загрузки (полнотекстовый - с перестроением)"""
+    connection = await db.connection()
+    for index_table in DEFERRABLE_INDEX_TABLES[entity]:
+        for index in index_table.indexes:
+            await connection.run_sync(index.create, checkfirst=True)
+    if entity == "organizations":
+        for statement in SEARCH_INDEX_CREATE_DDL.get(db.bind.dialect.name, []):
+            await connection.execute(DDL(statement))
+    await db.commit()
+
+
+async def import_records(
+    db: AsyncSession,
+    entity: str,
+    records: Iterable[Union[dict, str]],
+    batch_size: int,
+    defer_indexes: bool = False,
+    progress: Optional[Callable[[ImportReport], None]] = None
+) -> ImportReport:
+    """
+    Загружает поток записей пачками по batch_size через Core (bulk.py), каждая
+    пачка - в своей транзакции. Строки с ошибками (некорректный JSON, нет обязательных
+    полей, координаты вне диапазона, неизвестное здание или деятельность, превышен
+    уровень вложенности) пропускаются и попадают в отчет;
+    при ошибке БД откатывается и попадает в отчет только её пачка
+    """
+    importer = IMPORTERS[entity]()
+    await importer.prepare(db)
+    report = ImportReport()
+    last_progress = 0.0
+    batch: List[dict] = []
+    # Номера строк файла для записей пачки
+    batch_rows: List[int] = []
+
+    async def flush():
+        if not batch:
+            return
+        try:
+            ids = await importer.insert_rows(db, batch)
+            await db.commit()
+        except SQLAlchemyError as error:
+            await db.rollback()
+            importer.failed(batch)
+            report.error(
+                f"строки {batch_rows[0]}-{batch_rows[-1]}: ошибка базы данных: {getattr(error, 'orig', None) or error}",
+                rows=len(batch)
+            )
+        else:
+            importer.inserted(batch, ids)
+            report.imported += len(batch)
+        batch.clear()
+        batch_rows.clear()
+
+    if defer_indexes:
+        await drop_indexes(db, entity)
+    try:
+        for report.rows, record in enumerate(records, 1):
+            try:
+                record = decode_record(record)
+            except ValueError as error:
+                report.error(f"строка {report.rows}: {error}")
+                continue
+            if importer.needs_flush(record):
+                await flush()
+            try:
+                batch.append(importer.row(record))
+                batch_rows.append(report.rows)
+            except ValueError as error:
+                report.error(f"строка {report.rows}: {error}")
+            if len(batch) >= batch_size:
+                await flush()
+                if progress and report.elapsed - last_progress >= PROGRESS_INTERVAL:
+                    last_progress = report.elapsed
+                    progress(report)
+        await flush()
+    finally:
+        if defer_indexes:
+            await db.rollback()
+            await create_indexes(db, entity)
+
+    return report
+
+
+def print_progress(report: ImportReport) -> None:
+    print(f"   ... {report.summary()}")
+
+
+async def run_import(entity: str, path: Path, file_format: str, batch_size: int, defer_indexes: bool) -> ImportReport:
+    """Импорт файла в базу данных приложения"""
+    try:
+        async with AsyncSessionLocal() as db:
+            return await import_records(
+                db, entity, read_records(path, file_format), batch_size, defer_indexes, print_progress
+            )
+    finally:
+        await async_engine.dispose()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Потоковый импорт зданий, деятельностей и организаций из CSV или JSONL")
+    parser.add_argument("entity", choices=sorted(IMPORTERS), help="Что импортируется")
+    parser.add_argument("path", type=Path, help="Файл CSV (с заголовком) или JSONL")
+    parser.add_argument("--format", choices=sorted(set(FILE_FORMATS.values())), help="Формат файла (по умолчанию - по расширению)")
+    parser.add_argument("--batch-size", type=int, default=settings.BULK_CHUNK_SIZE, help="Строк в одной транзакции")
+    parser.add_argument(
+        "--defer-indexes",
+        action="store_true",
+        help="Удалить вторичные и полнотекстовый индексы на время загрузки и перестроить после"
+    )
+    args = parser.parse_args(argv)
+
+    print(f"📥 Импорт {args.entity} из {args.path}...")
+    report = asyncio.run(run_import(
+        args.entity, args.path, detect_format(args.path, args.format), args.batch_size, args.defer_indexes
+    ))
+    for error in report.errors[:MAX_REPORTED_ERRORS]:
+        print(f"⚠️  {error}")
+    if len(report.errors) > MAX_REPORTED_ERRORS:
+        print(f"⚠️  ... и еще {len(report.errors) - MAX_REPORTED_ERRORS} ошибок")
+    print(f"✅ Импорт завершен: {report.summary()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import functools
+import inspect
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Callable, Optional
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from config import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Заголовки ответа с числом SQL-запросов и временем в БД (в режиме DEBUG)
+QUERY_COUNT_HEADER = "X-DB-Query-Count"
+QUERY_TIME_HEADER = "X-DB-Time-Ms"
+
+
+class RequestStats:
+    """
+    Замеры одного запроса: SQL-запросы и время в БД (по событиям движка),
+    моменты завершения обработчика и сериализации ответа (по TimedRoute)
+    """
+
+    __slots__ = ("started", "queries", "db_time", "statements", "endpoint_finished", "route_finished")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        # Число выполнений каждого SQL-запроса: повторы указывают на N+1
+        self.statements: Counter = Counter()
+        self.endpoint_finished: Optional[float] = None
+        self.route_finished: Optional[float] = None
+
+    @property
+    def serialize_time(self) -> float:
+        """Время от возврата обработчика до готового ответа (валидация и кодирование JSON)"""
+        if self.endpoint_finished is None or self.route_finished is None:
+            return 0.0
+        return self.route_finished - self.endpoint_finished
+
+
+# Замеры текущего запроса; задаются middleware, None вне запроса
+request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    stats = request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += time.perf_counter() - started
+        stats.statements[statement] += 1
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Подключает учет SQL-запросов к движку (для асинхронного - к его sync_engine)"""
+    if not event.contains(engine, "before_cursor_execute", before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+
+def timed_endpoint(endpoint: Callable) -> Callable:
+    """Отмечает момент завершения асинхронного обработчика в замерах запроса"""
+    if not inspect.iscoroutinefunction(endpoint) or getattr(endpoint, "__timed__", False):
+        return endpoint
+
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            stats = request_stats.get()
+            if stats is not None:
+                stats.endpoint_finished = time.perf_counter()
+
+    wrapper.__timed__ = True
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """
+    Маршрут, отделяющий время обработчика от времени сериализации ответа
+    (response_model и кодирование JSON выполняются FastAPI после обработчика)
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, timed_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        route_handler = super().get_route_handler()
+
+        async def timed_route_handler(request: Request) -> Response:
+            response = await route_handler(request)
+            stats = request_stats.get()
+            if stats is not None:
+                stats.route_finished = time.perf_counter()
+            return response
+
+        return timed_route_handler
+
+
+def check_query_budget(method: str, route: str, stats: RequestStats) -> None:
+    """Предупреждение в лог, если запрос выполнил больше SQL-запросов, чем QUERY_BUDGET"""
+    if stats.queries <= settings.QUERY_BUDGET:
+        return
+    statement, repeats = stats.statements.most_common(1)[0]
+    logger.warning(
+        "%s %s executed %d SQL queries (budget %d, %.1f ms); most repeated (%d times): %s",
+        method, route, stats.queries, settings.QUERY_BUDGET, stats.db_time * 1000,
+        repeats, " ".join(statement.split())[:200]
+    )
+
+
+class QueryStatsMiddleware:
+    """
+    ASGI middleware: заводит замеры запроса (RequestStats), в режиме DEBUG добавляет
+    к ответу число SQL-запросов и время в БД, предупреждает о превышении QUERY_BUDGET
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = request_stats.set(stats)
+
+        async def send_with_stats(message: Message) -> None:
+            if message["type"] == "http.response.start" and settings.DEBUG:
+                message["headers"] = list(message.get("headers", [])) + [
+                    (QUERY_COUNT_HEADER.lower().encode(), str(stats.queries).encode()),
+                    (QUERY_TIME_HEADER.lower().encode(), f"{stats.db_time * 1000:.2f}".encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            request_stats.reset(token)
+            route = scope.get("route")
+            if route is not None:
+                check_query_budget(scope["method"], route.path, stats)
@@ -0,0 +1,31 @@
+from sqlalchemy.orm import joinedload, selectinload
+from config import settings
+from models import Activity, Organization
+
+
+# Общий слой опций загрузки связей.
+# Схемы ответов (schemas.py) обходят building, phones, activities и рекурсивные
+# children; в асинхронной сессии ленивая загрузка недоступна, а в синхронной
+# приводит к N+1 запросам, поэтому все запросы, возвращающие организации и
+# деятельности, должны загружать связи заранее через эти опции.
+# Каждый уровень selectinload - один запрос, независимо от размера выборки.
+
+
+def load_activity_children(loader, depth: int):
+    """
+    Догружает дочерние деятельности на depth уровней вглубь; ниже этой
+    глубины children считаются пустыми, чтобы число запросов было ограничено
+    """
+    for _ in range(depth):
+        loader = loader.selectinload(Activity.children)
+    return loader.noload(Activity.children)
+
+
+def organization_load_options():
+    """Опции загрузки здания, телефонов и деятельностей организации"""
+    return (
+        joinedload(Organization.building),
+        selectinload(Organization.phones),
+        load_activity_children(selectinload(Organization.activities), settings.ACTIVITY_TREE_DEPTH),
+    )
+
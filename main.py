@@ -1,13 +1,67 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Query
+from fastapi.responses import PlainTextResponse
 from routers import organizations, buildings, activities
 from config import settings
+from database import AsyncSessionLocal, async_engine, run_sqlite_maintenance
+from geo_index import build_geo_index, geo_index
+from suggest_index import build_suggest_index, suggest_index
+from cache import response_cache_middleware, response_cache_stats
+from dependencies import verify_api_key
+from instrumentation import QueryStatsMiddleware, TimedRoute
+from slow_queries import slow_query_log
+from metrics import MetricsMiddleware, PROMETHEUS_CONTENT_TYPE, request_metrics
+from pool_metrics import pool_metrics
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Жизненный цикл приложения"""
+    # Строим пространственный индекс организаций в памяти
+    if settings.GEO_INDEX_ENABLED:
+        async with AsyncSessionLocal() as db:
+            await build_geo_index(db, geo_index)
+    
+    # Строим префиксный индекс названий для подсказок
+    if settings.SUGGEST_INDEX_ENABLED:
+        async with AsyncSessionLocal() as db:
+            await build_suggest_index(db, suggest_index)
+    
+    # Периодическое обслуживание SQLite в рабочем режиме
+    maintenance = None
+    if (
+        settings.SQLITE_TUNING_ENABLED
+        and settings.SQLITE_MAINTENANCE_INTERVAL > 0
+        and async_engine.dialect.name == "sqlite"
+    ):
+        maintenance = asyncio.create_task(run_sqlite_maintenance(async_engine, settings.SQLITE_MAINTENANCE_INTERVAL))
+    
+    yield
+    if maintenance is not None:
+        maintenance.cancel()
+    # Закрываем соединения асинхронного движка
+    await async_engine.dispose()
+
 
 app = FastAPI(
     title=settings.APP_NAME,
     description="REST API для справочника организаций, зданий и деятельностей",
-    version=settings.APP_VERSION
+    version=settings.APP_VERSION,
+    lifespan=lifespan
 )
 
+app.router.route_class = TimedRoute
+
+# Кэш ответов GET-запросов
+app.middleware("http")(response_cache_middleware)
+
+# Метрики запросов и заголовок Server-Timing (внешний слой - учитывает и ответы из кэша)
+app.add_middleware(MetricsMiddleware)
+
+# Число SQL-запросов и время в БД на запрос, контроль бюджета запросов (самый внешний слой)
+app.add_middleware(QueryStatsMiddleware)
+
 # Подключаем роутеры
 app.include_router(organizations.router)
 app.include_router(buildings.router)
@@ -26,4 +80,31 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Проверка здоровья приложения"""
-    return {"status": "healthy"} 
\ No newline at end of file
+    return {"status": "healthy"}
+
+
+@app.get("/cache/stats")
+async def cache_stats(api_key: str = Depends(verify_api_key)):
+    """Счетчики кэша ответов (попадания, промахи, размер)"""
+    return response_cache_stats()
+
+
+@app.get("/admin/slow-queries")
+async def slow_queries(
+    limit: int = Query(20, ge=1, le=100, description="Количество запросов"),
+    api_key: str = Depends(verify_api_key)
+):
+    """Медленные SQL-запросы с наибольшим суммарным временем, с последним планом выполнения"""
+    return {
+        "threshold_ms": settings.SLOW_QUERY_THRESHOLD_MS,
+        "queries": slow_query_log.top(limit)
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Метрики запросов и пулов соединений в текстовом формате Prometheus"""
+    return PlainTextResponse(
+        request_metrics.render() + pool_metrics.render(),
+        media_type=PROMETHEUS_CONTENT_TYPE
+    )
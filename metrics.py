@@ -0,0 +1,194 @@
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, List, Sequence, Tuple
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from config import settings
+from instrumentation import RequestStats, request_stats
+
+
+# Границы корзин гистограмм: задержка в секундах и размер ответа в байтах
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+# Тип содержимого текстового формата Prometheus
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Метка маршрута для запросов, не совпавших ни с одним маршрутом
+# (путь запроса не используется как метка, чтобы число серий было ограничено)
+UNMATCHED_ROUTE = "unmatched"
+
+
+class Histogram:
+    """Гистограмма Prometheus: счетчики по корзинам, сумма и число наблюдений"""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        # Последний счетчик - наблюдения больше последней границы (+Inf)
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels: Dict[str, str]) -> str:
+    """Метки в формате Prometheus с экранированием значений"""
+    return "{" + ",".join(f'{name}="{escape_label_value(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def histogram_lines(name: str, labels: Dict[str, str], histogram: Histogram) -> List[str]:
+    """Серия гистограммы в текстовом формате Prometheus: накопленные корзины, сумма, число"""
+    lines = []
+    cumulative = 0
+    for bound, count in zip(list(histogram.buckets) + ["+Inf"], histogram.counts):
+        cumulative += count
+        le = bound if bound == "+Inf" else format_value(bound)
+        lines.append(f"{name}_bucket{format_labels({**labels, 'le': le})} {cumulative}")
+    lines.append(f"{name}_sum{format_labels(labels)} {format_value(histogram.sum)}")
+    lines.append(f"{name}_count{format_labels(labels)} {histogram.count}")
+    return lines
+
+
+class RequestMetrics:
+    """
+    Метрики HTTP-запросов процесса. Запросы обрабатываются в одном цикле событий,
+    поэтому счетчики изменяются без блокировок; у каждого воркера свои метрики
+    """
+
+    def __init__(self):
+        self.latency: Dict[Tuple[str, str], Histogram] = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.db_latency: Dict[Tuple[str, str], Histogram] = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.response_size: Dict[Tuple[str, str], Histogram] = defaultdict(lambda: Histogram(SIZE_BUCKETS))
+        self.responses: Dict[Tuple[str, str, str], int] = defaultdict(int)
+        self.in_flight = 0
+
+    def observe(self, method: str, route: str, status: int, duration: float, db_time: float, size: int) -> None:
+        key = (method, route)
+        self.latency[key].observe(duration)
+        self.db_latency[key].observe(db_time)
+        self.response_size[key].observe(size)
+        self.responses[(method, route, str(status))] += 1
+
+    def clear(self) -> None:
+        self.latency.clear()
+        self.db_latency.clear()
+        self.response_size.clear()
+        self.responses.clear()
+
+    def render(self) -> str:
+        """Метрики в текстовом формате Prometheus"""
+        lines: List[str] = []
+        histograms = [
+            ("http_request_duration_seconds", "Время обработки запроса", self.latency),
+            ("http_request_db_duration_seconds", "Время SQL-запросов при обработке запроса", self.db_latency),
+            ("http_response_size_bytes", "Размер тела ответа", self.response_size),
+        ]
+        for name, help_text, series in histograms:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for (method, route), histogram in sorted(series.items()):
+                lines.extend(histogram_lines(name, {"method": method, "route": route}, histogram))
+
+        lines.append("# HELP http_responses_total Число ответов по статусам")
+        lines.append("# TYPE http_responses_total counter")
+        for (method, route, status), count in sorted(self.responses.items()):
+            lines.append(f"http_responses_total{format_labels({'method': method, 'route': route, 'status': status})} {count}")
+
+        lines.append("# HELP http_requests_in_flight Запросы, обрабатываемые в данный момент")
+        lines.append("# TYPE http_requests_in_flight gauge")
+        lines.append(f"http_requests_in_flight {self.in_flight}")
+        return "\n".join(lines) + "\n"
+
+
+def route_template(scope: Scope) -> str:
+    """
+    Шаблон маршрута запроса. Ответы из кэша отдаются до маршрутизации, поэтому
+    маршрут в scope не выставлен и определяется сопоставлением с маршрутами приложения
+    """
+    route = scope.get("route")
+    if route is None:
+        router = getattr(scope.get("app"), "router", None)
+        for candidate in getattr(router, "routes", []):
+            match, _ = candidate.matches(scope)
+            if match == Match.FULL:
+                route = candidate
+                break
+    return getattr(route, "path", UNMATCHED_ROUTE)
+
+
+def server_timing(stats: RequestStats, total: float) -> str:
+    """Заголовок Server-Timing: время в БД, сериализации ответа, прочей обработки и общее (мс)"""
+    db = stats.db_time * 1000
+    serialize = stats.serialize_time * 1000
+    total = total * 1000
+    app = max(total - db - serialize, 0.0)
+    return f"db;dur={db:.2f}, serialize;dur={serialize:.2f}, app;dur={app:.2f}, total;dur={total:.2f}"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: задержка, время в БД, размер и статус ответа по маршрутам,
+    число обрабатываемых запросов и заголовок Server-Timing
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        # Замеры обычно уже заведены внешним QueryStatsMiddleware
+        stats = request_stats.get()
+        token = None
+        if stats is None:
+            stats = RequestStats()
+            token = request_stats.set(stats)
+        status = 500
+        size = 0
+        request_metrics.in_flight += 1
+
+        async def send_with_metrics(message: Message) -> None:
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                timing = server_timing(stats, time.perf_counter() - stats.started)
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", timing.encode())]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            request_metrics.in_flight -= 1
+            if token is not None:
+                request_stats.reset(token)
+            request_metrics.observe(
+                scope["method"],
+                route_template(scope),
+                status,
+                time.perf_counter() - stats.started,
+                stats.db_time,
+                size
+            )
+
+
+# Метрики процесса
+request_metrics = RequestMetrics()
@@ -1,6 +1,9 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Table, Text
-from sqlalchemy.orm import relationship
+from typing import List
+from sqlalchemy import DDL, Column, Integer, String, Float, ForeignKey, Index, Table, Text, delete, event, inspect, select, true, update
+from sqlalchemy.orm import Session, relationship
 from database import Base
+from geo import grid_cell
+from text_search import name_keys, name_trigrams
 
 
 # Связующая таблица для связи многие-ко-многим между организациями и деятельностями
@@ -12,6 +15,71 @@ organization_activity = Table(
 )
 
 
+# Таблица замыкания иерархии деятельностей: все пары (предок, потомок) с расстоянием
+# между ними; каждая деятельность является своим предком с depth = 0
+activity_closure = Table(
+    'activity_closure',
+    Base.metadata,
+    Column('ancestor_id', Integer, ForeignKey('activities.id'), primary_key=True),
+    Column('descendant_id', Integer, ForeignKey('activities.id'), primary_key=True, index=True),
+    Column('depth', Integer, nullable=False),
+    Index('ix_activity_closure_ancestor_depth', 'ancestor_id', 'depth')
+)
+
+
+# Инвертированный индекс триграмм названий организаций для нечеткого поиска
+organization_trigrams = Table(
+    'organization_trigrams',
+    Base.metadata,
+    Column('trigram', String(3), primary_key=True),
+    Column('organization_id', Integer, ForeignKey('organizations.id'), primary_key=True, index=True)
+)
+
+
+# Типы подсказок
+SUGGESTION_ORGANIZATION = "organization"
+SUGGESTION_ACTIVITY = "activity"
+
+# Ключи подсказок: нормализованные названия организаций и деятельностей, начиная
+# с каждого слова (text_search.name_keys). Поиск по началу слова - диапазон по первичному
+# ключу; в PostgreSQL ключи сравниваются побайтово (COLLATE "C"), как того требует диапазон
+suggest_keys = Table(
+    'suggest_keys',
+    Base.metadata,
+    Column('key', String(255).with_variant(String(255, collation="C"), "postgresql"), primary_key=True),
+    Column('kind', String(16), primary_key=True),
+    Column('item_id', Integer, primary_key=True),
+    Index('ix_suggest_keys_item', 'kind', 'item_id')
+)
+
+
+# Версии данных по таблицам для ETag; увеличиваются в транзакции каждой записи,
+# поэтому изменения из других процессов (воркеры, импорт, генерация данных) тоже видны
+VERSIONED_TABLES = ("organizations", "buildings", "activities")
+
+data_versions = Table(
+    'data_versions',
+    Base.metadata,
+    Column('table_name', String(64), primary_key=True),
+    Column('version', Integer, nullable=False, default=0)
+)
+
+
+@event.listens_for(data_versions, "after_create")
+def insert_data_versions(target, connection, **kw):
+    """Строки версий создаются вместе с таблицей: запись только увеличивает их"""
+    connection.execute(target.insert(), [{"table_name": table_name, "version": 0} for table_name in VERSIONED_TABLES])
+
+
+def bump_data_versions_statement(*tables: str):
+    """UPDATE, увеличивающий версии изменившихся таблиц"""
+    return (
+        update(data_versions)
+        .where(data_versions.c.table_name.in_(sorted(set(tables))))
+        .values(version=data_versions.c.version + 1)
+    )
+
+
 class Organization(Base):
     """Модель организации"""
     __tablename__ = "organizations"
@@ -22,6 +90,7 @@ class Organization(Base):
     address = Column(Text, nullable=True)
     latitude = Column(Float, nullable=True)
     longitude = Column(Float, nullable=True)
+    geo_cell = Column(Integer, nullable=True, index=True)  # Ячейка пространственной сетки
     building_id = Column(Integer, ForeignKey("buildings.id"), nullable=False)
     
     # Связи
@@ -52,11 +121,16 @@ class Building(Base):
     address = Column(Text, nullable=False)
     latitude = Column(Float, nullable=False)
     longitude = Column(Float, nullable=False)
+    geo_cell = Column(Integer, nullable=True, index=True)  # Ячейка пространственной сетки
     
     # Связи
     organizations = relationship("Organization", back_populates="building")
 
 
+# Максимальный уровень вложенности деятельностей
+MAX_ACTIVITY_LEVEL = 3
+
+
 class Activity(Base):
     """Модель деятельности (иерархическая структура)"""
     __tablename__ = "activities"
@@ -70,4 +144,219 @@ class Activity(Base):
     # Связи
     parent = relationship("Activity", remote_side=[id], back_populates="children")
     children = relationship("Activity", back_populates="parent")
-    organizations = relationship("Organization", secondary=organization_activity, back_populates="activities") 
\ No newline at end of file
+    organizations = relationship("Organization", secondary=organization_activity, back_populates="activities")
+
+
+def update_geo_cell(mapper, connection, target):
+    """Пересчитывает ячейку пространственной сетки при вставке и обновлении"""
+    target.geo_cell = grid_cell(target.latitude, target.longitude)
+
+
+for geo_model in (Organization, Building):
+    event.listen(geo_model, "before_insert", update_geo_cell)
+    event.listen(geo_model, "before_update", update_geo_cell)
+
+
+def insert_organization_trigrams(connection, organization_id: int, name: str):
+    """Добавляет триграммы названия организации в индекс"""
+    trigrams = name_trigrams(name)
+    if trigrams:
+        connection.execute(organization_trigrams.insert(), [
+            {"trigram": trigram, "organization_id": organization_id}
+            for trigram in trigrams
+        ])
+
+
+@event.listens_for(Organization, "after_insert")
+def index_organization_trigrams(mapper, connection, target):
+    """Индексирует триграммы названия новой организации"""
+    insert_organization_trigrams(connection, target.id, target.name)
+
+
+@event.listens_for(Organization, "after_update")
+def reindex_organization_trigrams(mapper, connection, target):
+    """Переиндексирует триграммы при смене названия организации"""
+    if not inspect(target).attrs.name.history.has_changes():
+        return
+    connection.execute(delete(organization_trigrams).where(organization_trigrams.c.organization_id == target.id))
+    insert_organization_trigrams(connection, target.id, target.name)
+
+
+@event.listens_for(Organization, "before_delete")
+def delete_organization_trigrams(mapper, connection, target):
+    """Удаляет триграммы организации до удаления самой организации"""
+    connection.execute(delete(organization_trigrams).where(organization_trigrams.c.organization_id == target.id))
+
+
+def link_activity_subtree(connection, activity_id: int, parent_id: int):
+    """Связывает поддерево деятельности со всеми предками нового родителя"""
+    ancestors = activity_closure.alias('ancestors')
+    subtree = activity_closure.alias('subtree')
+    connection.execute(activity_closure.insert().from_select(
+        ['ancestor_id', 'descendant_id', 'depth'],
+        select(
+            ancestors.c.ancestor_id,
+            subtree.c.descendant_id,
+            ancestors.c.depth + subtree.c.depth + 1
+        ).select_from(
+            ancestors.join(subtree, true())
+        ).where(
+            ancestors.c.descendant_id == parent_id,
+            subtree.c.ancestor_id == activity_id
+        )
+    ))
+
+
+def unlink_activity_subtree(connection, activity_id: int):
+    """Отвязывает поддерево деятельности от её текущих предков"""
+    subtree_ids = connection.execute(
+        select(activity_closure.c.descendant_id).where(activity_closure.c.ancestor_id == activity_id)
+    ).scalars().all()
+    connection.execute(delete(activity_closure).where(
+        activity_closure.c.descendant_id.in_(subtree_ids),
+        activity_closure.c.ancestor_id.not_in(subtree_ids)
+    ))
+
+
+@event.listens_for(Activity, "after_insert")
+def insert_activity_closure(mapper, connection, target):
+    """Добавляет новую деятельность в таблицу замыкания"""
+    connection.execute(activity_closure.insert().values(
+        ancestor_id=target.id,
+        descendant_id=target.id,
+        depth=0
+    ))
+    if target.parent_id is not None:
+        link_activity_subtree(connection, target.id, target.parent_id)
+
+
+@event.listens_for(Activity, "after_update")
+def move_activity_closure(mapper, connection, target):
+    """Переносит поддерево в таблице замыкания при смене родителя"""
+    if not inspect(target).attrs.parent_id.history.has_changes():
+        return
+    unlink_activity_subtree(connection, target.id)
+    if target.parent_id is not None:
+        link_activity_subtree(connection, target.id, target.parent_id)
+
+
+@event.listens_for(Activity, "after_delete")
+def delete_activity_closure(mapper, connection, target):
+    """Удаляет деятельность из таблицы замыкания"""
+    connection.execute(delete(activity_closure).where(
+        (activity_closure.c.ancestor_id == target.id) | (activity_closure.c.descendant_id == target.id)
+    ))
+
+
+def suggest_key_rows(kind: str, item_id: int, name: str) -> List[dict]:
+    """Строки ключей подсказок для названия"""
+    return [{"key": key, "kind": kind, "item_id": item_id} for key in set(name_keys(name or ""))]
+
+
+# Тип подсказки для модели
+SUGGEST_MODELS = {
+    Organization: SUGGESTION_ORGANIZATION,
+    Activity: SUGGESTION_ACTIVITY,
+}
+
+
+def delete_suggest_keys(connection, kind: str, item_id: int):
+    connection.execute(delete(suggest_keys).where(suggest_keys.c.kind == kind, suggest_keys.c.item_id == item_id))
+
+
+def index_suggest_keys(mapper, connection, target):
+    """Добавляет ключи подсказок для новой записи"""
+    rows = suggest_key_rows(SUGGEST_MODELS[type(target)], target.id, target.name)
+    if rows:
+        connection.execute(suggest_keys.insert(), rows)
+
+
+def reindex_suggest_keys(mapper, connection, target):
+    """Пересоздает ключи подсказок при смене названия"""
+    if not inspect(target).attrs.name.history.has_changes():
+        return
+    delete_suggest_keys(connection, SUGGEST_MODELS[type(target)], target.id)
+    index_suggest_keys(mapper, connection, target)
+
+
+def unindex_suggest_keys(mapper, connection, target):
+    """Удаляет ключи подсказок удаленной записи"""
+    delete_suggest_keys(connection, SUGGEST_MODELS[type(target)], target.id)
+
+
+for suggest_model in SUGGEST_MODELS:
+    event.listen(suggest_model, "after_insert", index_suggest_keys)
+    event.listen(suggest_model, "after_update", reindex_suggest_keys)
+    event.listen(suggest_model, "after_delete", unindex_suggest_keys)
+
+
+# Версия какой таблицы меняется при изменении модели (телефоны - часть организации)
+MODEL_DATA_VERSIONS = {
+    Organization: "organizations",
+    Phone: "organizations",
+    Building: "buildings",
+    Activity: "activities",
+}
+
+
+@event.listens_for(Session, "after_flush")
+def bump_flushed_data_versions(session, flush_context):
+    """Увеличивает версии таблиц, измененных через ORM, одним запросом на flush"""
+    tables = {
+        MODEL_DATA_VERSIONS[type(instance)]
+        for instance in (*session.new, *session.dirty, *session.deleted)
+        if type(instance) in MODEL_DATA_VERSIONS
+    }
+    if tables:
+        session.connection().execute(bump_data_versions_statement(*tables))
+
+
+# Полнотекстовый индекс организаций по названию, описанию и адресу.
+# SQLite: FTS5-таблица с внешним содержимым, синхронизируемая триггерами;
+# PostgreSQL: GIN-индекс по выражению ORGANIZATION_SEARCH_VECTOR (запросы в search.py
+# должны использовать то же выражение, иначе индекс не применяется)
+ORGANIZATION_SEARCH_TABLE = "organization_search"
+ORGANIZATION_SEARCH_VECTOR = (
+    "to_tsvector('simple', coalesce(name, '') || ' ' || "
+    "coalesce(description, '') || ' ' || coalesce(address, ''))"
+)
+
+SQLITE_SEARCH_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {ORGANIZATION_SEARCH_TABLE} USING fts5(
+        name, description, address,
+        content='organizations', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS organizations_search_insert AFTER INSERT ON organizations BEGIN
+        INSERT INTO {ORGANIZATION_SEARCH_TABLE}(rowid, name, description, address)
+        VALUES (new.id, new.name, new.description, new.address);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS organizations_search_delete AFTER DELETE ON organizations BEGIN
+        INSERT INTO {ORGANIZATION_SEARCH_TABLE}({ORGANIZATION_SEARCH_TABLE}, rowid, name, description, address)
+        VALUES ('delete', old.id, old.name, old.description, old.address);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS organizations_search_update AFTER UPDATE ON organizations BEGIN
+        INSERT INTO {ORGANIZATION_SEARCH_TABLE}({ORGANIZATION_SEARCH_TABLE}, rowid, name, description, address)
+        VALUES ('delete', old.id, old.name, old.description, old.address);
+        INSERT INTO {ORGANIZATION_SEARCH_TABLE}(rowid, name, description, address)
+        VALUES (new.id, new.name, new.description, new.address);
+    END""",
+    # Индексирует строки, которые уже были в таблице до создания индекса
+    f"INSERT INTO {ORGANIZATION_SEARCH_TABLE}({ORGANIZATION_SEARCH_TABLE}) VALUES ('rebuild')",
+]
+
+POSTGRES_SEARCH_DDL = [
+    f"CREATE INDEX IF NOT EXISTS ix_organizations_search ON organizations USING gin ({ORGANIZATION_SEARCH_VECTOR})",
+]
+
+for statement in SQLITE_SEARCH_DDL:
+    event.listen(Organization.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+for statement in POSTGRES_SEARCH_DDL:
+    event.listen(Organization.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+
+# Триггеры удаляются вместе с таблицей организаций, FTS5-таблица - отдельно
+event.listen(
+    Organization.__table__,
+    "before_drop",
+    DDL(f"DROP TABLE IF EXISTS {ORGANIZATION_SEARCH_TABLE}").execute_if(dialect="sqlite")
+)
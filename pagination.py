@@ -0,0 +1,108 @@
+import base64
+import binascii
+import json
+from bisect import bisect_right
+from typing import List, Optional, Tuple
+from fastapi import HTTPException, Query
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+# Размер страницы по умолчанию и максимальный размер страницы
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+
+
+def encode_cursor(last_id: int, rank: Optional[float] = None) -> str:
+    """
+    Кодирует позицию keyset-пагинации (последний выданный ID и, для выдачи
+    по релевантности, его rank) в непрозрачный курсор
+    """
+    position = {"id": last_id}
+    if rank is not None:
+        position["rank"] = rank
+    payload = json.dumps(position, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor_position(cursor: Optional[str]) -> Optional[dict]:
+    """Декодирует курсор в позицию {"id": ..., "rank": ...}"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        last_id = position["id"]
+        rank = position.get("rank")
+    except (binascii.Error, ValueError, KeyError, TypeError, AttributeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(last_id, int) or (rank is not None and not isinstance(rank, (int, float))):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"id": last_id, "rank": rank}
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    """Декодирует курсор в последний выданный ID"""
+    position = decode_cursor_position(cursor)
+    return position["id"] if position else None
+
+
+class PageParams:
+    """Параметры keyset-пагинации списков (используется как Depends())"""
+    
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT, description="Размер страницы"),
+        cursor: Optional[str] = Query(None, description="Курсор следующей страницы"),
+        include_total: bool = Query(True, description="Подсчитывать общее количество записей")
+    ):
+        position = decode_cursor_position(cursor)
+        self.limit = limit
+        self.after_id = position["id"] if position else None
+        self.after_rank = position["rank"] if position else None
+        self.include_total = include_total
+
+
+def next_page_cursor(items: list, limit: int) -> Optional[str]:
+    """Курсор следующей страницы, если выбрано больше limit записей"""
+    if len(items) > limit:
+        return encode_cursor(items[limit - 1].id)
+    return None
+
+
+async def count_query(db: AsyncSession, query, id_column) -> int:
+    """Подсчитывает записи запроса через SQL COUNT, не загружая строки"""
+    subquery = query.with_only_columns(id_column).order_by(None).subquery()
+    result = await db.execute(select(func.count()).select_from(subquery))
+    return result.scalar_one()
+
+
+async def paginate_query(
+    db: AsyncSession,
+    query,
+    id_column,
+    page: PageParams,
+    scalars: bool = True
+) -> Tuple[list, Optional[int], Optional[str]]:
+    """
+    Выполняет запрос с keyset-пагинацией по id_column.
+    Возвращает (записи страницы, общее количество или None, курсор следующей страницы)
+    """
+    page_query = query.order_by(id_column).limit(page.limit + 1)
+    if page.after_id is not None:
+        page_query = page_query.filter(id_column > page.after_id)
+    
+    result = await db.execute(page_query)
+    items = list(result.scalars().all() if scalars else result.all())
+    total = await count_query(db, query, id_column) if page.include_total else None
+    
+    return items[:page.limit], total, next_page_cursor(items, page.limit)
+
+
+def paginate_ids(ids: List[int], page: PageParams) -> Tuple[List[int], int, Optional[str]]:
+    """Keyset-пагинация уже вычисленного списка ID (например, результатов геопоиска)"""
+    ids = sorted(ids)
+    start = bisect_right(ids, page.after_id) if page.after_id is not None else 0
+    page_ids = ids[start:start + page.limit]
+    next_cursor = encode_cursor(page_ids[-1]) if start + page.limit < len(ids) else None
+    return page_ids, len(ids), next_cursor
@@ -0,0 +1,111 @@
+import time
+from collections import defaultdict
+from typing import Dict, List
+from sqlalchemy import exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from metrics import Histogram, format_labels, format_value, histogram_lines
+
+
+# Границы корзин времени получения соединения из пула, в секундах
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+
+class PoolMetrics:
+    """
+    Метрики пулов соединений процесса по имени пула (pool_logging_name движка):
+    время получения соединения, таймауты ожидания и заполненность пула
+    """
+
+    def __init__(self):
+        self.checkout_wait: Dict[str, Histogram] = defaultdict(lambda: Histogram(POOL_WAIT_BUCKETS))
+        self.timeouts: Dict[str, int] = defaultdict(int)
+        self.engines: Dict[str, Engine] = {}
+
+    def register(self, name: str, engine: Engine) -> None:
+        """Движок, заполненность пула которого выводится в метриках"""
+        self.engines[name] = engine
+
+    def clear(self) -> None:
+        self.checkout_wait.clear()
+        self.timeouts.clear()
+
+    def render(self) -> str:
+        """Метрики в текстовом формате Prometheus"""
+        lines: List[str] = [
+            "# HELP db_pool_checkout_wait_seconds Время получения соединения из пула",
+            "# TYPE db_pool_checkout_wait_seconds histogram",
+        ]
+        for name, histogram in sorted(self.checkout_wait.items()):
+            lines.extend(histogram_lines("db_pool_checkout_wait_seconds", {"pool": name}, histogram))
+
+        lines.append("# HELP db_pool_checkout_timeouts_total Запросы, не дождавшиеся соединения")
+        lines.append("# TYPE db_pool_checkout_timeouts_total counter")
+        for name, count in sorted(self.timeouts.items()):
+            lines.append(f"db_pool_checkout_timeouts_total{format_labels({'pool': name})} {count}")
+
+        gauges = [
+            ("db_pool_size", "Постоянных соединений в пуле"),
+            ("db_pool_checked_out", "Соединений, выданных запросам"),
+            ("db_pool_overflow", "Соединений сверх размера пула"),
+            ("db_pool_saturation", "Доля выданных соединений от максимума пула"),
+        ]
+        values = {
+            name: pool_state(engine.pool)
+            for name, engine in sorted(self.engines.items())
+            if isinstance(engine.pool, TimedPoolMixin)
+        }
+        for gauge, help_text in gauges:
+            lines.append(f"# HELP {gauge} {help_text}")
+            lines.append(f"# TYPE {gauge} gauge")
+            for name, state in values.items():
+                lines.append(f"{gauge}{format_labels({'pool': name})} {format_value(state[gauge])}")
+        return "\n".join(lines) + "\n"
+
+
+def pool_state(pool: "TimedPoolMixin") -> Dict[str, float]:
+    """Текущая заполненность пула с очередью"""
+    checked_out = pool.checkedout()
+    capacity = pool.size() + max(pool.max_overflow, 0)
+    return {
+        "db_pool_size": pool.size(),
+        "db_pool_checked_out": checked_out,
+        "db_pool_overflow": max(pool.overflow(), 0),
+        "db_pool_saturation": round(checked_out / capacity, 4) if capacity else 0.0,
+    }
+
+
+class TimedPoolMixin:
+    """
+    Учитывает время получения соединения (ожидание свободного соединения или
+    открытие нового) и таймауты ожидания; имя пула - pool_logging_name движка,
+    которое сохраняется при пересоздании пула (engine.dispose)
+    """
+
+    def __init__(self, creator, pool_size: int = 5, max_overflow: int = 10, **kwargs):
+        # Максимум соединений сверх пула для расчета заполненности (-1 - без ограничения)
+        self.max_overflow = max_overflow
+        super().__init__(creator, pool_size=pool_size, max_overflow=max_overflow, **kwargs)
+
+    def _do_get(self):
+        name = getattr(self, "logging_name", None) or "default"
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.timeouts[name] += 1
+            raise
+        finally:
+            pool_metrics.checkout_wait[name].observe(time.perf_counter() - started)
+
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    """QueuePool с метриками получения соединений"""
+
+
+class TimedAsyncAdaptedQueuePool(TimedPoolMixin, AsyncAdaptedQueuePool):
+    """Пул асинхронного движка с метриками получения соединений"""
+
+
+# Метрики пулов процесса
+pool_metrics = PoolMetrics()
@@ -1,114 +1,261 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from database import get_db
-from models import Activity, Organization
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
+from models import MAX_ACTIVITY_LEVEL, Activity, Organization
 from schemas import (
     Activity as ActivitySchema,
     ActivityCreate,
     ActivitiesResponse,
+    BulkResponse,
+    Organization as OrganizationSchema,
     OrganizationsResponse
 )
-from utils import get_organizations_by_activity_hierarchy, get_child_activity_ids
+from utils import (
+    activity_rows_query,
+    build_activity_tree,
+    count_organizations_by_activity_hierarchy,
+    get_activity_rows,
+    get_organizations_by_activity_hierarchy as fetch_organizations_by_activity_hierarchy,
+    organizations_by_activity_hierarchy_query
+)
+from pagination import PageParams, next_page_cursor, paginate_query
+from bulk import BULK_STATUS_CREATED, activity_levels, bulk_create, bulk_response, insert_activities
+from loaders import organization_load_options
+from suggest_index import SUGGESTION_ACTIVITY, suggest_index
+from config import settings
+from cache import ORGANIZATION_TABLES, conditional_get, data_changed
+from streaming import ndjson_response, stream_partitions, stream_query, wants_ndjson
 from dependencies import verify_api_key
+from instrumentation import TimedRoute
 
-router = APIRouter(prefix="/api/v1/activities", tags=["activities"])
+router = APIRouter(prefix="/api/v1/activities", tags=["activities"], route_class=TimedRoute)
 
 
-@router.get("/", response_model=ActivitiesResponse)
+@router.get(
+    "/",
+    response_model=ActivitiesResponse,
+    dependencies=[Depends(conditional_get("activities"))]
+)
 async def get_activities(
-    db: Session = Depends(get_db),
+    request: Request,
+    flat: bool = Query(False, description="Плоский список со ссылками parent_id вместо дерева"),
+    depth: int = Query(settings.ACTIVITY_TREE_DEPTH, ge=0, le=10, description="Глубина вложенности children"),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
     api_key: str = Depends(verify_api_key)
 ):
-    """Получить список всех деятельностей"""
-    activities = db.query(Activity).all()
+    """
+    Получить дерево деятельностей (корневые деятельности с вложенными children)
+    или плоский список; постранично по корневым деятельностям или по строкам.
+    В формате NDJSON выдаются все деятельности (или все деревья) построчно
+    """
+    if wants_ndjson(request):
+        # Строки (или корневые деятельности) читаются курсором пачками;
+        # для каждой пачки корней поддеревья догружаются одним запросом
+        if flat:
+            async def build_rows(session: AsyncSession, rows: list) -> List[dict]:
+                return build_activity_tree(rows, [row.id for row in rows], 0)
+            
+            return ndjson_response(stream_partitions(
+                db, activity_rows_query().order_by(Activity.id), build_rows, ActivitySchema
+            ))
+        
+        async def build_trees(session: AsyncSession, roots: list) -> List[dict]:
+            root_ids = [root.id for root in roots]
+            return build_activity_tree(await get_activity_rows(session, root_ids, depth), root_ids, depth)
+        
+        return ndjson_response(stream_partitions(
+            db, select(Activity.id).filter(Activity.parent_id.is_(None)).order_by(Activity.id),
+            build_trees, ActivitySchema
+        ))
+    
+    if flat:
+        rows, total, next_cursor = await paginate_query(
+            db, activity_rows_query(), Activity.id, page, scalars=False
+        )
+        activities = build_activity_tree(rows, [row.id for row in rows], 0)
+    else:
+        # Страница корневых деятельностей, затем их поддеревья одним запросом;
+        # дерево собирается в памяти
+        roots, total, next_cursor = await paginate_query(
+            db, select(Activity.id).filter(Activity.parent_id.is_(None)), Activity.id, page, scalars=False
+        )
+        root_ids = [root.id for root in roots]
+        rows = await get_activity_rows(db, root_ids, depth)
+        activities = build_activity_tree(rows, root_ids, depth)
+    
     return ActivitiesResponse(
         activities=activities,
-        total=len(activities)
+        total=total,
+        next_cursor=next_cursor
     )
 
 
-@router.get("/{activity_id}", response_model=ActivitySchema)
+@router.get(
+    "/{activity_id}",
+    response_model=ActivitySchema,
+    dependencies=[Depends(conditional_get("activities"))]
+)
 async def get_activity(
     activity_id: int,
-    db: Session = Depends(get_db),
+    depth: int = Query(settings.ACTIVITY_TREE_DEPTH, ge=0, le=10, description="Глубина вложенности children"),
+    db: AsyncSession = Depends(get_async_db),
     api_key: str = Depends(verify_api_key)
 ):
     """Получить информацию о деятельности по ID"""
-    activity = db.query(Activity).filter(Activity.id == activity_id).first()
-    if not activity:
+    # Поддерево деятельности загружается одним запросом через таблицу замыкания
+    rows = await get_activity_rows(db, [activity_id], depth)
+    activities = build_activity_tree(rows, [activity_id], depth)
+    if not activities:
         raise HTTPException(status_code=404, detail="Activity not found")
-    return activity
+    return activities[0]
 
 
 @router.post("/", response_model=ActivitySchema, status_code=201)
 async def create_activity(
     activity_data: ActivityCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     api_key: str = Depends(verify_api_key)
 ):
-    """Создать новую деятельность"""
+    """Создать новую деятельность (уровень вложенности - по родителю)"""
     # Проверяем родительскую деятельность, если указана
+    level = 1
     if activity_data.parent_id:
-        parent_activity = db.query(Activity).filter(Activity.id == activity_data.parent_id).first()
+        parent_activity = await db.get(Activity, activity_data.parent_id)
         if not parent_activity:
             raise HTTPException(status_code=404, detail="Parent activity not found")
+        level = (parent_activity.level or 1) + 1
+        if level > MAX_ACTIVITY_LEVEL:
+            raise HTTPException(status_code=400, detail="Maximum activity nesting level exceeded")
     
     activity = Activity(
         name=activity_data.name,
         description=activity_data.description,
-        parent_id=activity_data.parent_id
+        parent_id=activity_data.parent_id,
+        level=level
     )
     
     db.add(activity)
-    db.commit()
-    db.refresh(activity)
+    await db.commit()
+    data_changed("activities")
+    
+    # Обновляем префиксный индекс подсказок
+    if settings.SUGGEST_INDEX_ENABLED and suggest_index.ready:
+        suggest_index.add(SUGGESTION_ACTIVITY, activity.id, activity.name)
+    
+    rows = await get_activity_rows(db, [activity.id], 0)
+    return build_activity_tree(rows, [activity.id], 0)[0]
+
+
+@router.post("/bulk", response_model=BulkResponse)
+async def bulk_create_activities(
+    activities_data: List[ActivityCreate],
+    db: AsyncSession = Depends(get_async_db),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Создать несколько деятельностей за один запрос (частями, со статусом каждого
+    элемента); родительские деятельности и их уровни проверяются одним запросом
+    """
+    parent_levels = await activity_levels(
+        db, {activity_data.parent_id for activity_data in activities_data if activity_data.parent_id}
+    )
+    errors = {}
+    for index, activity_data in enumerate(activities_data):
+        if not activity_data.parent_id:
+            continue
+        if activity_data.parent_id not in parent_levels:
+            errors[index] = "Parent activity not found"
+        elif parent_levels[activity_data.parent_id] >= MAX_ACTIVITY_LEVEL:
+            errors[index] = "Maximum activity nesting level exceeded"
+    rows = [activity_data.model_dump() for activity_data in activities_data]
+    results = await bulk_create(db, rows, errors, insert_activities, settings.BULK_CHUNK_SIZE)
+    data_changed("activities")
+    
+    # Обновляем префиксный индекс подсказок
+    if settings.SUGGEST_INDEX_ENABLED and suggest_index.ready:
+        for result in results:
+            if result.status == BULK_STATUS_CREATED:
+                suggest_index.add(SUGGESTION_ACTIVITY, result.id, rows[result.index]["name"])
     
-    return activity
+    return bulk_response(results)
 
 
-@router.get("/{activity_id}/organizations", response_model=OrganizationsResponse)
+@router.get(
+    "/{activity_id}/organizations",
+    response_model=OrganizationsResponse,
+    dependencies=[Depends(conditional_get(*ORGANIZATION_TABLES))]
+)
 async def get_organizations_by_activity(
+    request: Request,
     activity_id: int,
-    db: Session = Depends(get_db),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
     api_key: str = Depends(verify_api_key)
 ):
-    """Получить список организаций по деятельности"""
+    """Получить список организаций по деятельности (постранично или потоком NDJSON)"""
     # Проверяем существование деятельности
-    activity = db.query(Activity).filter(Activity.id == activity_id).first()
+    activity = await db.get(Activity, activity_id)
     if not activity:
         raise HTTPException(status_code=404, detail="Activity not found")
     
     # Получаем организации с этой деятельностью
-    organizations = db.query(Organization).join(Organization.activities).filter(Activity.id == activity_id).all()
+    query = (
+        select(Organization)
+        .options(*organization_load_options())
+        .join(Organization.activities)
+        .filter(Activity.id == activity_id)
+    )
+    if wants_ndjson(request):
+        return ndjson_response(stream_query(db, query.order_by(Organization.id), OrganizationSchema))
+    
+    organizations, total, next_cursor = await paginate_query(db, query, Organization.id, page)
     
     return OrganizationsResponse(
         organizations=organizations,
-        total=len(organizations)
+        total=total,
+        next_cursor=next_cursor
     )
 
 
-@router.get("/{activity_id}/organizations/hierarchy", response_model=OrganizationsResponse)
+@router.get(
+    "/{activity_id}/organizations/hierarchy",
+    response_model=OrganizationsResponse,
+    dependencies=[Depends(conditional_get(*ORGANIZATION_TABLES))]
+)
 async def get_organizations_by_activity_hierarchy(
+    request: Request,
     activity_id: int,
     level: int = Query(..., ge=1, le=3, description="Уровень иерархии (1-3)"),
-    db: Session = Depends(get_db),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
     api_key: str = Depends(verify_api_key)
 ):
-    """Получить список организаций по иерархии деятельностей"""
+    """Получить список организаций по иерархии деятельностей (включая саму деятельность)"""
     # Проверяем существование деятельности
-    activity = db.query(Activity).filter(Activity.id == activity_id).first()
+    activity = await db.get(Activity, activity_id)
     if not activity:
         raise HTTPException(status_code=404, detail="Activity not found")
     
-    # Получаем ID всех дочерних деятельностей
-    child_activity_ids = get_child_activity_ids(db, activity_id, level)
+    if wants_ndjson(request):
+        return ndjson_response(stream_query(
+            db, organizations_by_activity_hierarchy_query(activity_id, level), OrganizationSchema
+        ))
     
-    # Получаем организации с этими деятельностями
-    organizations = db.query(Organization).join(Organization.activities).filter(
-        Activity.id.in_(child_activity_ids)
-    ).all()
+    # Получаем страницу организаций одним запросом через таблицу замыкания;
+    # лишняя запись показывает, есть ли следующая страница
+    organizations = await fetch_organizations_by_activity_hierarchy(
+        db, activity_id, level, limit=page.limit + 1, after_id=page.after_id
+    )
+    total = (
+        await count_organizations_by_activity_hierarchy(db, activity_id, level)
+        if page.include_total else None
+    )
     
     return OrganizationsResponse(
-        organizations=organizations,
-        total=len(organizations)
-    ) 
\ No newline at end of file
+        organizations=organizations[:page.limit],
+        total=total,
+        next_cursor=next_page_cursor(organizations, page.limit)
+    )
@@ -1,69 +1,109 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from database import get_db
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
 from models import Building, Organization
 from schemas import (
     Building as BuildingSchema,
     BuildingCreate,
     BuildingsResponse,
+    BulkResponse,
+    Organization as OrganizationSchema,
     OrganizationsResponse
 )
+from loaders import organization_load_options
+from pagination import PageParams, paginate_query
+from bulk import bulk_create, bulk_response, insert_buildings
+from config import settings
+from cache import ORGANIZATION_TABLES, conditional_get, data_changed
+from streaming import ndjson_response, stream_query, wants_ndjson
 from dependencies import verify_api_key
+from instrumentation import TimedRoute
 
-router = APIRouter(prefix="/api/v1/buildings", tags=["buildings"])
+router = APIRouter(prefix="/api/v1/buildings", tags=["buildings"], route_class=TimedRoute)
 
 
-@router.get("/", response_model=BuildingsResponse)
+@router.get(
+    "/",
+    response_model=BuildingsResponse,
+    dependencies=[Depends(conditional_get("buildings"))]
+)
 async def get_buildings(
-    db: Session = Depends(get_db),
+    request: Request,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
     api_key: str = Depends(verify_api_key)
 ):
-    """Получить список всех зданий"""
-    buildings = db.query(Building).all()
+    """Получить список всех зданий (постранично или потоком NDJSON)"""
+    if wants_ndjson(request):
+        return ndjson_response(stream_query(db, select(Building).order_by(Building.id), BuildingSchema))
+    
+    buildings, total, next_cursor = await paginate_query(db, select(Building), Building.id, page)
     return BuildingsResponse(
         buildings=buildings,
-        total=len(buildings)
+        total=total,
+        next_cursor=next_cursor
     )
 
 
-@router.get("/{building_id}", response_model=BuildingSchema)
+@router.get(
+    "/{building_id}",
+    response_model=BuildingSchema,
+    dependencies=[Depends(conditional_get("buildings"))]
+)
 async def get_building(
     building_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     api_key: str = Depends(verify_api_key)
 ):
     """Получить информацию о здании по ID"""
-    building = db.query(Building).filter(Building.id == building_id).first()
+    building = await db.get(Building, building_id)
     if not building:
         raise HTTPException(status_code=404, detail="Building not found")
     return building
 
 
-@router.get("/{building_id}/organizations", response_model=OrganizationsResponse)
+@router.get(
+    "/{building_id}/organizations",
+    response_model=OrganizationsResponse,
+    dependencies=[Depends(conditional_get(*ORGANIZATION_TABLES))]
+)
 async def get_organizations_by_building(
+    request: Request,
     building_id: int,
-    db: Session = Depends(get_db),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
     api_key: str = Depends(verify_api_key)
 ):
-    """Получить список организаций в здании"""
+    """Получить список организаций в здании (постранично или потоком NDJSON)"""
     # Проверяем существование здания
-    building = db.query(Building).filter(Building.id == building_id).first()
+    building = await db.get(Building, building_id)
     if not building:
         raise HTTPException(status_code=404, detail="Building not found")
     
     # Получаем организации в здании
-    organizations = db.query(Organization).filter(Organization.building_id == building_id).all()
+    query = (
+        select(Organization)
+        .options(*organization_load_options())
+        .filter(Organization.building_id == building_id)
+    )
+    if wants_ndjson(request):
+        return ndjson_response(stream_query(db, query.order_by(Organization.id), OrganizationSchema))
+    
+    organizations, total, next_cursor = await paginate_query(db, query, Organization.id, page)
     
     return OrganizationsResponse(
         organizations=organizations,
-        total=len(organizations)
+        total=total,
+        next_cursor=next_cursor
     )
 
 
 @router.post("/", response_model=BuildingSchema, status_code=201)
 async def create_building(
     building_data: BuildingCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     api_key: str = Depends(verify_api_key)
 ):
     """Создать новое здание"""
@@ -75,7 +115,21 @@ async def create_building(
     )
     
     db.add(building)
-    db.commit()
-    db.refresh(building)
+    await db.commit()
+    data_changed("buildings")
+    await db.refresh(building)
     
-    return building 
\ No newline at end of file
+    return building
+
+
+@router.post("/bulk", response_model=BulkResponse)
+async def bulk_create_buildings(
+    buildings_data: List[BuildingCreate],
+    db: AsyncSession = Depends(get_async_db),
+    api_key: str = Depends(verify_api_key)
+):
+    """Создать несколько зданий за один запрос (частями, со статусом каждого элемента)"""
+    rows = [building_data.model_dump() for building_data in buildings_data]
+    results = await bulk_create(db, rows, {}, insert_buildings, settings.BULK_CHUNK_SIZE)
+    data_changed("buildings")
+    return bulk_response(results)
@@ -1,45 +1,131 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from database import get_db
+from itertools import compress
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
 from models import Organization, Building, Activity, Phone
 from schemas import (
     Organization as OrganizationSchema,
     OrganizationCreate,
     OrganizationsResponse,
+    OrganizationWithDistance,
+    BulkResponse,
+    NearestOrganizationsResponse,
+    Suggestion,
+    SuggestionsResponse,
     GeoSearchRequest,
     RectangleSearchRequest
 )
-from utils import calculate_distance, get_organizations_by_activity_hierarchy
+from utils import (
+    get_nearest_organization_ids,
+    get_organization_by_id,
+    get_organizations_by_ids,
+    within_radius_mask
+)
+from geo import (
+    grid_cell_filter,
+    grid_cell_ranges,
+    radius_bounding_box,
+    rectangle_longitude_ranges
+)
+from geo_index import geo_index
+from search import (
+    fuzzy_search_organization_ids,
+    fuzzy_search_organizations,
+    search_organization_ids,
+    search_organizations
+)
+from suggest_index import SUGGESTION_ORGANIZATION, suggest_from_db, suggest_index
+from pagination import PageParams, paginate_ids, paginate_query
+from bulk import BULK_STATUS_CREATED, bulk_create, bulk_response, existing_ids, insert_organizations
+from config import settings
+from loaders import organization_load_options
+from cache import ORGANIZATION_TABLES, conditional_get, data_changed
+from streaming import ndjson_response, stream_by_ids, stream_query, wants_ndjson
 from dependencies import verify_api_key
+from instrumentation import TimedRoute
 
-router = APIRouter(prefix="/api/v1/organizations", tags=["organizations"])
+router = APIRouter(prefix="/api/v1/organizations", tags=["organizations"], route_class=TimedRoute)
 
 
-@router.get("/search", response_model=OrganizationsResponse)
+@router.get(
+    "/search",
+    response_model=OrganizationsResponse,
+    dependencies=[Depends(conditional_get(*ORGANIZATION_TABLES))]
+)
 async def search_organizations_by_name(
-    name: str = Query(..., description="Название организации для поиска"),
-    db: Session = Depends(get_db),
+    request: Request,
+    name: str = Query(..., description="Поисковый запрос по названию, описанию и адресу организации"),
+    fuzzy: bool = Query(False, description="Нечеткий поиск по названию с учетом опечаток"),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
     api_key: str = Depends(verify_api_key)
 ):
-    """Поиск организаций по названию"""
-    organizations = db.query(Organization).filter(
-        Organization.name.ilike(f"%{name}%")
-    ).all()
+    """
+    Полнотекстовый поиск организаций (постранично, по убыванию релевантности);
+    каждое слово запроса ищется как начало слова. В режиме fuzzy слова запроса
+    сравниваются со словами названия с допуском опечаток
+    """
+    # NDJSON: все результаты потоком в порядке релевантности
+    if wants_ndjson(request):
+        search_ids = fuzzy_search_organization_ids if fuzzy else search_organization_ids
+        return ndjson_response(stream_by_ids(
+            db, await search_ids(db, name), get_organizations_by_ids, OrganizationSchema
+        ))
+    
+    if fuzzy:
+        organizations, total, next_cursor = await fuzzy_search_organizations(db, name, page)
+    else:
+        organizations, total, next_cursor = await search_organizations(db, name, page)
     
     return OrganizationsResponse(
         organizations=organizations,
-        total=len(organizations)
+        total=total,
+        next_cursor=next_cursor
     )
 
 
-@router.get("/{organization_id}", response_model=OrganizationSchema)
+@router.get(
+    "/suggest",
+    response_model=SuggestionsResponse,
+    dependencies=[Depends(conditional_get(*ORGANIZATION_TABLES))]
+)
+async def suggest_names(
+    q: str = Query(..., min_length=1, description="Начало названия организации или деятельности"),
+    limit: int = Query(10, ge=1, le=50, description="Количество подсказок"),
+    db: AsyncSession = Depends(get_async_db),
+    api_key: str = Depends(verify_api_key)
+):
+    """Подсказки при вводе: организации и деятельности, слова названия которых начинаются с q"""
+    # Используем префиксный индекс в памяти, если он построен
+    if settings.SUGGEST_INDEX_ENABLED and suggest_index.ready:
+        suggestions = [
+            Suggestion(id=item_id, name=name, type=kind)
+            for kind, item_id, name in suggest_index.suggest(q, limit)
+        ]
+        return SuggestionsResponse(suggestions=suggestions, total=len(suggestions))
+    
+    # Без индекса - те же ключи из таблицы suggest_keys в БД
+    suggestions = [
+        Suggestion(id=item_id, name=name, type=kind)
+        for kind, item_id, name in await suggest_from_db(db, q, limit)
+    ]
+    return SuggestionsResponse(suggestions=suggestions, total=len(suggestions))
+
+
+@router.get(
+    "/{organization_id}",
+    response_model=OrganizationSchema,
+    dependencies=[Depends(conditional_get(*ORGANIZATION_TABLES))]
+)
 async def get_organization(
     organization_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     api_key: str = Depends(verify_api_key)
 ):
     """Получить информацию об организации по ID"""
-    organization = db.query(Organization).filter(Organization.id == organization_id).first()
+    organization = await get_organization_by_id(db, organization_id)
     if not organization:
         raise HTTPException(status_code=404, detail="Organization not found")
     return organization
@@ -48,17 +134,18 @@ async def get_organization(
 @router.post("/", response_model=OrganizationSchema, status_code=201)
 async def create_organization(
     organization_data: OrganizationCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     api_key: str = Depends(verify_api_key)
 ):
     """Создать новую организацию"""
     # Проверяем существование здания
-    building = db.query(Building).filter(Building.id == organization_data.building_id).first()
+    building = await db.get(Building, organization_data.building_id)
     if not building:
         raise HTTPException(status_code=404, detail="Building not found")
     
     # Проверяем существование деятельностей
-    activities = db.query(Activity).filter(Activity.id.in_(organization_data.activity_ids)).all()
+    result = await db.execute(select(Activity).filter(Activity.id.in_(organization_data.activity_ids)))
+    activities = list(result.scalars().all())
     if len(activities) != len(organization_data.activity_ids):
         raise HTTPException(status_code=404, detail="Some activities not found")
     
@@ -84,56 +171,204 @@ async def create_organization(
     organization.activities = activities
     
     db.add(organization)
-    db.commit()
-    db.refresh(organization)
+    await db.commit()
+    data_changed("organizations")
     
-    return organization
+    # Обновляем индексы в памяти
+    if settings.GEO_INDEX_ENABLED and geo_index.ready:
+        geo_index.add(organization.id, organization.latitude, organization.longitude)
+    if settings.SUGGEST_INDEX_ENABLED and suggest_index.ready:
+        suggest_index.add(SUGGESTION_ORGANIZATION, organization.id, organization.name)
+    
+    return await get_organization_by_id(db, organization.id)
+
+
+@router.post("/bulk", response_model=BulkResponse)
+async def bulk_create_organizations(
+    organizations_data: List[OrganizationCreate],
+    db: AsyncSession = Depends(get_async_db),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Создать несколько организаций за один запрос (частями, со статусом каждого
+    элемента); здания и деятельности проверяются по одному запросу на весь массив
+    """
+    building_ids = await existing_ids(
+        db, Building.id, {organization_data.building_id for organization_data in organizations_data}
+    )
+    activity_ids = await existing_ids(db, Activity.id, {
+        activity_id
+        for organization_data in organizations_data
+        for activity_id in organization_data.activity_ids
+    })
+    
+    errors = {}
+    for index, organization_data in enumerate(organizations_data):
+        if organization_data.building_id not in building_ids:
+            errors[index] = "Building not found"
+        elif not activity_ids.issuperset(organization_data.activity_ids):
+            errors[index] = "Some activities not found"
+    
+    rows = [organization_data.model_dump() for organization_data in organizations_data]
+    results = await bulk_create(db, rows, errors, insert_organizations, settings.BULK_CHUNK_SIZE)
+    data_changed("organizations")
+    
+    # Обновляем индексы в памяти
+    for result in results:
+        if result.status != BULK_STATUS_CREATED:
+            continue
+        row = rows[result.index]
+        if settings.GEO_INDEX_ENABLED and geo_index.ready:
+            geo_index.add(result.id, row["latitude"], row["longitude"])
+        if settings.SUGGEST_INDEX_ENABLED and suggest_index.ready:
+            suggest_index.add(SUGGESTION_ORGANIZATION, result.id, row["name"])
+    
+    return bulk_response(results)
+
+
+async def organizations_response_by_ids(
+    request: Request,
+    db: AsyncSession,
+    organization_ids: list,
+    page: PageParams
+):
+    """
+    Ответ со страницей организаций из уже отобранного списка ID
+    или, для NDJSON, потоком всех организаций списка
+    """
+    if wants_ndjson(request):
+        return ndjson_response(stream_by_ids(
+            db, sorted(organization_ids), get_organizations_by_ids, OrganizationSchema
+        ))
+    
+    page_ids, total, next_cursor = paginate_ids(organization_ids, page)
+    return OrganizationsResponse(
+        organizations=await get_organizations_by_ids(db, page_ids),
+        total=total if page.include_total else None,
+        next_cursor=next_cursor
+    )
 
 
 @router.post("/geo/radius", response_model=OrganizationsResponse)
 async def search_organizations_by_radius(
+    request: Request,
     search_data: GeoSearchRequest,
-    db: Session = Depends(get_db),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
     api_key: str = Depends(verify_api_key)
 ):
-    """Поиск организаций в радиусе от заданной точки"""
-    organizations = db.query(Organization).all()
-    
-    # Фильтруем организации по радиусу
-    filtered_organizations = []
-    for org in organizations:
-        if org.latitude and org.longitude:
-            distance = calculate_distance(
-                search_data.latitude, search_data.longitude,
-                org.latitude, org.longitude
-            )
-            if distance <= search_data.radius_km:
-                filtered_organizations.append(org)
+    """Поиск организаций в радиусе от заданной точки (постранично)"""
+    # Используем пространственный индекс в памяти, если он построен
+    if settings.GEO_INDEX_ENABLED and geo_index.ready:
+        return await organizations_response_by_ids(request, db, geo_index.search_radius(
+            search_data.latitude, search_data.longitude, search_data.radius_km
+        ), page)
     
-    return OrganizationsResponse(
-        organizations=filtered_organizations,
-        total=len(filtered_organizations)
+    # Предварительный отбор кандидатов по ячейкам пространственной сетки
+    min_lat, max_lat, longitude_ranges = radius_bounding_box(
+        search_data.latitude, search_data.longitude, search_data.radius_km
+    )
+    cell_ranges = grid_cell_ranges(min_lat, max_lat, longitude_ranges)
+    result = await db.execute(
+        select(Organization.id, Organization.latitude, Organization.longitude)
+        .filter(grid_cell_filter(Organization.geo_cell, cell_ranges))
     )
+    
+    # Точная проверка расстояния по формуле гаверсинуса для всех кандидатов разом;
+    # полные данные загружаются только для организаций страницы
+    candidates = result.all()
+    mask = within_radius_mask(
+        search_data.latitude, search_data.longitude,
+        [candidate.latitude for candidate in candidates],
+        [candidate.longitude for candidate in candidates],
+        search_data.radius_km
+    )
+    organization_ids = list(compress([candidate.id for candidate in candidates], mask))
+    
+    return await organizations_response_by_ids(request, db, organization_ids, page)
 
 
 @router.post("/geo/rectangle", response_model=OrganizationsResponse)
 async def search_organizations_by_rectangle(
+    request: Request,
     search_data: RectangleSearchRequest,
-    db: Session = Depends(get_db),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
     api_key: str = Depends(verify_api_key)
 ):
-    """Поиск организаций в прямоугольной области"""
-    organizations = db.query(Organization).all()
+    """Поиск организаций в прямоугольной области (постранично)"""
+    # Используем пространственный индекс в памяти, если он построен
+    if settings.GEO_INDEX_ENABLED and geo_index.ready:
+        return await organizations_response_by_ids(request, db, geo_index.search_rectangle(
+            search_data.min_lat, search_data.max_lat,
+            search_data.min_lon, search_data.max_lon
+        ), page)
+    
+    # min_lon > max_lon означает область, пересекающую антимеридиан
+    longitude_ranges = rectangle_longitude_ranges(search_data.min_lon, search_data.max_lon)
+    cell_ranges = grid_cell_ranges(search_data.min_lat, search_data.max_lat, longitude_ranges)
+    
+    # Отбираем кандидатов по ячейкам сетки и уточняем по координатам
+    query = (
+        select(Organization)
+        .options(*organization_load_options())
+        .filter(grid_cell_filter(Organization.geo_cell, cell_ranges))
+        .filter(Organization.latitude.between(search_data.min_lat, search_data.max_lat))
+        .filter(or_(*(
+            Organization.longitude.between(min_lon, max_lon)
+            for min_lon, max_lon in longitude_ranges
+        )))
+    )
+    if wants_ndjson(request):
+        return ndjson_response(stream_query(db, query.order_by(Organization.id), OrganizationSchema))
     
-    # Фильтруем организации по прямоугольной области
-    filtered_organizations = []
-    for org in organizations:
-        if org.latitude and org.longitude:
-            if (search_data.min_lat <= org.latitude <= search_data.max_lat and
-                search_data.min_lon <= org.longitude <= search_data.max_lon):
-                filtered_organizations.append(org)
+    organizations, total, next_cursor = await paginate_query(db, query, Organization.id, page)
     
     return OrganizationsResponse(
-        organizations=filtered_organizations,
-        total=len(filtered_organizations)
-    ) 
\ No newline at end of file
+        organizations=organizations,
+        total=total,
+        next_cursor=next_cursor
+    )
+
+
+@router.get(
+    "/geo/nearest",
+    response_model=NearestOrganizationsResponse,
+    dependencies=[Depends(conditional_get(*ORGANIZATION_TABLES))]
+)
+async def search_nearest_organizations(
+    lat: float = Query(..., ge=-90, le=90, description="Широта точки поиска"),
+    lon: float = Query(..., ge=-180, le=180, description="Долгота точки поиска"),
+    k: int = Query(10, ge=1, le=100, description="Количество ближайших организаций"),
+    activity_id: Optional[int] = Query(None, description="ID деятельности для фильтрации"),
+    db: AsyncSession = Depends(get_async_db),
+    api_key: str = Depends(verify_api_key)
+):
+    """Поиск ближайших организаций к заданной точке (по возрастанию расстояния)"""
+    if activity_id is not None:
+        activity = await db.get(Activity, activity_id)
+        if not activity:
+            raise HTTPException(status_code=404, detail="Activity not found")
+    
+    # Индекс в памяти не хранит деятельности, поэтому фильтр по ним идет через БД
+    if activity_id is None and settings.GEO_INDEX_ENABLED and geo_index.ready:
+        nearest = geo_index.nearest(lat, lon, k)
+    else:
+        nearest = await get_nearest_organization_ids(db, lat, lon, k, activity_id)
+    
+    organizations = {
+        organization.id: organization
+        for organization in await get_organizations_by_ids(db, [organization_id for organization_id, _ in nearest])
+    }
+    nearest_organizations = [
+        OrganizationWithDistance(
+            **OrganizationSchema.model_validate(organizations[organization_id]).model_dump(),
+            distance_km=distance_km
+        )
+        for organization_id, distance_km in nearest
+    ]
+    
+    return NearestOrganizationsResponse(
+        organizations=nearest_organizations,
+        total=len(nearest_organizations)
+    )
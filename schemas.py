@@ -93,6 +93,10 @@ class Organization(OrganizationBase):
     model_config = {"from_attributes": True}
 
 
+class OrganizationWithDistance(Organization):
+    distance_km: float = Field(..., description="Расстояние до точки поиска в километрах")
+
+
 # Схемы для геопоиска
 class GeoSearchRequest(BaseModel):
     latitude: float = Field(..., ge=-90, le=90, description="Широта центра поиска")
@@ -110,17 +114,49 @@ class RectangleSearchRequest(BaseModel):
 # Схемы для ответов
 class OrganizationsResponse(BaseModel):
     organizations: List[Organization]
+    total: Optional[int]
+    next_cursor: Optional[str] = Field(None, description="Курсор следующей страницы")
+
+
+class NearestOrganizationsResponse(BaseModel):
+    organizations: List[OrganizationWithDistance]
+    total: int
+
+
+class Suggestion(BaseModel):
+    id: int
+    name: str
+    type: str = Field(..., description="Тип подсказки: organization или activity")
+
+
+class SuggestionsResponse(BaseModel):
+    suggestions: List[Suggestion]
     total: int
 
 
+class BulkItemResult(BaseModel):
+    index: int = Field(..., description="Позиция элемента в запросе")
+    status: str = Field(..., description="Статус: created или error")
+    id: Optional[int] = Field(None, description="ID созданной записи")
+    error: Optional[str] = Field(None, description="Причина ошибки")
+
+
+class BulkResponse(BaseModel):
+    results: List[BulkItemResult]
+    created: int
+    failed: int
+
+
 class BuildingsResponse(BaseModel):
     buildings: List[Building]
-    total: int
+    total: Optional[int]
+    next_cursor: Optional[str] = Field(None, description="Курсор следующей страницы")
 
 
 class ActivitiesResponse(BaseModel):
     activities: List[Activity]
-    total: int
+    total: Optional[int]
+    next_cursor: Optional[str] = Field(None, description="Курсор следующей страницы")
 
 
 # Обновляем forward references
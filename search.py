@@ -0,0 +1,189 @@
+import re
+from bisect import bisect_right
+from collections import namedtuple
+from typing import List, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import and_, column, func, literal, literal_column, or_, select, table
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import Organization, ORGANIZATION_SEARCH_TABLE, ORGANIZATION_SEARCH_VECTOR, organization_trigrams
+from pagination import PageParams, encode_cursor
+from text_search import fuzzy_match_distance, min_shared_trigrams, normalize_name, word_trigrams
+from utils import get_organizations_by_ids
+
+
+# Слова поискового запроса: последовательности букв и цифр любого алфавита
+SEARCH_TOKEN_PATTERN = re.compile(r"\w+")
+
+# Веса колонок name, description, address при ранжировании в SQLite (bm25)
+SQLITE_SEARCH_WEIGHTS = (10.0, 1.0, 1.0)
+
+# Позиция результата в выдаче по релевантности
+Match = namedtuple("Match", ["id", "rank"])
+
+# Сколько кандидатов нечеткого поиска читается из БД за одну пачку
+FUZZY_CANDIDATE_BATCH_SIZE = 500
+
+
+def search_tokens(text: str) -> List[str]:
+    """Разбивает поисковый запрос на слова в нижнем регистре"""
+    return SEARCH_TOKEN_PATTERN.findall(text.lower())
+
+
+def organization_search_query(dialect_name: str, tokens: List[str]):
+    """
+    Запрос (id, rank) организаций, содержащих все слова запроса как префиксы слов
+    названия, описания или адреса; меньший rank - более релевантный результат
+    """
+    if dialect_name == "sqlite":
+        search_table = table(ORGANIZATION_SEARCH_TABLE, column("rowid"))
+        match = " ".join(f'"{token}"*' for token in tokens)
+        return select(
+            search_table.c.rowid.label("id"),
+            func.bm25(literal_column(ORGANIZATION_SEARCH_TABLE), *SQLITE_SEARCH_WEIGHTS).label("rank")
+        ).select_from(search_table).where(
+            literal_column(ORGANIZATION_SEARCH_TABLE).op("MATCH")(match)
+        )
+
+    if dialect_name == "postgresql":
+        vector = literal_column(ORGANIZATION_SEARCH_VECTOR)
+        query = func.to_tsquery("simple", " & ".join(f"{token}:*" for token in tokens))
+        return select(
+            Organization.id.label("id"),
+            (-func.ts_rank(vector, query)).label("rank")
+        ).where(vector.op("@@")(query))
+
+    # Прочие СУБД: поиск подстроки в названии без ранжирования
+    return select(
+        Organization.id.label("id"),
+        literal(0.0).label("rank")
+    ).where(and_(*(Organization.name.ilike(f"%{token}%") for token in tokens)))
+
+
+async def ranked_organizations_page(
+    db: AsyncSession,
+    page_matches: list,
+    has_more: bool
+) -> Tuple[List[Organization], Optional[str]]:
+    """Загружает организации страницы в порядке выдачи (id, rank) и курсор следующей страницы"""
+    organizations = {
+        organization.id: organization
+        for organization in await get_organizations_by_ids(db, [match.id for match in page_matches])
+    }
+    next_cursor = encode_cursor(page_matches[-1].id, page_matches[-1].rank) if has_more else None
+    return [organizations[match.id] for match in page_matches], next_cursor
+
+
+async def search_organizations(
+    db: AsyncSession,
+    text: str,
+    page: PageParams
+) -> Tuple[List[Organization], Optional[int], Optional[str]]:
+    """
+    Полнотекстовый поиск организаций по релевантности с keyset-пагинацией по (rank, id).
+    Возвращает (организации страницы, общее количество или None, курсор следующей страницы)
+    """
+    tokens = search_tokens(text)
+    if not tokens:
+        return [], 0 if page.include_total else None, None
+    if page.after_id is not None and page.after_rank is None:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    ranked = organization_search_query(db.bind.dialect.name, tokens).subquery()
+    query = select(ranked.c.id, ranked.c.rank)
+    if page.after_id is not None:
+        query = query.where(or_(
+            ranked.c.rank > page.after_rank,
+            and_(ranked.c.rank == page.after_rank, ranked.c.id > page.after_id)
+        ))
+
+    result = await db.execute(query.order_by(ranked.c.rank, ranked.c.id).limit(page.limit + 1))
+    matches = result.all()
+    page_matches = matches[:page.limit]
+
+    total = None
+    if page.include_total:
+        result = await db.execute(select(func.count()).select_from(ranked))
+        total = result.scalar_one()
+
+    organizations, next_cursor = await ranked_organizations_page(db, page_matches, len(matches) > page.limit)
+    return organizations, total, next_cursor
+
+
+async def search_organization_ids(db: AsyncSession, text: str) -> List[int]:
+    """ID всех организаций полнотекстового поиска по убыванию релевантности (для потоковой выдачи)"""
+    tokens = search_tokens(text)
+    if not tokens:
+        return []
+
+    ranked = organization_search_query(db.bind.dialect.name, tokens).subquery()
+    result = await db.execute(select(ranked.c.id).order_by(ranked.c.rank, ranked.c.id))
+    return list(result.scalars().all())
+
+
+async def fuzzy_matches(db: AsyncSession, query_words: List[str]) -> List[Tuple[int, int]]:
+    """
+    Подходящие организации (число опечаток, id) по возрастанию. Кандидаты отбираются
+    по индексу триграмм (достаточное число общих триграмм) и читаются потоком пачками,
+    затем проверяются ограниченным расстоянием Левенштейна. Проверяются все кандидаты,
+    поэтому число совпадений (total) точное; в памяти остаются только совпадения
+    """
+    trigrams = set()
+    for word in query_words:
+        trigrams |= word_trigrams(word)
+    shared = func.count()
+    candidates = (
+        select(organization_trigrams.c.organization_id)
+        .where(organization_trigrams.c.trigram.in_(trigrams))
+        .group_by(organization_trigrams.c.organization_id)
+        .having(shared >= min_shared_trigrams(query_words))
+    ).subquery()
+    result = await db.stream(
+        select(Organization.id, Organization.name)
+        .join(candidates, candidates.c.organization_id == Organization.id)
+        .execution_options(yield_per=FUZZY_CANDIDATE_BATCH_SIZE)
+    )
+
+    matches = []
+    async for organization_id, name in result:
+        distance = fuzzy_match_distance(query_words, name)
+        if distance is not None:
+            matches.append((distance, organization_id))
+    return sorted(matches)
+
+
+async def fuzzy_search_organization_ids(db: AsyncSession, text: str) -> List[int]:
+    """ID всех организаций нечеткого поиска по возрастанию числа опечаток (для потоковой выдачи)"""
+    query_words = normalize_name(text).split()
+    if not query_words:
+        return []
+    return [organization_id for _, organization_id in await fuzzy_matches(db, query_words)]
+
+
+async def fuzzy_search_organizations(
+    db: AsyncSession,
+    text: str,
+    page: PageParams
+) -> Tuple[List[Organization], Optional[int], Optional[str]]:
+    """
+    Нечеткий поиск организаций по названию с учетом опечаток;
+    rank - суммарное число опечаток, пагинация по (rank, id)
+    """
+    query_words = normalize_name(text).split()
+    if not query_words:
+        return [], 0 if page.include_total else None, None
+    if page.after_id is not None and page.after_rank is None:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    matches = await fuzzy_matches(db, query_words)
+    start = 0
+    if page.after_id is not None:
+        start = bisect_right(matches, (page.after_rank, page.after_id))
+    page_matches = [
+        Match(id=organization_id, rank=distance)
+        for distance, organization_id in matches[start:start + page.limit]
+    ]
+
+    organizations, next_cursor = await ranked_organizations_page(
+        db, page_matches, start + page.limit < len(matches)
+    )
+    return organizations, len(matches) if page.include_total else None, next_cursor
@@ -1,7 +1,191 @@
+import argparse
+import asyncio
+import random
+import time
+from itertools import accumulate, islice
+from typing import Dict, Iterator, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database import SessionLocal, engine
+from bulk import insert_activities, insert_buildings, insert_organizations
+from config import settings
+from database import AsyncSessionLocal, SessionLocal, async_engine, engine
 from models import Base, Building, Activity, Organization, Phone
-from utils import get_child_activity_ids
+from utils import get_organizations_by_activity_hierarchy
+
+
+# Города для синтетических данных: центр, разброс координат в градусах и вес (доля зданий)
+CITY_CLUSTERS = [
+    (55.7558, 37.6176, 0.12, 12.0),  # Москва
+    (59.9386, 30.3141, 0.08, 5.0),   # Санкт-Петербург
+    (55.0084, 82.9357, 0.06, 1.5),   # Новосибирск
+    (56.8389, 60.6057, 0.05, 1.5),   # Екатеринбург
+    (55.7963, 49.1088, 0.05, 1.2),   # Казань
+    (56.3269, 44.0059, 0.05, 1.2),   # Нижний Новгород
+]
+
+# Корневые деятельности синтетического дерева
+ROOT_ACTIVITY_NAMES = [
+    "Еда", "Автомобили", "Услуги", "Строительство", "Медицина",
+    "Образование", "Одежда", "Электроника", "Туризм", "Спорт",
+]
+
+# Слова для названий синтетических организаций и улиц
+ORGANIZATION_FORMS = ["ООО", "ИП", "АО", "ЗАО"]
+ORGANIZATION_WORDS = [
+    "Рога", "Копыта", "Север", "Восток", "Лидер", "Мастер", "Гарант", "Вектор", "Альянс", "Стандарт",
+    "Прогресс", "Радуга", "Орбита", "Меридиан", "Импульс", "Сфера", "Фаворит", "Континент", "Успех", "Форум",
+]
+STREET_NAMES = ["Ленина", "Тверская", "Арбат", "Пушкина", "Гагарина", "Мира", "Садовая", "Лесная", "Школьная", "Новая"]
+
+# Максимальное число дочерних деятельностей второго и третьего уровня
+MAX_ACTIVITY_FAN_OUT = (12, 8)
+
+
+def zipf_cum_weights(count: int, exponent: float = 1.0) -> List[float]:
+    """Накопленные веса распределения Ципфа: первые элементы выбираются гораздо чаще"""
+    return list(accumulate(1.0 / (rank + 1) ** exponent for rank in range(count)))
+
+
+def skewed_fan_out(rng: random.Random, max_children: int) -> int:
+    """Число дочерних элементов с тяжелым хвостом: чаще мало, иногда много"""
+    return min(int(rng.paretovariate(1.2)), max_children)
+
+
+def generate_buildings(rng: random.Random, count: int) -> Iterator[dict]:
+    """Здания, сгруппированные вокруг центров городов (нормальный разброс координат)"""
+    cum_weights = list(accumulate(cluster[3] for cluster in CITY_CLUSTERS))
+    for number in range(1, count + 1):
+        latitude, longitude, spread, _ = rng.choices(CITY_CLUSTERS, cum_weights=cum_weights)[0]
+        yield {
+            "name": f"Здание {number}",
+            "address": f"ул. {rng.choice(STREET_NAMES)}, {rng.randint(1, 200)}",
+            "latitude": round(latitude + rng.gauss(0, spread), 6),
+            "longitude": round(longitude + rng.gauss(0, spread * 1.8), 6),
+        }
+
+
+def generate_activity_tree(rng: random.Random) -> List[List[Tuple[str, Optional[int]]]]:
+    """
+    Дерево деятельностей из трех уровней с неравномерным ветвлением: уровни
+    из пар (название, позиция родителя в предыдущем уровне)
+    """
+    levels = [[(name, None) for name in ROOT_ACTIVITY_NAMES]]
+    for max_children in MAX_ACTIVITY_FAN_OUT:
+        level = []
+        for parent_position, (parent_name, _) in enumerate(levels[-1]):
+            for number in range(1, skewed_fan_out(rng, max_children) + 1):
+                level.append((f"{parent_name} {number}", parent_position))
+        levels.append(level)
+    return levels
+
+
+def generate_organizations(
+    rng: random.Random,
+    count: int,
+    buildings: List[Tuple[int, float, float]],
+    activity_ids: List[int]
+) -> Iterator[dict]:
+    """
+    Организации в зданиях (популярные здания и деятельности выбираются чаще),
+    с 1-3 телефонами и 1-3 деятельностями; координаты совпадают с координатами здания
+    """
+    building_weights = zipf_cum_weights(len(buildings), 0.5)
+    activity_weights = zipf_cum_weights(len(activity_ids))
+    for number in range(1, count + 1):
+        building_id, latitude, longitude = rng.choices(buildings, cum_weights=building_weights)[0]
+        words = rng.sample(ORGANIZATION_WORDS, 2)
+        yield {
+            "name": f"{rng.choice(ORGANIZATION_FORMS)} '{words[0]} и {words[1]} {number}'",
+            "description": f"Организация {number}",
+            "address": f"ул. {rng.choice(STREET_NAMES)}, {rng.randint(1, 200)}",
+            "latitude": latitude,
+            "longitude": longitude,
+            "building_id": building_id,
+            "phones": [
+                {"number": f"+7-9{rng.randint(0, 99):02d}-{rng.randint(0, 9999999):07d}"}
+                for _ in range(rng.randint(1, 3))
+            ],
+            "activity_ids": rng.choices(activity_ids, cum_weights=activity_weights, k=rng.randint(1, 3)),
+        }
+
+
+async def insert_generated(db: AsyncSession, rows: Iterator[dict], insert_rows, batch_size: int) -> List[int]:
+    """Вставляет поток строк пачками, каждая пачка - в своей транзакции"""
+    ids = []
+    while batch := list(islice(rows, batch_size)):
+        ids.extend(await insert_rows(db, batch))
+        await db.commit()
+    return ids
+
+
+async def generate_large_dataset(
+    db: AsyncSession,
+    organizations: int,
+    buildings: Optional[int] = None,
+    seed: int = 42,
+    batch_size: int = settings.BULK_CHUNK_SIZE
+) -> Dict[str, int]:
+    """
+    Генерирует синтетический набор данных заданного объема; при одинаковом seed
+    данные совпадают. Организации генерируются потоком, поэтому память не растет
+    с их числом. Возвращает количество созданных записей
+    """
+    rng = random.Random(seed)
+    buildings = buildings or max(1, organizations // 10)
+
+    building_rows = list(generate_buildings(rng, buildings))
+    building_ids = await insert_generated(db, iter(building_rows), insert_buildings, batch_size)
+    building_points = [
+        (building_id, row["latitude"], row["longitude"])
+        for building_id, row in zip(building_ids, building_rows)
+    ]
+
+    # Уровни вставляются по порядку: родители получают ID раньше дочерних деятельностей
+    activity_ids: List[int] = []
+    level_ids: List[int] = []
+    for level in generate_activity_tree(rng):
+        level_ids = await insert_activities(db, [
+            {"name": name, "parent_id": level_ids[parent] if parent is not None else None}
+            for name, parent in level
+        ])
+        activity_ids.extend(level_ids)
+    await db.commit()
+
+    # Организации связываются с вложенными деятельностями; популярность
+    # не зависит от положения в дереве
+    linked_activity_ids = activity_ids[len(ROOT_ACTIVITY_NAMES):]
+    rng.shuffle(linked_activity_ids)
+
+    organization_ids = await insert_generated(
+        db, generate_organizations(rng, organizations, building_points, linked_activity_ids),
+        insert_organizations, batch_size
+    )
+    return {
+        "buildings": len(building_ids),
+        "activities": len(activity_ids),
+        "organizations": len(organization_ids),
+    }
+
+
+async def run_generate_large_dataset(organizations: int, buildings: Optional[int], seed: int, batch_size: int) -> Dict[str, int]:
+    """Генерирует синтетический набор данных в базе данных приложения"""
+    try:
+        async with AsyncSessionLocal() as db:
+            return await generate_large_dataset(db, organizations, buildings, seed, batch_size)
+    finally:
+        await async_engine.dispose()
+
+
+async def count_organizations_by_activity_hierarchy(activity_ids: List[int]) -> List[int]:
+    """Подсчитывает организации по иерархии каждой из деятельностей через асинхронную сессию"""
+    try:
+        async with AsyncSessionLocal() as db:
+            return [
+                len(await get_organizations_by_activity_hierarchy(db, activity_id))
+                for activity_id in activity_ids
+            ]
+    finally:
+        await async_engine.dispose()
 
 
 def create_test_data():
@@ -192,16 +376,12 @@ def create_test_data():
         print("\n🔍 Тестирование иерархии деятельностей:")
         
         # Тест 1: Поиск организаций по "Еда" (должны найтись все организации с едой)
-        food_orgs = db.query(Organization).join(Organization.activities).filter(
-            Activity.id.in_([food_activity.id] + get_child_activity_ids(db, food_activity.id, 3))
-        ).distinct().all()
-        print(f"   Организации в категории 'Еда': {len(food_orgs)}")
-        
         # Тест 2: Поиск организаций по "Автомобили" (должны найтись организации с автозапчастями)
-        cars_orgs = db.query(Organization).join(Organization.activities).filter(
-            Activity.id.in_([cars_activity.id] + get_child_activity_ids(db, cars_activity.id, 3))
-        ).distinct().all()
-        print(f"   Организации в категории 'Автомобили': {len(cars_orgs)}")
+        food_orgs_count, cars_orgs_count = asyncio.run(
+            count_organizations_by_activity_hierarchy([food_activity.id, cars_activity.id])
+        )
+        print(f"   Организации в категории 'Еда': {food_orgs_count}")
+        print(f"   Организации в категории 'Автомобили': {cars_orgs_count}")
         
         print("\n✅ Тестовые данные успешно созданы!")
         
@@ -213,5 +393,30 @@ def create_test_data():
         db.close()
 
 
+def create_large_dataset(organizations: int, buildings: Optional[int], seed: int, batch_size: int):
+    """Создает синтетический набор данных для проверки производительности"""
+    Base.metadata.create_all(bind=engine)
+    print(f"🌱 Генерация {organizations} организаций (seed={seed})...")
+    started = time.monotonic()
+    counts = asyncio.run(run_generate_large_dataset(organizations, buildings, seed, batch_size))
+    elapsed = time.monotonic() - started
+
+    print("\n📊 Создано:")
+    print(f"   Здания: {counts['buildings']}")
+    print(f"   Деятельности: {counts['activities']}")
+    print(f"   Организации: {counts['organizations']}")
+    print(f"\n✅ Синтетические данные созданы за {elapsed:.1f} с ({counts['organizations'] / elapsed:.0f} организаций/с)")
+
+
 if __name__ == "__main__":
-    create_test_data() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Тестовые данные: небольшой набор или синтетический набор заданного объема")
+    parser.add_argument("--organizations", type=int, help="Сгенерировать синтетический набор с этим числом организаций")
+    parser.add_argument("--buildings", type=int, help="Число зданий (по умолчанию - десятая часть организаций)")
+    parser.add_argument("--seed", type=int, default=42, help="Начальное значение генератора случайных чисел")
+    parser.add_argument("--batch-size", type=int, default=settings.BULK_CHUNK_SIZE, help="Строк в одной транзакции")
+    args = parser.parse_args()
+
+    if args.organizations:
+        create_large_dataset(args.organizations, args.buildings, args.seed, args.batch_size)
+    else:
+        create_test_data() 
\ No newline at end of file
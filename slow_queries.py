@@ -0,0 +1,140 @@
+import json
+import logging
+import time
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, List, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from config import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Сколько разных SQL-запросов хранится в статистике медленных запросов
+MAX_TRACKED_STATEMENTS = 1000
+
+# Запросы, для которых снимается план выполнения (EXPLAIN не выполняет их)
+EXPLAINABLE_PREFIXES = ("select", "with")
+
+# Как запросить план выполнения в каждой СУБД
+EXPLAIN_PREFIXES = {
+    "sqlite": "EXPLAIN QUERY PLAN ",
+    "postgresql": "EXPLAIN ",
+}
+
+# Значение, которым заменяются строковые параметры в логе
+REDACTED = "<redacted>"
+
+
+def redact_parameters(parameters) -> Any:
+    """Параметры запроса без строковых значений (в них могут быть персональные данные)"""
+    if isinstance(parameters, dict):
+        return {name: redact_parameters(value) for name, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [redact_parameters(value) for value in parameters]
+    if isinstance(parameters, (str, bytes)):
+        return REDACTED
+    return parameters
+
+
+def explain(conn, statement: str, parameters) -> Optional[str]:
+    """
+    План выполнения запроса на том же соединении. Выполняется через DBAPI-курсор,
+    минуя события движка; None, если план для СУБД или запроса не снимается
+    """
+    prefix = EXPLAIN_PREFIXES.get(conn.dialect.name)
+    if prefix is None or not statement.lstrip().lower().startswith(EXPLAINABLE_PREFIXES):
+        return None
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        rows = cursor.fetchall()
+    except Exception as error:
+        return f"EXPLAIN failed: {error}"
+    finally:
+        cursor.close()
+    if conn.dialect.name == "sqlite":
+        # Строки EXPLAIN QUERY PLAN: (id, parent, notused, detail)
+        return "\n".join(str(row[-1]) for row in rows)
+    return "\n".join(str(row[0]) for row in rows)
+
+
+class SlowQueryLog:
+    """
+    Статистика медленных запросов процесса по тексту SQL: число, суммарное
+    и максимальное время, последние параметры и план выполнения
+    """
+
+    def __init__(self, max_statements: int = MAX_TRACKED_STATEMENTS):
+        self.max_statements = max_statements
+        self._statements: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, statement: str, parameters, duration: float, plan: Optional[str]) -> Dict[str, Any]:
+        """Учитывает медленный запрос и возвращает запись для лога"""
+        entry = self._statements.get(statement)
+        if entry is None:
+            if len(self._statements) >= self.max_statements:
+                # Вытесняется запрос с наименьшим суммарным временем
+                del self._statements[min(self._statements, key=lambda key: self._statements[key]["total_ms"])]
+            entry = self._statements[statement] = {
+                "statement": statement, "count": 0, "total_ms": 0.0, "max_ms": 0.0, "plan": None
+            }
+
+        duration_ms = round(duration * 1000, 3)
+        plan_changed = plan is not None and entry["plan"] is not None and plan != entry["plan"]
+        entry["count"] += 1
+        entry["total_ms"] = round(entry["total_ms"] + duration_ms, 3)
+        entry["max_ms"] = max(entry["max_ms"], duration_ms)
+        entry["parameters"] = redact_parameters(parameters)
+        if plan is not None:
+            entry["plan"] = plan
+        return {
+            "statement": statement,
+            "parameters": entry["parameters"],
+            "duration_ms": duration_ms,
+            "plan": plan,
+            "plan_changed": plan_changed,
+        }
+
+    def top(self, limit: int) -> List[Dict[str, Any]]:
+        """Запросы с наибольшим суммарным временем"""
+        return sorted(self._statements.values(), key=lambda entry: entry["total_ms"], reverse=True)[:limit]
+
+    def clear(self) -> None:
+        self._statements.clear()
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("slow_query_started", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info["slow_query_started"].pop()
+    if not settings.SLOW_QUERY_LOG_ENABLED or duration * 1000 < settings.SLOW_QUERY_THRESHOLD_MS:
+        return
+    plan = explain(conn, statement, parameters) if settings.SLOW_QUERY_EXPLAIN and not executemany else None
+    logger.warning(json.dumps(slow_query_log.record(statement, parameters, duration, plan), ensure_ascii=False, default=str))
+
+
+def register_slow_query_log(engine: Engine) -> None:
+    """Подключает журнал медленных запросов к движку (для асинхронного - к его sync_engine)"""
+    if not event.contains(engine, "before_cursor_execute", before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+
+def configure_slow_query_file() -> None:
+    """Запись медленных запросов построчным JSON в файл с ротацией, если он задан"""
+    if settings.SLOW_QUERY_LOG_FILE and not logger.handlers:
+        handler = RotatingFileHandler(
+            settings.SLOW_QUERY_LOG_FILE,
+            maxBytes=settings.SLOW_QUERY_LOG_MAX_BYTES,
+            backupCount=settings.SLOW_QUERY_LOG_BACKUPS,
+            encoding="utf-8"
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+
+
+# Статистика медленных запросов процесса
+slow_query_log = SlowQueryLog()
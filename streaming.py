@@ -0,0 +1,75 @@
+from typing import AsyncIterator, Awaitable, Callable, Iterable, List, Type
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+# Тип содержимого построчного JSON (одна запись на строку)
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Сколько строк читается из серверного курсора за раз
+STREAM_BATCH_SIZE = 500
+
+
+def wants_ndjson(request: Request) -> bool:
+    """Запрошен ли ответ в формате NDJSON (заголовок Accept)"""
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def ndjson_response(lines: AsyncIterator[str]) -> StreamingResponse:
+    """Потоковый ответ из строк NDJSON"""
+    return StreamingResponse(lines, media_type=NDJSON_MEDIA_TYPE)
+
+
+def ndjson_line(item, schema: Type[BaseModel]) -> str:
+    """Строка NDJSON для ORM-объекта или словаря"""
+    return schema.model_validate(item).model_dump_json() + "\n"
+
+
+async def stream_query(db: AsyncSession, query, schema: Type[BaseModel]) -> AsyncIterator[str]:
+    """
+    Строки NDJSON по ORM-запросу, читаемому серверным курсором пачками.
+    Сессия запроса закрывается до отправки ответа, поэтому поток открывает
+    собственную сессию на том же движке
+    """
+    async with AsyncSession(bind=db.bind) as session:
+        result = await session.stream_scalars(query.execution_options(yield_per=STREAM_BATCH_SIZE))
+        async for item in result:
+            yield ndjson_line(item, schema)
+
+
+async def stream_partitions(
+    db: AsyncSession,
+    query,
+    build: Callable[[AsyncSession, list], Awaitable[Iterable]],
+    schema: Type[BaseModel]
+) -> AsyncIterator[str]:
+    """
+    Строки NDJSON по запросу плоских строк, читаемому серверным курсором пачками;
+    build(session, rows) превращает пачку строк в записи ответа (например,
+    догружает поддеревья). В памяти одновременно находится только одна пачка
+    """
+    async with AsyncSession(bind=db.bind) as session:
+        result = await session.stream(query.execution_options(yield_per=STREAM_BATCH_SIZE))
+        async for rows in result.partitions():
+            for item in await build(session, rows):
+                yield ndjson_line(item, schema)
+
+
+async def stream_by_ids(db: AsyncSession, ids: List[int], load, schema: Type[BaseModel]) -> AsyncIterator[str]:
+    """
+    Строки NDJSON для уже отобранных ID в заданном порядке;
+    load(session, ids) загружает объекты пачки. Записи, удаленные после отбора ID,
+    пропускаются: заголовки ответа уже отправлены, и ошибка оборвала бы поток
+    """
+    async with AsyncSession(bind=db.bind) as session:
+        for start in range(0, len(ids), STREAM_BATCH_SIZE):
+            batch = ids[start:start + STREAM_BATCH_SIZE]
+            items = {item.id: item for item in await load(session, batch)}
+            for item_id in batch:
+                item = items.get(item_id)
+                if item is not None:
+                    yield ndjson_line(item, schema)
+            session.expunge_all()
+
@@ -0,0 +1,131 @@
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import SUGGESTION_ACTIVITY, SUGGESTION_ORGANIZATION, Activity, Organization, suggest_keys
+from text_search import name_keys, normalize_name, prefix_upper_bound
+
+
+class SuggestIndex:
+    """
+    Префиксный индекс названий организаций и деятельностей в памяти процесса.
+    Ключи хранятся в отсортированном массиве, поэтому все ключи с заданным
+    префиксом лежат подряд и находятся бинарным поиском
+    """
+
+    def __init__(self):
+        self._keys: List[str] = []
+        self._entries: List[Tuple[str, int]] = []
+        self._names: Dict[Tuple[str, int], str] = {}
+        self.ready = False
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def build(self, items: Iterable[Tuple[str, int, str]]) -> None:
+        """Перестраивает индекс по набору (тип, id, название)"""
+        names = {(kind, item_id): name for kind, item_id, name in items}
+        pairs = sorted(
+            (key, entry)
+            for entry, name in names.items()
+            for key in name_keys(name)
+        )
+        self._keys = [key for key, _ in pairs]
+        self._entries = [entry for _, entry in pairs]
+        self._names = names
+        self.ready = True
+
+    def add(self, kind: str, item_id: int, name: str) -> None:
+        """Добавляет название в индекс"""
+        entry = (kind, item_id)
+        if entry in self._names:
+            self.remove(kind, item_id)
+        self._names[entry] = name
+        for key in name_keys(name):
+            position = bisect_left(self._keys, key)
+            self._keys.insert(position, key)
+            self._entries.insert(position, entry)
+
+    def remove(self, kind: str, item_id: int) -> None:
+        """Удаляет название из индекса"""
+        entry = (kind, item_id)
+        name = self._names.pop(entry, None)
+        if name is None:
+            return
+
+        for key in name_keys(name):
+            position = bisect_left(self._keys, key)
+            while position < len(self._keys) and self._keys[position] == key:
+                if self._entries[position] == entry:
+                    del self._keys[position]
+                    del self._entries[position]
+                    break
+                position += 1
+
+    def suggest(self, query: str, limit: int) -> List[Tuple[str, int, str]]:
+        """Первые limit подсказок (тип, id, название), слова которых начинаются с запроса"""
+        prefix = normalize_name(query)
+        if not prefix:
+            return []
+
+        suggestions = []
+        seen = set()
+        position = bisect_left(self._keys, prefix)
+        while position < len(self._keys) and len(suggestions) < limit:
+            if not self._keys[position].startswith(prefix):
+                break
+            entry = self._entries[position]
+            if entry not in seen:
+                seen.add(entry)
+                suggestions.append((entry[0], entry[1], self._names[entry]))
+            position += 1
+        return suggestions
+
+
+async def build_suggest_index(db: AsyncSession, index: SuggestIndex) -> None:
+    """Строит индекс по названиям организаций и деятельностей"""
+    organizations = await db.execute(select(Organization.id, Organization.name))
+    activities = await db.execute(select(Activity.id, Activity.name))
+    index.build(
+        [(SUGGESTION_ORGANIZATION, item_id, name) for item_id, name in organizations.all()]
+        + [(SUGGESTION_ACTIVITY, item_id, name) for item_id, name in activities.all()]
+    )
+
+
+async def suggest_from_db(db: AsyncSession, query: str, limit: int) -> List[Tuple[str, int, str]]:
+    """
+    Подсказки по таблице ключей suggest_keys - те же и в том же порядке, что и в индексе
+    в памяти. Ключи с префиксом читаются диапазоном по первичному ключу, названия -
+    по ID найденных записей
+    """
+    prefix = normalize_name(query)
+    if not prefix:
+        return []
+
+    result = await db.stream(
+        select(suggest_keys.c.kind, suggest_keys.c.item_id)
+        .where(suggest_keys.c.key >= prefix, suggest_keys.c.key < prefix_upper_bound(prefix))
+        .order_by(suggest_keys.c.key, suggest_keys.c.kind, suggest_keys.c.item_id)
+    )
+    entries: List[Tuple[str, int]] = []
+    try:
+        async for entry in result:
+            entry = tuple(entry)
+            if entry not in entries:
+                entries.append(entry)
+                if len(entries) >= limit:
+                    break
+    finally:
+        await result.close()
+
+    names: Dict[Tuple[str, int], str] = {}
+    for kind, model in ((SUGGESTION_ORGANIZATION, Organization), (SUGGESTION_ACTIVITY, Activity)):
+        ids = [item_id for entry_kind, item_id in entries if entry_kind == kind]
+        if ids:
+            rows = await db.execute(select(model.id, model.name).where(model.id.in_(ids)))
+            names.update(((kind, item_id), name) for item_id, name in rows.all())
+    return [(kind, item_id, names[(kind, item_id)]) for kind, item_id in entries if (kind, item_id) in names]
+
+
+# Индекс процесса; заполняется при старте приложения, если включен в настройках
+suggest_index = SuggestIndex()
@@ -1,9 +1,12 @@
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
-from database import Base, get_db
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool, StaticPool
+from database import Base, get_async_db, get_async_database_url
+from instrumentation import instrument_engine
+from slow_queries import register_slow_query_log
 from main import app
 
 
@@ -17,14 +20,19 @@ engine = create_engine(
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_engine(
+    get_async_database_url(settings.TEST_DATABASE_URL),
+    poolclass=NullPool,
+)
+instrument_engine(async_engine.sync_engine)
+register_slow_query_log(async_engine.sync_engine)
+TestingAsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 
-def override_get_db():
+async def override_get_async_db():
     """Переопределяем зависимость для тестов"""
-    try:
-        db = TestingSessionLocal()
+    async with TestingAsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
 @pytest.fixture(scope="function")
@@ -42,7 +50,7 @@ def db_session():
 @pytest.fixture(scope="function")
 def client(db_session):
     """Фикстура для тестового клиента"""
-    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
@@ -57,4 +65,17 @@ def api_key():
 @pytest.fixture
 def headers(api_key):
     """Фикстура для заголовков с API ключом"""
-    return {"X-API-Key": api_key} 
\ No newline at end of file
+    return {"X-API-Key": api_key}
+
+
+@pytest.fixture
+def query_counter():
+    """Фикстура для подсчета SQL-запросов, выполненных API"""
+    statements = []
+    
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
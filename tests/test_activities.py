@@ -0,0 +1,86 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from models import Activity
+
+
+class TestActivitiesAPI:
+    """Тесты для API деятельностей"""
+    
+    def create_hierarchy(self, db_session: Session):
+        """Создает иерархию Еда -> Мясная продукция -> Колбасы и отдельную деятельность Услуги"""
+        food = Activity(name="Еда", level=1)
+        services = Activity(name="Услуги", level=1)
+        db_session.add_all([food, services])
+        db_session.commit()
+        meat = Activity(name="Мясная продукция", level=2, parent_id=food.id)
+        db_session.add(meat)
+        db_session.commit()
+        sausages = Activity(name="Колбасы", level=3, parent_id=meat.id)
+        db_session.add(sausages)
+        db_session.commit()
+        return food, services, meat, sausages
+    
+    def test_get_activities_tree(self, client: TestClient, headers: dict, db_session: Session, query_counter: list):
+        """Тест получения дерева деятельностей постоянным числом запросов"""
+        food, services, meat, sausages = self.create_hierarchy(db_session)
+        
+        # Версии данных для ETag, страница корней, подсчет корней и поддеревья страницы
+        query_counter.clear()
+        response = client.get("/api/v1/activities", headers=headers)
+        assert response.status_code == 200
+        assert len(query_counter) == 4
+        
+        data = response.json()
+        assert data["total"] == 2
+        assert [activity["name"] for activity in data["activities"]] == ["Еда", "Услуги"]
+        meat_node = data["activities"][0]["children"][0]
+        assert meat_node["name"] == "Мясная продукция"
+        assert meat_node["children"][0]["name"] == "Колбасы"
+        assert meat_node["children"][0]["children"] == []
+    
+    def test_get_activities_tree_depth(self, client: TestClient, headers: dict, db_session: Session):
+        """Тест ограничения глубины дерева деятельностей"""
+        self.create_hierarchy(db_session)
+        
+        response = client.get("/api/v1/activities?depth=1", headers=headers)
+        assert response.status_code == 200
+        
+        food_node = response.json()["activities"][0]
+        assert food_node["children"][0]["name"] == "Мясная продукция"
+        assert food_node["children"][0]["children"] == []
+    
+    def test_get_activities_flat(self, client: TestClient, headers: dict, db_session: Session):
+        """Тест получения плоского списка деятельностей без вложенных дублей"""
+        food, services, meat, sausages = self.create_hierarchy(db_session)
+        
+        response = client.get("/api/v1/activities?flat=true", headers=headers)
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert data["total"] == 4
+        assert all(activity["children"] == [] for activity in data["activities"])
+        parents = {activity["name"]: activity["parent_id"] for activity in data["activities"]}
+        assert parents == {
+            "Еда": None,
+            "Услуги": None,
+            "Мясная продукция": food.id,
+            "Колбасы": meat.id,
+        }
+    
+    def test_get_activity_subtree(self, client: TestClient, headers: dict, db_session: Session):
+        """Тест получения деятельности с поддеревом"""
+        food, services, meat, sausages = self.create_hierarchy(db_session)
+        
+        response = client.get(f"/api/v1/activities/{meat.id}", headers=headers)
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert data["name"] == "Мясная продукция"
+        assert data["parent_id"] == food.id
+        assert [child["name"] for child in data["children"]] == ["Колбасы"]
+    
+    def test_get_activity_not_found(self, client: TestClient, headers: dict):
+        """Тест получения несуществующей деятельности"""
+        response = client.get("/api/v1/activities/999", headers=headers)
+        assert response.status_code == 404
@@ -0,0 +1,25 @@
+from benchmark import compare_with_baseline, percentile
+
+
+def benchmark_result(p50_ms: float, queries: int) -> dict:
+    return {"results": {"1000": {"geo_radius": {"p50_ms": p50_ms, "queries": queries}}}}
+
+
+class TestBenchmark:
+    """Тесты сравнения замеров с базовым прогоном"""
+    
+    def test_percentile(self):
+        """Тест перцентиля по ближайшему рангу"""
+        values = list(range(1, 101))
+        assert percentile(values, 0.5) == 50
+        assert percentile(values, 0.99) == 99
+        assert percentile([7.0], 0.95) == 7.0
+    
+    def test_compare_with_baseline(self):
+        """Тест: регрессией считается замедление выше порога и рост числа запросов"""
+        baseline = benchmark_result(10.0, 3)
+        assert compare_with_baseline(benchmark_result(11.5, 3), baseline, 0.2) == []
+        assert len(compare_with_baseline(benchmark_result(12.5, 3), baseline, 0.2)) == 1
+        assert len(compare_with_baseline(benchmark_result(9.0, 4), baseline, 0.2)) == 1
+        # Эндпоинты и объемы, которых нет в базовом прогоне, не сравниваются
+        assert compare_with_baseline(benchmark_result(50.0, 9), {"results": {}}, 0.2) == []
@@ -0,0 +1,120 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from config import settings
+from models import Building, Activity
+
+
+class TestBulkAPI:
+    """Тесты для массового создания записей"""
+    
+    def test_bulk_create_buildings(self, client: TestClient, headers: dict, db_session: Session, monkeypatch):
+        """Тест массового создания зданий частями"""
+        monkeypatch.setattr(settings, "BULK_CHUNK_SIZE", 2)
+        buildings_data = [
+            {"name": f"Здание {i}", "address": f"ул. Ленина {i}", "latitude": 55.75, "longitude": 37.61}
+            for i in range(5)
+        ]
+        response = client.post("/api/v1/buildings/bulk", json=buildings_data, headers=headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["created"] == 5
+        assert data["failed"] == 0
+        assert [result["index"] for result in data["results"]] == list(range(5))
+        
+        building = db_session.get(Building, data["results"][0]["id"])
+        assert building.name == "Здание 0"
+        assert building.geo_cell is not None
+    
+    def test_bulk_create_activities(self, client: TestClient, headers: dict, db_session: Session):
+        """Тест массового создания деятельностей с поддержкой иерархии"""
+        food = Activity(name="Еда", level=1)
+        db_session.add(food)
+        db_session.commit()
+        
+        activities_data = [
+            {"name": "Мясная продукция", "parent_id": food.id},
+            {"name": "Сироты", "parent_id": 999},
+            {"name": "Услуги"},
+        ]
+        response = client.post("/api/v1/activities/bulk", json=activities_data, headers=headers)
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [result["status"] for result in results] == ["created", "error", "created"]
+        assert results[1]["error"] == "Parent activity not found"
+        
+        # Вложенные деятельности доступны через таблицу замыкания
+        response = client.get(f"/api/v1/activities/{food.id}", headers=headers)
+        assert [child["name"] for child in response.json()["children"]] == ["Мясная продукция"]
+        
+        response = client.post("/api/v1/activities/bulk", json=[{"name": "Колбасы", "parent_id": results[0]["id"]}], headers=headers)
+        assert response.json()["created"] == 1
+        sausages_id = response.json()["results"][0]["id"]
+        response = client.get(f"/api/v1/activities/{food.id}", headers=headers)
+        assert response.json()["children"][0]["children"][0]["name"] == "Колбасы"
+        
+        # Четвертый уровень вложенности отклоняется, дерево остается корректным
+        response = client.post("/api/v1/activities/bulk", json=[{"name": "Сырокопченые", "parent_id": sausages_id}], headers=headers)
+        result = response.json()["results"][0]
+        assert (result["status"], result["error"]) == ("error", "Maximum activity nesting level exceeded")
+        response = client.get("/api/v1/activities/", headers=headers)
+        assert response.status_code == 200
+    
+    def test_create_activity_level_from_parent(self, client: TestClient, headers: dict, db_session: Session):
+        """Тест вычисления уровня вложенности по родителю при создании деятельности"""
+        parent_id = None
+        for level, name in enumerate(["Еда", "Мясная продукция", "Колбасы"], 1):
+            response = client.post("/api/v1/activities/", json={"name": name, "parent_id": parent_id}, headers=headers)
+            assert response.status_code == 201
+            assert response.json()["level"] == level
+            parent_id = response.json()["id"]
+        
+        response = client.post("/api/v1/activities/", json={"name": "Сырокопченые", "parent_id": parent_id}, headers=headers)
+        assert response.status_code == 400
+    
+    def test_bulk_create_organizations(self, client: TestClient, headers: dict, db_session: Session, query_counter: list):
+        """Тест массового создания организаций с проверкой ссылок и статусом каждого элемента"""
+        building = Building(name="Ленина", address="ул. Ленина 1", latitude=55.7558, longitude=37.6176)
+        food = Activity(name="Еда", level=1)
+        db_session.add_all([building, food])
+        db_session.commit()
+        
+        organizations_data = [
+            {
+                "name": f"ООО 'Компания {i}'",
+                "latitude": 55.7558,
+                "longitude": 37.6176,
+                "building_id": building.id,
+                "phones": [{"number": f"{i}-111"}, {"number": f"{i}-222", "type": "work"}],
+                "activity_ids": [food.id]
+            }
+            for i in range(20)
+        ]
+        organizations_data.append({**organizations_data[0], "name": "Без здания", "building_id": 999})
+        organizations_data.append({**organizations_data[0], "name": "Без деятельности", "activity_ids": [food.id, 999]})
+        
+        query_counter.clear()
+        response = client.post("/api/v1/organizations/bulk", json=organizations_data, headers=headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["created"] == 20
+        assert data["failed"] == 2
+        assert data["results"][20]["error"] == "Building not found"
+        assert data["results"][21]["error"] == "Some activities not found"
+        # Проверка ссылок, вставка (с ключами подсказок) и обновление версии данных не зависят от числа элементов
+        assert len(query_counter) == 8
+        
+        response = client.get(f"/api/v1/organizations/{data['results'][0]['id']}", headers=headers)
+        organization = response.json()
+        assert organization["name"] == "ООО 'Компания 0'"
+        assert sorted(phone["number"] for phone in organization["phones"]) == ["0-111", "0-222"]
+        assert [activity["name"] for activity in organization["activities"]] == ["Еда"]
+        
+        # Созданные записи находятся геопоиском, полнотекстовым и нечетким поиском
+        search_data = {"latitude": 55.7558, "longitude": 37.6176, "radius_km": 1.0}
+        response = client.post("/api/v1/organizations/geo/radius", json=search_data, headers=headers)
+        assert response.json()["total"] == 20
+        response = client.get("/api/v1/organizations/search", params={"name": "компания"}, headers=headers)
+        assert response.json()["total"] == 20
+        response = client.get("/api/v1/organizations/search", params={"name": "кампания", "fuzzy": True}, headers=headers)
+        assert response.json()["total"] == 20
@@ -0,0 +1,145 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from config import settings
+from models import Building, bump_data_versions_statement
+from cache import LRUCache
+
+
+class TestResponseCache:
+    """Тесты для кэша ответов"""
+    
+    def test_lru_eviction_and_ttl(self):
+        """Тест вытеснения давно не использованных записей и истечения срока жизни"""
+        now = [0.0]
+        cache = LRUCache(max_size=2, ttl=10, clock=lambda: now[0])
+        cache.set("a", 1)
+        cache.set("b", 2)
+        assert cache.get("a") == 1
+        
+        # "b" использовался давнее всех и вытесняется
+        cache.set("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+        
+        now[0] = 10.0
+        assert cache.get("a") is None
+        assert cache.stats() == {"size": 1, "max_size": 2, "hits": 2, "misses": 2}
+    
+    def test_set_after_clear_is_skipped(self):
+        """Тест отказа от сохранения ответа, вычисленного до сброса кэша"""
+        cache = LRUCache(max_size=10, ttl=60)
+        generation = cache.generation
+        cache.clear()
+        cache.set("a", 1, generation)
+        assert cache.get("a") is None
+    
+    def test_get_responses_are_cached_and_invalidated(self, client: TestClient, headers: dict, db_session: Session, monkeypatch):
+        """Тест кэширования GET-ответов и сброса кэша при создании записи"""
+        cache = LRUCache(max_size=10, ttl=60)
+        monkeypatch.setattr("cache.response_cache", cache)
+        monkeypatch.setattr(settings, "RESPONSE_CACHE_ENABLED", True)
+        
+        db_session.add(Building(name="Ленина", address="ул. Ленина 1", latitude=55.75, longitude=37.61))
+        db_session.commit()
+        
+        response = client.get("/api/v1/buildings/", headers=headers)
+        assert response.status_code == 200
+        assert response.json()["total"] == 1
+        
+        # Изменение в обход API не видно до истечения срока жизни
+        db_session.add(Building(name="Пушкина", address="ул. Пушкина 10", latitude=55.75, longitude=37.61))
+        db_session.commit()
+        response = client.get("/api/v1/buildings/", headers=headers)
+        assert response.json()["total"] == 1
+        assert cache.hits == 1
+        
+        # Другие параметры запроса - другой ключ
+        response = client.get("/api/v1/buildings/", params={"limit": 1}, headers=headers)
+        assert response.json()["total"] == 2
+        
+        # Без верного API ключа кэш не используется
+        response = client.get("/api/v1/buildings/", headers={"X-API-Key": "wrong"})
+        assert response.status_code == 401
+        
+        # Создание через API сбрасывает кэш
+        building_data = {"name": "Гагарина", "address": "ул. Гагарина 3", "latitude": 55.7, "longitude": 37.6}
+        response = client.post("/api/v1/buildings", json=building_data, headers=headers)
+        assert response.status_code == 201
+        response = client.get("/api/v1/buildings/", headers=headers)
+        assert response.json()["total"] == 3
+        
+        response = client.get("/cache/stats", headers=headers)
+        assert response.json() == {"enabled": True, "size": 1, "max_size": 10, "hits": 1, "misses": 3}
+
+
+class TestConditionalRequests:
+    """Тесты для ETag и условных запросов"""
+    
+    def test_not_modified_with_single_version_query(self, client: TestClient, headers: dict, db_session: Session, query_counter: list):
+        """Тест ответа 304 по совпадающему ETag одним запросом версий и смены ETag после записи"""
+        response = client.get("/api/v1/activities/", headers=headers)
+        assert response.status_code == 200
+        etag = response.headers["etag"]
+        
+        query_counter.clear()
+        response = client.get("/api/v1/activities/", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+        assert response.content == b""
+        assert len(query_counter) == 1
+        assert "data_versions" in query_counter[0]
+        
+        # ETag зависит от параметров запроса и не выдается без API ключа
+        response = client.get("/api/v1/activities/", params={"flat": True}, headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 200
+        response = client.get("/api/v1/activities/", headers={"X-API-Key": "wrong", "If-None-Match": etag})
+        assert response.status_code == 401
+        
+        # Запись через API меняет версию таблицы
+        response = client.post("/api/v1/activities", json={"name": "Еда"}, headers=headers)
+        assert response.status_code == 201
+        response = client.get("/api/v1/activities/", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert response.json()["total"] == 1
+        
+        # Версия зданий от записи деятельностей не меняется
+        response = client.get("/api/v1/buildings/", headers=headers)
+        buildings_etag = response.headers["etag"]
+        client.post("/api/v1/activities", json={"name": "Услуги"}, headers=headers)
+        response = client.get("/api/v1/buildings/", headers={**headers, "If-None-Match": f'W/{buildings_etag}'})
+        assert response.status_code == 304
+    
+    def test_etag_changes_after_write_outside_api(self, client: TestClient, headers: dict, db_session: Session):
+        """Тест смены ETag после записи в обход API (другой процесс, импорт, генерация данных)"""
+        etag = client.get("/api/v1/buildings/", headers=headers).headers["etag"]
+        
+        # Запись через ORM в другой сессии
+        db_session.add(Building(name="Ленина", address="ул. Ленина 1", latitude=55.7558, longitude=37.6176))
+        db_session.commit()
+        response = client.get("/api/v1/buildings/", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()["total"] == 1
+        
+        # Запись через Core с увеличением версии, как в bulk.py
+        etag = response.headers["etag"]
+        db_session.execute(bump_data_versions_statement("buildings"))
+        db_session.commit()
+        response = client.get("/api/v1/buildings/", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+    
+    def test_not_modified_from_response_cache(self, client: TestClient, headers: dict, db_session: Session, monkeypatch):
+        """Тест ответа 304 для ответа из кэша"""
+        monkeypatch.setattr("cache.response_cache", LRUCache(max_size=10, ttl=60))
+        monkeypatch.setattr(settings, "RESPONSE_CACHE_ENABLED", True)
+        
+        etag = client.get("/api/v1/buildings/", headers=headers).headers["etag"]
+        response = client.get("/api/v1/buildings/", headers=headers)
+        assert response.status_code == 200
+        assert response.headers["etag"] == etag
+        
+        response = client.get("/api/v1/buildings/", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
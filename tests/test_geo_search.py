@@ -1,6 +1,8 @@
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
+from config import settings
+from geo_index import GeoIndex
 from models import Organization, Building, Activity
 
 
@@ -132,6 +134,241 @@ class TestGeoSearchAPI:
         assert "ООО 'Ленина'" in org_names
         assert "ИП 'Пушкина'" in org_names
     
+    def test_search_organizations_by_radius_paginated(self, client: TestClient, headers: dict, db_session: Session):
+        """Тест постраничной выдачи результатов поиска в радиусе"""
+        building = Building(
+            name="Ленина",
+            address="г. Москва, ул. Ленина 1",
+            latitude=55.7558,
+            longitude=37.6176
+        )
+        db_session.add(building)
+        db_session.commit()
+        db_session.add_all([
+            Organization(
+                name=f"ООО 'Компания {i}'",
+                building_id=building.id,
+                latitude=55.7558 + i * 0.001,
+                longitude=37.6176
+            )
+            for i in range(3)
+        ])
+        db_session.commit()
+        
+        search_data = {"latitude": 55.7558, "longitude": 37.6176, "radius_km": 5.0}
+        response = client.post("/api/v1/organizations/geo/radius", params={"limit": 2}, json=search_data, headers=headers)
+        assert response.status_code == 200
+        first_page = response.json()
+        assert first_page["total"] == 3
+        assert [org["name"] for org in first_page["organizations"]] == ["ООО 'Компания 0'", "ООО 'Компания 1'"]
+        
+        response = client.post(
+            "/api/v1/organizations/geo/radius",
+            params={"limit": 2, "cursor": first_page["next_cursor"]},
+            json=search_data,
+            headers=headers
+        )
+        assert response.status_code == 200
+        second_page = response.json()
+        assert [org["name"] for org in second_page["organizations"]] == ["ООО 'Компания 2'"]
+        assert second_page["next_cursor"] is None
+    
+    def test_search_organizations_by_radius_across_antimeridian(self, client: TestClient, headers: dict, db_session: Session):
+        """Тест поиска в радиусе вблизи антимеридиана"""
+        building = Building(
+            name="Анадырь",
+            address="г. Анадырь",
+            latitude=64.7337,
+            longitude=177.4968
+        )
+        db_session.add(building)
+        db_session.commit()
+        
+        org_east = Organization(name="ООО 'Восток'", building_id=building.id, latitude=65.0, longitude=179.95)
+        org_west = Organization(name="ООО 'Запад'", building_id=building.id, latitude=65.0, longitude=-179.95)
+        org_far = Organization(name="ООО 'Далеко'", building_id=building.id, latitude=65.0, longitude=-175.0)
+        db_session.add_all([org_east, org_west, org_far])
+        db_session.commit()
+        
+        search_data = {"latitude": 65.0, "longitude": 179.99, "radius_km": 10.0}
+        response = client.post("/api/v1/organizations/geo/radius", json=search_data, headers=headers)
+        assert response.status_code == 200
+        
+        org_names = [org["name"] for org in response.json()["organizations"]]
+        assert sorted(org_names) == ["ООО 'Восток'", "ООО 'Запад'"]
+    
+    def test_search_organizations_by_radius_near_pole(self, client: TestClient, headers: dict, db_session: Session):
+        """Тест поиска в радиусе, накрывающем полюс"""
+        building = Building(
+            name="Полярная станция",
+            address="Северный полюс",
+            latitude=89.9,
+            longitude=0.0
+        )
+        db_session.add(building)
+        db_session.commit()
+        
+        org1 = Organization(name="ООО 'Полюс'", building_id=building.id, latitude=89.95, longitude=-120.0)
+        org2 = Organization(name="ООО 'Льдина'", building_id=building.id, latitude=89.95, longitude=60.0)
+        db_session.add_all([org1, org2])
+        db_session.commit()
+        
+        search_data = {"latitude": 89.95, "longitude": 0.0, "radius_km": 15.0}
+        response = client.post("/api/v1/organizations/geo/radius", json=search_data, headers=headers)
+        assert response.status_code == 200
+        
+        org_names = [org["name"] for org in response.json()["organizations"]]
+        assert sorted(org_names) == ["ООО 'Льдина'", "ООО 'Полюс'"]
+    
+    def test_search_organizations_by_rectangle_across_antimeridian(self, client: TestClient, headers: dict, db_session: Session):
+        """Тест поиска в прямоугольной области, пересекающей антимеридиан"""
+        building = Building(
+            name="Фиджи",
+            address="Сува",
+            latitude=-18.1416,
+            longitude=178.4419
+        )
+        db_session.add(building)
+        db_session.commit()
+        
+        org_east = Organization(name="ООО 'Восток'", building_id=building.id, latitude=-18.0, longitude=179.5)
+        org_west = Organization(name="ООО 'Запад'", building_id=building.id, latitude=-18.0, longitude=-179.5)
+        org_outside = Organization(name="ООО 'Снаружи'", building_id=building.id, latitude=-18.0, longitude=0.0)
+        db_session.add_all([org_east, org_west, org_outside])
+        db_session.commit()
+        
+        search_data = {
+            "min_lat": -19.0,
+            "max_lat": -17.0,
+            "min_lon": 179.0,
+            "max_lon": -179.0
+        }
+        response = client.post("/api/v1/organizations/geo/rectangle", json=search_data, headers=headers)
+        assert response.status_code == 200
+        
+        org_names = [org["name"] for org in response.json()["organizations"]]
+        assert sorted(org_names) == ["ООО 'Восток'", "ООО 'Запад'"]
+    
+    def test_geo_search_with_memory_index(self, client: TestClient, headers: dict, db_session: Session, monkeypatch):
+        """Тест геопоиска через пространственный индекс в памяти"""
+        building = Building(
+            name="Красная площадь",
+            address="г. Москва, Красная площадь",
+            latitude=55.7539,
+            longitude=37.6208
+        )
+        db_session.add(building)
+        db_session.commit()
+        
+        org_near = Organization(name="ООО 'Рядом'", building_id=building.id, latitude=55.7539, longitude=37.6208)
+        org_far = Organization(name="ООО 'Далеко'", building_id=building.id, latitude=59.9343, longitude=30.3351)
+        db_session.add_all([org_near, org_far])
+        db_session.commit()
+        
+        # Строим индекс по тестовой БД
+        index = GeoIndex()
+        index.build(db_session.query(Organization.id, Organization.latitude, Organization.longitude).all())
+        monkeypatch.setattr("routers.organizations.geo_index", index)
+        monkeypatch.setattr(settings, "GEO_INDEX_ENABLED", True)
+        
+        # Новая организация попадает в индекс при создании
+        org_data = {
+            "name": "ООО 'Новая'",
+            "latitude": 55.7575,
+            "longitude": 37.6136,
+            "building_id": building.id,
+            "phones": [],
+            "activity_ids": []
+        }
+        response = client.post("/api/v1/organizations", json=org_data, headers=headers)
+        assert response.status_code == 201
+        assert len(index) == 3
+        
+        search_data = {"latitude": 55.7539, "longitude": 37.6208, "radius_km": 1.0}
+        response = client.post("/api/v1/organizations/geo/radius", json=search_data, headers=headers)
+        assert response.status_code == 200
+        org_names = [org["name"] for org in response.json()["organizations"]]
+        assert org_names == ["ООО 'Рядом'", "ООО 'Новая'"]
+        
+        search_data = {"min_lat": 59.0, "max_lat": 60.0, "min_lon": 30.0, "max_lon": 31.0}
+        response = client.post("/api/v1/organizations/geo/rectangle", json=search_data, headers=headers)
+        assert response.status_code == 200
+        org_names = [org["name"] for org in response.json()["organizations"]]
+        assert org_names == ["ООО 'Далеко'"]
+    
+    def test_calculate_distances_matches_scalar(self, monkeypatch):
+        """Тест векторизованного расчета расстояний и его скалярного варианта"""
+        import utils
+        
+        latitudes = [55.7539, 55.7575, 59.9343, -33.8688]
+        longitudes = [37.6208, 37.6136, 30.3351, 151.2093]
+        expected = [utils.calculate_distance(55.7539, 37.6208, lat, lon) for lat, lon in zip(latitudes, longitudes)]
+        
+        distances = utils.calculate_distances(55.7539, 37.6208, latitudes, longitudes)
+        assert list(distances) == pytest.approx(expected)
+        assert list(utils.within_radius_mask(55.7539, 37.6208, latitudes, longitudes, 1.0)) == [True, True, False, False]
+        
+        # Без NumPy используется скалярная реализация
+        monkeypatch.setattr(utils, "np", None)
+        assert utils.calculate_distances(55.7539, 37.6208, latitudes, longitudes) == pytest.approx(expected)
+        assert utils.within_radius_mask(55.7539, 37.6208, latitudes, longitudes, 1.0) == [True, True, False, False]
+    
+    def test_search_nearest_organizations(self, client: TestClient, headers: dict, db_session: Session, monkeypatch):
+        """Тест поиска ближайших организаций с сортировкой по расстоянию"""
+        building = Building(
+            name="Красная площадь",
+            address="г. Москва, Красная площадь",
+            latitude=55.7539,
+            longitude=37.6208
+        )
+        activity = Activity(name="Еда", level=1)
+        db_session.add_all([building, activity])
+        db_session.commit()
+        
+        org_center = Organization(name="ООО 'Центр'", building_id=building.id, latitude=55.7539, longitude=37.6208)
+        org_arbat = Organization(name="ООО 'Арбат'", building_id=building.id, latitude=55.7494, longitude=37.5931)
+        org_spb = Organization(name="ООО 'Петербург'", building_id=building.id, latitude=59.9343, longitude=30.3351)
+        org_tverskaya = Organization(name="ИП 'Тверская'", building_id=building.id, latitude=55.7575, longitude=37.6136)
+        db_session.add_all([org_center, org_arbat, org_spb, org_tverskaya])
+        db_session.commit()
+        org_spb.activities.append(activity)
+        org_arbat.activities.append(activity)
+        db_session.commit()
+        
+        params = {"lat": 55.7539, "lon": 37.6208, "k": 3}
+        response = client.get("/api/v1/organizations/geo/nearest", params=params, headers=headers)
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert data["total"] == 3
+        assert [org["name"] for org in data["organizations"]] == ["ООО 'Центр'", "ИП 'Тверская'", "ООО 'Арбат'"]
+        distances = [org["distance_km"] for org in data["organizations"]]
+        assert distances == sorted(distances)
+        assert distances[0] == pytest.approx(0.0)
+        
+        # Фильтр по деятельности требует расширения радиуса до Петербурга
+        params = {"lat": 55.7539, "lon": 37.6208, "k": 5, "activity_id": activity.id}
+        response = client.get("/api/v1/organizations/geo/nearest", params=params, headers=headers)
+        assert response.status_code == 200
+        assert [org["name"] for org in response.json()["organizations"]] == ["ООО 'Арбат'", "ООО 'Петербург'"]
+        
+        # Тот же результат через индекс в памяти
+        index = GeoIndex()
+        index.build(db_session.query(Organization.id, Organization.latitude, Organization.longitude).all())
+        monkeypatch.setattr("routers.organizations.geo_index", index)
+        monkeypatch.setattr(settings, "GEO_INDEX_ENABLED", True)
+        response = client.get("/api/v1/organizations/geo/nearest", params={"lat": 55.7539, "lon": 37.6208, "k": 10}, headers=headers)
+        assert response.status_code == 200
+        assert [org["name"] for org in response.json()["organizations"]] == [
+            "ООО 'Центр'", "ИП 'Тверская'", "ООО 'Арбат'", "ООО 'Петербург'"
+        ]
+    
+    def test_search_nearest_organizations_unknown_activity(self, client: TestClient, headers: dict):
+        """Тест поиска ближайших организаций по несуществующей деятельности"""
+        params = {"lat": 55.7539, "lon": 37.6208, "activity_id": 999}
+        response = client.get("/api/v1/organizations/geo/nearest", params=params, headers=headers)
+        assert response.status_code == 404
+    
     def test_search_organizations_by_activity_hierarchy(self, client: TestClient, headers: dict, db_session: Session):
         """Тест поиска организаций по иерархии деятельности"""
         # Создаем иерархию деятельностей
@@ -194,6 +431,91 @@ class TestGeoSearchAPI:
         assert "ООО 'Мясо'" in org_names
         assert "ИП 'Молоко'" in org_names
     
+    def test_search_organizations_by_activity_hierarchy_level(self, client: TestClient, headers: dict, db_session: Session):
+        """Тест ограничения глубины поиска по иерархии деятельностей"""
+        cars = Activity(name="Автомобили", level=1)
+        passenger = Activity(name="Легковые", level=2)
+        parts = Activity(name="Запчасти", level=3)
+        db_session.add_all([cars, passenger, parts])
+        db_session.commit()
+        
+        # Связи устанавливаются после создания - таблица замыкания должна обновиться
+        parts.parent_id = passenger.id
+        passenger.parent_id = cars.id
+        db_session.commit()
+        
+        building = Building(
+            name="Ленина",
+            address="г. Москва, ул. Ленина 1",
+            latitude=55.7558,
+            longitude=37.6176
+        )
+        db_session.add(building)
+        db_session.commit()
+        
+        org_passenger = Organization(name="ООО 'Легковые'", building_id=building.id)
+        org_parts = Organization(name="ООО 'Запчасти'", building_id=building.id)
+        db_session.add_all([org_passenger, org_parts])
+        db_session.commit()
+        org_passenger.activities.append(passenger)
+        org_parts.activities.append(parts)
+        db_session.commit()
+        
+        response = client.get(f"/api/v1/activities/{cars.id}/organizations/hierarchy?level=1", headers=headers)
+        assert response.status_code == 200
+        assert [org["name"] for org in response.json()["organizations"]] == ["ООО 'Легковые'"]
+        
+        response = client.get(f"/api/v1/activities/{cars.id}/organizations/hierarchy?level=2", headers=headers)
+        assert response.status_code == 200
+        org_names = sorted(org["name"] for org in response.json()["organizations"])
+        assert org_names == ["ООО 'Запчасти'", "ООО 'Легковые'"]
+    
+    def test_activity_hierarchy_is_deduplicated_and_paginated(self, client: TestClient, headers: dict, db_session: Session):
+        """Тест отсутствия повторов, учета корневой деятельности и пагинации в поиске по иерархии"""
+        food = Activity(name="Еда", level=1)
+        db_session.add(food)
+        db_session.commit()
+        meat = Activity(name="Мясная продукция", level=2, parent_id=food.id)
+        milk = Activity(name="Молочная продукция", level=2, parent_id=food.id)
+        db_session.add_all([meat, milk])
+        db_session.commit()
+        
+        building = Building(
+            name="Ленина",
+            address="г. Москва, ул. Ленина 1",
+            latitude=55.7558,
+            longitude=37.6176
+        )
+        db_session.add(building)
+        db_session.commit()
+        
+        # Организация с несколькими деятельностями из поддерева и организация с самой "Едой"
+        org_market = Organization(name="ООО 'Рынок'", building_id=building.id)
+        org_market.activities = [meat, milk]
+        org_food = Organization(name="ООО 'Еда'", building_id=building.id)
+        org_food.activities = [food]
+        org_milk = Organization(name="ИП 'Молоко'", building_id=building.id)
+        org_milk.activities = [milk]
+        db_session.add_all([org_market, org_food, org_milk])
+        db_session.commit()
+        
+        url = f"/api/v1/activities/{food.id}/organizations/hierarchy"
+        response = client.get(url, params={"level": 3, "limit": 2}, headers=headers)
+        assert response.status_code == 200
+        first_page = response.json()
+        assert first_page["total"] == 3
+        assert [org["name"] for org in first_page["organizations"]] == ["ООО 'Рынок'", "ООО 'Еда'"]
+        assert first_page["next_cursor"]
+        
+        response = client.get(url, params={"level": 3, "limit": 2, "cursor": first_page["next_cursor"]}, headers=headers)
+        assert response.status_code == 200
+        second_page = response.json()
+        assert [org["name"] for org in second_page["organizations"]] == ["ИП 'Молоко'"]
+        assert second_page["next_cursor"] is None
+        
+        response = client.get(url, params={"level": 3, "cursor": "not-a-cursor"}, headers=headers)
+        assert response.status_code == 400
+    
     def test_activity_level_limit(self, client: TestClient, headers: dict, db_session: Session):
         """Тест ограничения уровня вложенности деятельностей"""
         # Создаем деятельность с уровнем больше 3
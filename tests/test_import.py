@@ -0,0 +1,152 @@
+import asyncio
+import json
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from import_data import OrganizationImporter, detect_format, import_records, read_records
+from models import Activity, Organization
+from tests.conftest import TestingAsyncSessionLocal
+
+
+def run_import(entity: str, path, batch_size: int = 2, defer_indexes: bool = False):
+    """Импортирует файл в тестовую базу данных"""
+    async def run():
+        async with TestingAsyncSessionLocal() as db:
+            return await import_records(
+                db, entity, read_records(path, detect_format(path)), batch_size, defer_indexes
+            )
+    return asyncio.run(run())
+
+
+class TestImport:
+    """Тесты потокового импорта из CSV и JSONL"""
+    
+    def test_import_csv_and_jsonl(self, client: TestClient, headers: dict, db_session: Session, tmp_path):
+        """Тест импорта зданий, деятельностей и организаций с разрешением названий в ID"""
+        buildings_path = tmp_path / "buildings.csv"
+        buildings_path.write_text(
+            "name,address,latitude,longitude\n"
+            "Ленина,ул. Ленина 1,55.7558,37.6176\n"
+            "Без адреса,,55.7,37.6\n"
+            "Тверская,ул. Тверская 1,55.7575,37.6136\n",
+            encoding="utf-8"
+        )
+        report = run_import("buildings", buildings_path)
+        assert (report.rows, report.imported, report.skipped) == (3, 2, 1)
+        assert "address" in report.errors[0]
+        
+        # Дочерние деятельности ссылаются на родителя из той же пачки
+        activities_path = tmp_path / "activities.csv"
+        activities_path.write_text(
+            "name,parent\n"
+            "Еда,\n"
+            "Мясная продукция,Еда\n"
+            "Колбасы,Мясная продукция\n"
+            "Сироты,Неизвестно\n",
+            encoding="utf-8"
+        )
+        report = run_import("activities", activities_path, batch_size=10)
+        assert (report.imported, report.skipped) == (3, 1)
+        sausages = db_session.query(Activity).filter(Activity.name == "Колбасы").one()
+        assert sausages.level == 3
+        
+        organizations_path = tmp_path / "organizations.jsonl"
+        organizations_path.write_text("\n".join(json.dumps(record, ensure_ascii=False) for record in [
+            {"name": "ООО 'Колбасный цех'", "building": "Ленина", "latitude": 55.7558, "longitude": 37.6176,
+             "phones": ["1-111", "2-222"], "activities": ["Колбасы"]},
+            {"name": "ООО 'Мясная лавка'", "building": "Тверская", "activities": ["Мясная продукция"]},
+            {"name": "ООО 'Булочная'", "building": "Нет такого"},
+        ]), encoding="utf-8")
+        report = run_import("organizations", organizations_path, defer_indexes=True)
+        assert (report.imported, report.skipped) == (2, 1)
+        
+        food = db_session.query(Activity).filter(Activity.name == "Еда").one()
+        response = client.get(f"/api/v1/activities/{food.id}/organizations/hierarchy", params={"level": 3}, headers=headers)
+        organizations = {organization["name"]: organization for organization in response.json()["organizations"]}
+        assert set(organizations) == {"ООО 'Колбасный цех'", "ООО 'Мясная лавка'"}
+        assert sorted(phone["number"] for phone in organizations["ООО 'Колбасный цех'"]["phones"]) == ["1-111", "2-222"]
+        
+        # Полнотекстовый индекс перестроен после загрузки и снова обновляется триггером
+        response = client.get("/api/v1/organizations/search", params={"name": "колбасный"}, headers=headers)
+        assert response.json()["total"] == 1
+        response = client.post("/api/v1/organizations/", json={"name": "Колбасный двор", "building_id": 1, "phones": [], "activity_ids": []}, headers=headers)
+        assert response.status_code == 201
+        response = client.get("/api/v1/organizations/search", params={"name": "колбасный"}, headers=headers)
+        assert response.json()["total"] == 2
+    
+    def test_import_skips_invalid_rows_and_failed_batches(self, client: TestClient, headers: dict, db_session: Session, tmp_path, monkeypatch):
+        """Тест пропуска неизвестного building_id, телефона без номера и пачки с ошибкой БД"""
+        building_id = client.post(
+            "/api/v1/buildings/",
+            json={"name": "Ленина", "address": "ул. Ленина 1", "latitude": 55.7558, "longitude": 37.6176},
+            headers=headers
+        ).json()["id"]
+        
+        insert_organizations = OrganizationImporter.insert_rows
+        
+        async def failing_insert(db, rows):
+            if any(row["name"] == "Сбой" for row in rows):
+                raise OperationalError("INSERT", {}, Exception("database is locked"))
+            return await insert_organizations(db, rows)
+        
+        monkeypatch.setattr(OrganizationImporter, "insert_rows", staticmethod(failing_insert))
+        
+        organizations_path = tmp_path / "organizations.jsonl"
+        organizations_path.write_text("\n".join(json.dumps(record, ensure_ascii=False) for record in [
+            {"name": "Нет здания", "building_id": "999"},
+            {"name": "Без номера", "building_id": building_id, "phones": [{"type": "work"}]},
+            {"name": "Первая", "building_id": building_id, "phones": [{"number": "1-111", "type": "work"}]},
+            {"name": "Сбой", "building_id": building_id},
+            {"name": "Третья", "building_id": building_id},
+            {"name": "Четвертая", "building_id": building_id},
+        ]), encoding="utf-8")
+        report = run_import("organizations", organizations_path)
+        assert (report.rows, report.imported, report.skipped) == (6, 2, 4)
+        assert "ID 999" in report.errors[0]
+        assert "номер" in report.errors[1]
+        assert report.errors[2].startswith("строки 3-4:")
+        
+        names = {organization.name for organization in db_session.query(Organization).all()}
+        assert names == {"Третья", "Четвертая"}
+    
+    def test_import_skips_malformed_and_out_of_range_rows(self, client: TestClient, headers: dict, db_session: Session, tmp_path):
+        """Тест пропуска некорректного JSON, координат вне диапазона, неизвестного parent_id и четвертого уровня"""
+        buildings_path = tmp_path / "buildings.jsonl"
+        buildings_path.write_text("\n".join([
+            json.dumps({"name": "Ленина", "address": "ул. Ленина 1", "latitude": 55.7558, "longitude": 37.6176}),
+            '{"name": "Обрыв", "address": ',
+            json.dumps(["не", "объект"]),
+            json.dumps({"name": "Север", "address": "ул. Полярная 1", "latitude": 200, "longitude": 37.6}),
+            json.dumps({"name": "Восток", "address": "ул. Восточная 1", "latitude": 55.7, "longitude": -181}),
+        ]), encoding="utf-8")
+        report = run_import("buildings", buildings_path)
+        assert (report.rows, report.imported, report.skipped) == (5, 1, 4)
+        assert report.errors[0].startswith("строка 2: Некорректный JSON")
+        assert "latitude" in report.errors[2] and "longitude" in report.errors[3]
+        
+        activities_path = tmp_path / "activities.csv"
+        activities_path.write_text(
+            "name,parent,parent_id\n"
+            "Еда,,\n"
+            "Мясная продукция,Еда,\n"
+            "Колбасы,Мясная продукция,\n"
+            "Сырокопченые,Колбасы,\n"
+            "Сироты,,99999\n",
+            encoding="utf-8"
+        )
+        report = run_import("activities", activities_path, batch_size=10)
+        assert (report.imported, report.skipped) == (3, 2)
+        assert "уровень вложенности" in report.errors[0]
+        assert "ID 99999" in report.errors[1]
+        
+        organizations_path = tmp_path / "organizations.jsonl"
+        organizations_path.write_text(
+            json.dumps({"name": "Южная", "building": "Ленина", "latitude": -91, "longitude": 37.6}, ensure_ascii=False),
+            encoding="utf-8"
+        )
+        report = run_import("organizations", organizations_path)
+        assert (report.imported, report.skipped) == (0, 1)
+        
+        response = client.get("/api/v1/activities/", headers=headers)
+        assert response.status_code == 200
+        assert response.json()["total"] == 1
@@ -0,0 +1,76 @@
+import re
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from cache import LRUCache
+from config import settings
+from metrics import Histogram, request_metrics
+from models import Building
+
+
+def server_timing(response) -> dict:
+    """Длительности из заголовка Server-Timing"""
+    return {
+        name: float(duration)
+        for name, duration in re.findall(r"(\w+);dur=([\d.]+)", response.headers["server-timing"])
+    }
+
+
+class TestMetrics:
+    """Тесты метрик запросов и заголовка Server-Timing"""
+    
+    def test_histogram_buckets(self):
+        """Тест распределения наблюдений по корзинам"""
+        histogram = Histogram((0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 5.0):
+            histogram.observe(value)
+        assert histogram.counts == [2, 1, 1]
+        assert histogram.count == 4
+        assert histogram.sum == 5.65
+    
+    def test_server_timing(self, client: TestClient, headers: dict, db_session: Session):
+        """Тест разбивки времени ответа на БД, сериализацию и прочую обработку"""
+        db_session.add(Building(name="Ленина", address="ул. Ленина 1", latitude=55.75, longitude=37.61))
+        db_session.commit()
+        
+        response = client.get("/api/v1/buildings/", headers=headers)
+        assert response.status_code == 200
+        timing = server_timing(response)
+        assert set(timing) == {"db", "serialize", "app", "total"}
+        assert timing["db"] > 0
+        assert timing["total"] >= timing["db"] + timing["serialize"] - 0.02
+    
+    def test_metrics_endpoint(self, client: TestClient, headers: dict, db_session: Session):
+        """Тест метрик в формате Prometheus с метками по шаблонам маршрутов"""
+        request_metrics.clear()
+        client.get("/api/v1/buildings/", headers=headers)
+        client.get("/api/v1/buildings/1", headers=headers)
+        client.get("/api/v1/buildings/2", headers=headers)
+        client.get("/no-such-path")
+        
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        text = response.text
+        
+        assert 'http_request_duration_seconds_count{method="GET",route="/api/v1/buildings/{building_id}"} 2' in text
+        assert 'http_request_duration_seconds_bucket{method="GET",route="/api/v1/buildings/",le="+Inf"} 1' in text
+        assert 'http_responses_total{method="GET",route="/api/v1/buildings/{building_id}",status="404"} 2' in text
+        assert 'http_responses_total{method="GET",route="unmatched",status="404"} 1' in text
+        assert 'http_response_size_bytes_count{method="GET",route="/api/v1/buildings/"} 1' in text
+        # Запрос к /metrics еще обрабатывается
+        assert "http_requests_in_flight 1" in text
+    
+    def test_cached_responses_counted_under_route(self, client: TestClient, headers: dict, db_session: Session, monkeypatch):
+        """Тест учета ответов из кэша по шаблону маршрута, а не как unmatched"""
+        monkeypatch.setattr("cache.response_cache", LRUCache(max_size=10, ttl=60))
+        monkeypatch.setattr(settings, "RESPONSE_CACHE_ENABLED", True)
+        db_session.add(Building(name="Ленина", address="ул. Ленина 1", latitude=55.75, longitude=37.61))
+        db_session.commit()
+        
+        request_metrics.clear()
+        for _ in range(3):
+            assert client.get("/api/v1/buildings/1", headers=headers).status_code == 200
+        
+        text = client.get("/metrics").text
+        assert 'http_responses_total{method="GET",route="/api/v1/buildings/{building_id}",status="200"} 3' in text
+        assert 'route="unmatched"' not in text
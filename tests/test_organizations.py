@@ -2,6 +2,8 @@ import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 from models import Organization, Building, Activity, Phone
+from search import FUZZY_CANDIDATE_BATCH_SIZE
+from text_search import bounded_edit_distance
 
 
 class TestOrganizationsAPI:
@@ -79,6 +81,130 @@ class TestOrganizationsAPI:
         assert any(org["name"] == "ООО 'Рога и Копыта'" for org in data["organizations"])
         assert any(org["name"] == "ИП 'Копыта и Рога'" for org in data["organizations"])
     
+    def test_search_organizations_full_text(self, client: TestClient, headers: dict, db_session: Session):
+        """Тест полнотекстового поиска: префиксы, регистр, ранжирование, пагинация и синхронизация индекса"""
+        building = Building(
+            name="Пушкина",
+            address="г. Москва, ул. Пушкина 10",
+            latitude=55.7558,
+            longitude=37.6176
+        )
+        db_session.add(building)
+        db_session.commit()
+        
+        org_address = Organization(name="ООО 'Ромашка'", address="ул. Молочная 5", building_id=building.id)
+        org_name = Organization(name="ИП 'Молочный двор'", building_id=building.id)
+        org_description = Organization(name="ООО 'Ферма'", description="Молоко и сыр", building_id=building.id)
+        org_other = Organization(name="ООО 'Автосервис'", building_id=building.id)
+        db_session.add_all([org_address, org_name, org_description, org_other])
+        db_session.commit()
+        
+        url = "/api/v1/organizations/search"
+        response = client.get(url, params={"name": "МОЛОЧ"}, headers=headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] == 2
+        # Совпадение в названии релевантнее совпадения в адресе
+        assert [org["name"] for org in data["organizations"]] == ["ИП 'Молочный двор'", "ООО 'Ромашка'"]
+        
+        # Все слова запроса должны найтись
+        response = client.get(url, params={"name": "молоко сыр"}, headers=headers)
+        assert [org["name"] for org in response.json()["organizations"]] == ["ООО 'Ферма'"]
+        
+        # Постраничная выдача по релевантности
+        response = client.get(url, params={"name": "мол", "limit": 2}, headers=headers)
+        first_page = response.json()
+        assert first_page["total"] == 3
+        assert len(first_page["organizations"]) == 2
+        response = client.get(url, params={"name": "мол", "limit": 2, "cursor": first_page["next_cursor"]}, headers=headers)
+        second_page = response.json()
+        assert len(second_page["organizations"]) == 1
+        assert second_page["next_cursor"] is None
+        names = [org["name"] for org in first_page["organizations"] + second_page["organizations"]]
+        assert sorted(names) == sorted(["ООО 'Ромашка'", "ИП 'Молочный двор'", "ООО 'Ферма'"])
+        
+        # Индекс обновляется вместе с таблицей
+        org_other.name = "ООО 'Молочный автосервис'"
+        db_session.commit()
+        response = client.get(url, params={"name": "автосервис"}, headers=headers)
+        assert [org["name"] for org in response.json()["organizations"]] == ["ООО 'Молочный автосервис'"]
+        db_session.delete(org_other)
+        db_session.commit()
+        response = client.get(url, params={"name": "автосервис"}, headers=headers)
+        assert response.json()["total"] == 0
+    
+    def test_search_organizations_fuzzy(self, client: TestClient, headers: dict, db_session: Session):
+        """Тест нечеткого поиска организаций с опечатками по индексу триграмм"""
+        building = Building(
+            name="Пушкина",
+            address="г. Москва, ул. Пушкина 10",
+            latitude=55.7558,
+            longitude=37.6176
+        )
+        db_session.add(building)
+        db_session.commit()
+        
+        org_exact = Organization(name="ООО 'Рога и Копыта'", building_id=building.id)
+        org_typo = Organization(name="ИП 'Роги'", building_id=building.id)
+        org_other = Organization(name="ООО 'Ромашка'", building_id=building.id)
+        db_session.add_all([org_exact, org_typo, org_other])
+        db_session.commit()
+        
+        url = "/api/v1/organizations/search"
+        response = client.get(url, params={"name": "Копта рага", "fuzzy": True}, headers=headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] == 1
+        assert data["organizations"][0]["name"] == "ООО 'Рога и Копыта'"
+        
+        # Меньше опечаток - выше в выдаче; постранично по (rank, id)
+        response = client.get(url, params={"name": "рога", "fuzzy": True, "limit": 1}, headers=headers)
+        first_page = response.json()
+        assert first_page["total"] == 2
+        assert [org["name"] for org in first_page["organizations"]] == ["ООО 'Рога и Копыта'"]
+        response = client.get(
+            url, params={"name": "рога", "fuzzy": True, "limit": 1, "cursor": first_page["next_cursor"]}, headers=headers
+        )
+        second_page = response.json()
+        assert [org["name"] for org in second_page["organizations"]] == ["ИП 'Роги'"]
+        assert second_page["next_cursor"] is None
+        
+        # Индекс триграмм обновляется при переименовании
+        org_other.name = "ООО 'Копытце'"
+        db_session.commit()
+        response = client.get(url, params={"name": "копытцэ", "fuzzy": True}, headers=headers)
+        assert [org["name"] for org in response.json()["organizations"]] == ["ООО 'Копытце'", "ООО 'Рога и Копыта'"]
+    
+    def test_search_organizations_fuzzy_beyond_candidate_batch(self, client: TestClient, headers: dict, db_session: Session):
+        """Тест точного total и обхода курсором всех совпадений, когда кандидатов больше одной пачки"""
+        building = Building(name="Пушкина", address="г. Москва, ул. Пушкина 10", latitude=55.7558, longitude=37.6176)
+        db_session.add(building)
+        db_session.commit()
+        count = FUZZY_CANDIDATE_BATCH_SIZE + 20
+        db_session.add_all([Organization(name=f"Ромашка {i}", building_id=building.id) for i in range(count)])
+        db_session.commit()
+        
+        url = "/api/v1/organizations/search"
+        params = {"name": "ромашко", "fuzzy": True, "limit": 100}
+        seen = []
+        while True:
+            data = client.get(url, params=params, headers=headers).json()
+            if not seen:
+                assert data["total"] == count
+            seen.extend(org["id"] for org in data["organizations"])
+            if data["next_cursor"] is None:
+                break
+            params["cursor"] = data["next_cursor"]
+        assert len(set(seen)) == count
+    
+    def test_bounded_edit_distance(self):
+        """Тест ограниченного расстояния Левенштейна"""
+        assert bounded_edit_distance("рога", "рога", 1) == 0
+        assert bounded_edit_distance("рага", "рога", 1) == 1
+        assert bounded_edit_distance("копта", "копыта", 1) == 1
+        assert bounded_edit_distance("рога", "копыта", 2) is None
+        assert bounded_edit_distance("ab", "abcd", 1) is None
+    
     def test_get_organizations_by_building(self, client: TestClient, headers: dict, db_session: Session):
         """Тест получения организаций по зданию"""
         # Создаем тестовые данные
@@ -112,6 +238,44 @@ class TestOrganizationsAPI:
         assert any(org["name"] == "ООО 'Рога и Копыта'" for org in data["organizations"])
         assert any(org["name"] == "ИП 'Копыта и Рога'" for org in data["organizations"])
     
+    def test_get_organizations_by_building_paginated(self, client: TestClient, headers: dict, db_session: Session):
+        """Тест keyset-пагинации организаций в здании и отключения подсчета"""
+        building = Building(
+            name="Ленина",
+            address="г. Москва, ул. Ленина 1",
+            latitude=55.7558,
+            longitude=37.6176
+        )
+        db_session.add(building)
+        db_session.commit()
+        db_session.add_all([
+            Organization(name=f"ООО 'Компания {i}'", building_id=building.id)
+            for i in range(5)
+        ])
+        db_session.commit()
+        
+        url = f"/api/v1/buildings/{building.id}/organizations"
+        names = []
+        cursor = None
+        while True:
+            params = {"limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            response = client.get(url, params=params, headers=headers)
+            assert response.status_code == 200
+            data = response.json()
+            assert data["total"] == 5
+            names.extend(org["name"] for org in data["organizations"])
+            cursor = data["next_cursor"]
+            if not cursor:
+                break
+        assert names == [f"ООО 'Компания {i}'" for i in range(5)]
+        
+        response = client.get(url, params={"limit": 2, "include_total": False}, headers=headers)
+        assert response.status_code == 200
+        assert response.json()["total"] is None
+        assert len(response.json()["organizations"]) == 2
+    
     def test_get_organizations_by_activity(self, client: TestClient, headers: dict, db_session: Session):
         """Тест получения организаций по деятельности"""
         # Создаем тестовые данные
@@ -178,4 +342,47 @@ class TestOrganizationsAPI:
         data = response.json()
         assert data["name"] == "ООО 'Новая компания'"
         assert len(data["phones"]) == 2
-        assert len(data["activities"]) == 1 
\ No newline at end of file
+        assert len(data["activities"]) == 1
+    
+    def test_organizations_list_query_count_is_constant(self, client: TestClient, headers: dict, db_session: Session, query_counter: list):
+        """Тест отсутствия N+1 запросов при сериализации списка организаций"""
+        building = Building(
+            name="Ленина",
+            address="г. Москва, ул. Ленина 1",
+            latitude=55.7558,
+            longitude=37.6176
+        )
+        food = Activity(name="Еда", level=1)
+        db_session.add_all([building, food])
+        db_session.commit()
+        meat = Activity(name="Мясная продукция", level=2, parent_id=food.id)
+        db_session.add(meat)
+        db_session.commit()
+        sausages = Activity(name="Колбасы", level=3, parent_id=meat.id)
+        db_session.add(sausages)
+        db_session.commit()
+        
+        def add_organizations(count: int, offset: int):
+            for i in range(offset, offset + count):
+                org = Organization(name=f"ООО 'Компания {i}'", building_id=building.id)
+                org.activities = [food, meat]
+                org.phones = [Phone(number=f"{i}-111"), Phone(number=f"{i}-222")]
+                db_session.add(org)
+            db_session.commit()
+        
+        def count_queries(expected_total: int) -> int:
+            query_counter.clear()
+            response = client.get(f"/api/v1/buildings/{building.id}/organizations", headers=headers)
+            assert response.status_code == 200
+            data = response.json()
+            assert data["total"] == expected_total
+            assert data["organizations"][0]["activities"][0]["children"][0]["children"][0]["name"] == "Колбасы"
+            return len(query_counter)
+        
+        add_organizations(2, 0)
+        small_count = count_queries(2)
+        add_organizations(30, 2)
+        large_count = count_queries(32)
+        
+        assert small_count == large_count
+
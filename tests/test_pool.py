@@ -0,0 +1,65 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.pool import StaticPool
+from config import settings
+from database import engine_options
+from pool_metrics import TimedAsyncAdaptedQueuePool, TimedQueuePool, pool_metrics
+
+
+class TestConnectionPool:
+    """Тесты настроек и метрик пула соединений"""
+    
+    def test_engine_options_by_backend(self, monkeypatch):
+        """Тест параметров пула по умолчанию для СУБД и переопределения настройками"""
+        assert engine_options("sqlite://")["poolclass"] is StaticPool
+        
+        sqlite_options = engine_options("sqlite:///./app.db")
+        assert sqlite_options["poolclass"] is TimedQueuePool
+        assert sqlite_options["connect_args"] == {"check_same_thread": False}
+        assert sqlite_options["pool_pre_ping"] is False
+        
+        postgres_options = engine_options("postgresql://user@localhost/app", is_async=True)
+        assert postgres_options["poolclass"] is TimedAsyncAdaptedQueuePool
+        assert (postgres_options["pool_size"], postgres_options["pool_pre_ping"]) == (10, True)
+        
+        monkeypatch.setattr(settings, "DB_POOL_SIZE", 3)
+        monkeypatch.setattr(settings, "DB_POOL_PRE_PING", False)
+        postgres_options = engine_options("postgresql://user@localhost/app")
+        assert (postgres_options["pool_size"], postgres_options["pool_pre_ping"]) == (3, False)
+    
+    def test_pool_metrics(self, tmp_path, monkeypatch):
+        """Тест времени получения соединения, таймаутов и заполненности пула"""
+        monkeypatch.setattr(settings, "DB_POOL_SIZE", 1)
+        monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 0)
+        monkeypatch.setattr(settings, "DB_POOL_TIMEOUT", 0.05)
+        database_url = f"sqlite:///{tmp_path / 'pool.db'}"
+        options = {**engine_options(database_url), "pool_logging_name": "pool_test"}
+        engine = create_engine(database_url, **options)
+        pool_metrics.register("pool_test", engine)
+        try:
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+                with pytest.raises(exc.TimeoutError):
+                    engine.connect()
+                metrics = pool_metrics.render()
+                assert 'db_pool_checked_out{pool="pool_test"} 1' in metrics
+                assert 'db_pool_saturation{pool="pool_test"} 1.0' in metrics
+            
+            metrics = pool_metrics.render()
+            assert 'db_pool_checkout_timeouts_total{pool="pool_test"} 1' in metrics
+            assert 'db_pool_checkout_wait_seconds_count{pool="pool_test"} 2' in metrics
+            assert 'db_pool_saturation{pool="pool_test"} 0.0' in metrics
+            
+            # Пересозданный пул сохраняет размер переполнения для расчета заполненности
+            engine.dispose()
+            assert engine.pool.max_overflow == 0
+        finally:
+            engine.dispose()
+            del pool_metrics.engines["pool_test"]
+    
+    def test_metrics_endpoint_includes_pools(self, client: TestClient):
+        """Тест: метрики пулов приложения выводятся в /metrics"""
+        response = client.get("/metrics")
+        assert 'db_pool_size{pool="async"}' in response.text
+        assert "# TYPE db_pool_checkout_wait_seconds histogram" in response.text
@@ -0,0 +1,38 @@
+import logging
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from config import settings
+from models import Building
+
+
+class TestQueryStats:
+    """Тесты учета SQL-запросов на запрос API"""
+    
+    def test_debug_headers(self, client: TestClient, headers: dict, db_session: Session, query_counter: list, monkeypatch):
+        """Тест заголовков с числом SQL-запросов и временем в БД в режиме DEBUG"""
+        db_session.add(Building(name="Ленина", address="ул. Ленина 1", latitude=55.75, longitude=37.61))
+        db_session.commit()
+        
+        response = client.get("/api/v1/buildings/", headers=headers)
+        assert "x-db-query-count" not in response.headers
+        
+        monkeypatch.setattr(settings, "DEBUG", True)
+        query_counter.clear()
+        response = client.get("/api/v1/buildings/", headers=headers)
+        assert int(response.headers["x-db-query-count"]) == len(query_counter) > 0
+        assert float(response.headers["x-db-time-ms"]) > 0
+    
+    def test_query_budget_warning(self, client: TestClient, headers: dict, db_session: Session, caplog, monkeypatch):
+        """Тест предупреждения о превышении бюджета SQL-запросов с указанием шаблона маршрута"""
+        db_session.add(Building(name="Ленина", address="ул. Ленина 1", latitude=55.75, longitude=37.61))
+        db_session.commit()
+        
+        with caplog.at_level(logging.WARNING, logger="instrumentation"):
+            client.get("/api/v1/buildings/1", headers=headers)
+        assert not caplog.records
+        
+        monkeypatch.setattr(settings, "QUERY_BUDGET", 0)
+        with caplog.at_level(logging.WARNING, logger="instrumentation"):
+            client.get("/api/v1/buildings/1", headers=headers)
+        assert len(caplog.records) == 1
+        assert "GET /api/v1/buildings/{building_id} executed" in caplog.records[0].getMessage()
@@ -0,0 +1,52 @@
+import asyncio
+import random
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from models import Activity, Organization
+from seed_data import generate_activity_tree, generate_buildings, generate_large_dataset
+from tests.conftest import TestingAsyncSessionLocal
+
+
+class TestSyntheticData:
+    """Тесты генератора синтетических данных"""
+    
+    def test_generation_is_deterministic(self):
+        """Тест: одинаковый seed дает одинаковые данные"""
+        def generate(seed: int):
+            rng = random.Random(seed)
+            return list(generate_buildings(rng, 50)), generate_activity_tree(rng)
+        
+        assert generate(7) == generate(7)
+        assert generate(7) != generate(8)
+        
+        buildings, levels = generate(7)
+        assert len(levels) == 3
+        assert all(parent is not None for level in levels[1:] for _, parent in level)
+    
+    def test_generate_large_dataset(self, client: TestClient, headers: dict, db_session: Session):
+        """Тест генерации набора данных и его доступности через API"""
+        async def generate():
+            async with TestingAsyncSessionLocal() as db:
+                return await generate_large_dataset(db, organizations=300, seed=1, batch_size=100)
+        
+        counts = asyncio.run(generate())
+        assert counts["organizations"] == 300
+        assert counts["buildings"] == 30
+        assert db_session.query(Organization).count() == 300
+        
+        # Организации связаны с вложенными деятельностями и находятся по корневой
+        roots = db_session.query(Activity).filter(Activity.parent_id.is_(None)).all()
+        total = 0
+        for root in roots:
+            response = client.get(
+                f"/api/v1/activities/{root.id}/organizations/hierarchy",
+                params={"level": 3, "include_total": True},
+                headers=headers
+            )
+            total += response.json()["total"]
+        assert total >= 300
+        
+        organization = db_session.query(Organization).first()
+        search_data = {"latitude": organization.latitude, "longitude": organization.longitude, "radius_km": 0.1}
+        response = client.post("/api/v1/organizations/geo/radius", json=search_data, headers=headers)
+        assert organization.id in [item["id"] for item in response.json()["organizations"]]
@@ -0,0 +1,47 @@
+import json
+import logging
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from config import settings
+from models import Building
+from slow_queries import REDACTED, redact_parameters, slow_query_log
+
+
+class TestSlowQueries:
+    """Тесты журнала медленных SQL-запросов"""
+    
+    def test_redact_parameters(self):
+        """Тест: строковые параметры скрываются, числовые сохраняются"""
+        assert redact_parameters((1, "Иванов", 2.5, None)) == [1, REDACTED, 2.5, None]
+        assert redact_parameters({"name": "Иванов", "id": 3}) == {"name": REDACTED, "id": 3}
+    
+    def test_slow_queries_endpoint(self, client: TestClient, headers: dict, db_session: Session, caplog, monkeypatch):
+        """Тест журнала с планами выполнения и списка запросов по суммарному времени"""
+        db_session.add(Building(name="Ленина", address="ул. Ленина 1", latitude=55.75, longitude=37.61))
+        db_session.commit()
+        slow_query_log.clear()
+        
+        # Порог 0 - медленным считается любой запрос
+        monkeypatch.setattr(settings, "SLOW_QUERY_THRESHOLD_MS", 0)
+        with caplog.at_level(logging.WARNING, logger="slow_queries"):
+            client.get("/api/v1/organizations/search", params={"name": "ленина"}, headers=headers)
+            client.get("/api/v1/organizations/search", params={"name": "ленина"}, headers=headers)
+        monkeypatch.setattr(settings, "SLOW_QUERY_THRESHOLD_MS", 200)
+        
+        records = [json.loads(record.getMessage()) for record in caplog.records]
+        assert records
+        assert all(record["duration_ms"] >= 0 for record in records)
+        assert any(record["plan"] and "organization_search" in record["plan"] for record in records)
+        # Текст поискового запроса в журнал не попадает
+        assert "ленина" not in caplog.text
+        assert any(REDACTED in record["parameters"] for record in records)
+        
+        response = client.get("/admin/slow-queries", params={"limit": 2}, headers=headers)
+        assert response.status_code == 200
+        queries = response.json()["queries"]
+        assert len(queries) == 2
+        assert queries[0]["total_ms"] >= queries[1]["total_ms"]
+        assert all(query["count"] == 2 for query in queries)
+        
+        response = client.get("/admin/slow-queries")
+        assert response.status_code == 401
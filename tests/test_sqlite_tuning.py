@@ -0,0 +1,50 @@
+import asyncio
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from config import settings
+from database import engine_options, get_async_database_url, tune_sqlite_engine
+
+
+class TestSQLiteTuning:
+    """Тесты рабочего режима SQLite"""
+    
+    def test_pragmas_applied_on_connect(self, tmp_path, monkeypatch):
+        """Тест PRAGMA рабочего режима на соединениях синхронного и асинхронного движков"""
+        monkeypatch.setattr(settings, "SQLITE_TUNING_ENABLED", True)
+        monkeypatch.setattr(settings, "SQLITE_BUSY_TIMEOUT_MS", 1234)
+        database_url = f"sqlite:///{tmp_path / 'tuned.db'}"
+        
+        engine = create_engine(database_url, **engine_options(database_url))
+        tune_sqlite_engine(engine)
+        with engine.connect() as connection:
+            assert connection.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+            assert connection.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL
+            assert connection.exec_driver_sql("PRAGMA temp_store").scalar() == 2  # MEMORY
+            assert connection.exec_driver_sql("PRAGMA busy_timeout").scalar() == 1234
+            assert connection.exec_driver_sql("PRAGMA cache_size").scalar() == settings.SQLITE_CACHE_SIZE
+        engine.dispose()
+        
+        async def async_pragmas():
+            async_engine = create_async_engine(
+                get_async_database_url(database_url), **engine_options(database_url, is_async=True)
+            )
+            tune_sqlite_engine(async_engine.sync_engine)
+            try:
+                async with async_engine.connect() as connection:
+                    return (
+                        (await connection.exec_driver_sql("PRAGMA synchronous")).scalar(),
+                        (await connection.exec_driver_sql("PRAGMA busy_timeout")).scalar(),
+                    )
+            finally:
+                await async_engine.dispose()
+        
+        assert asyncio.run(async_pragmas()) == (1, 1234)
+    
+    def test_tuning_disabled_by_default(self, tmp_path):
+        """Тест: без SQLITE_TUNING_ENABLED используется стандартный журнал"""
+        database_url = f"sqlite:///{tmp_path / 'default.db'}"
+        engine = create_engine(database_url, **engine_options(database_url))
+        tune_sqlite_engine(engine)
+        with engine.connect() as connection:
+            assert connection.exec_driver_sql("PRAGMA journal_mode").scalar() == "delete"
+        engine.dispose()
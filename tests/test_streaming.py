@@ -0,0 +1,140 @@
+import asyncio
+import json
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from models import Organization, Building, Activity, Phone
+from schemas import Building as BuildingSchema
+from streaming import stream_by_ids
+from tests.conftest import TestingAsyncSessionLocal
+
+
+NDJSON_HEADERS = {"Accept": "application/x-ndjson"}
+
+
+def parse_ndjson(response) -> list:
+    """Разбирает тело NDJSON-ответа"""
+    assert response.headers["content-type"] == "application/x-ndjson"
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+class TestStreamingAPI:
+    """Тесты для потоковой выдачи NDJSON"""
+    
+    def create_data(self, db_session: Session, count: int = 3):
+        """Создает здание, деятельность и организации"""
+        building = Building(
+            name="Ленина",
+            address="г. Москва, ул. Ленина 1",
+            latitude=55.7558,
+            longitude=37.6176
+        )
+        food = Activity(name="Еда", level=1)
+        db_session.add_all([building, food])
+        db_session.commit()
+        for i in range(count):
+            org = Organization(
+                name=f"ООО 'Компания {i}'",
+                building_id=building.id,
+                latitude=55.7558,
+                longitude=37.6176
+            )
+            org.activities = [food]
+            org.phones = [Phone(number=f"{i}-111")]
+            db_session.add(org)
+        db_session.commit()
+        return building, food
+    
+    def test_stream_buildings(self, client: TestClient, headers: dict, db_session: Session):
+        """Тест потоковой выдачи зданий без пагинации"""
+        for i in range(3):
+            db_session.add(Building(name=f"Здание {i}", address="ул. Ленина", latitude=55.75, longitude=37.61))
+        db_session.commit()
+        
+        response = client.get("/api/v1/buildings/", params={"limit": 1}, headers={**headers, **NDJSON_HEADERS})
+        assert response.status_code == 200
+        assert [building["name"] for building in parse_ndjson(response)] == ["Здание 0", "Здание 1", "Здание 2"]
+    
+    def test_stream_organizations(self, client: TestClient, headers: dict, db_session: Session):
+        """Тест потоковой выдачи организаций со связанными данными"""
+        building, food = self.create_data(db_session)
+        
+        response = client.get(f"/api/v1/buildings/{building.id}/organizations", headers={**headers, **NDJSON_HEADERS})
+        assert response.status_code == 200
+        organizations = parse_ndjson(response)
+        assert [org["name"] for org in organizations] == [f"ООО 'Компания {i}'" for i in range(3)]
+        assert organizations[0]["building"]["name"] == "Ленина"
+        assert organizations[0]["activities"][0]["name"] == "Еда"
+        assert organizations[0]["phones"][0]["number"] == "0-111"
+        
+        for url in (f"/api/v1/activities/{food.id}/organizations", f"/api/v1/activities/{food.id}/organizations/hierarchy?level=1"):
+            response = client.get(url, headers={**headers, **NDJSON_HEADERS})
+            assert response.status_code == 200
+            assert len(parse_ndjson(response)) == 3
+        
+        search_data = {"latitude": 55.7558, "longitude": 37.6176, "radius_km": 1.0}
+        response = client.post("/api/v1/organizations/geo/radius", json=search_data, headers={**headers, **NDJSON_HEADERS})
+        assert len(parse_ndjson(response)) == 3
+        
+        response = client.get("/api/v1/organizations/search", params={"name": "компания"}, headers={**headers, **NDJSON_HEADERS})
+        assert len(parse_ndjson(response)) == 3
+        
+        # Без заголовка Accept ответ остается постраничным JSON
+        response = client.get(f"/api/v1/buildings/{building.id}/organizations", params={"limit": 2}, headers=headers)
+        assert response.headers["content-type"] == "application/json"
+        assert len(response.json()["organizations"]) == 2
+    
+    def test_stream_activities(self, client: TestClient, headers: dict, db_session: Session):
+        """Тест потоковой выдачи дерева и плоского списка деятельностей"""
+        food = Activity(name="Еда", level=1)
+        db_session.add(food)
+        db_session.commit()
+        db_session.add(Activity(name="Мясная продукция", level=2, parent_id=food.id))
+        db_session.commit()
+        
+        response = client.get("/api/v1/activities/", headers={**headers, **NDJSON_HEADERS})
+        tree = parse_ndjson(response)
+        assert [activity["name"] for activity in tree] == ["Еда"]
+        assert tree[0]["children"][0]["name"] == "Мясная продукция"
+        
+        response = client.get("/api/v1/activities/", params={"flat": True}, headers={**headers, **NDJSON_HEADERS})
+        assert [activity["name"] for activity in parse_ndjson(response)] == ["Еда", "Мясная продукция"]
+    
+    def test_stream_activities_in_partitions(self, client: TestClient, headers: dict, db_session: Session, monkeypatch):
+        """Тест потоковой выдачи деятельностей несколькими пачками курсора"""
+        monkeypatch.setattr("streaming.STREAM_BATCH_SIZE", 2)
+        roots = [Activity(name=f"Корень {index}", level=1) for index in range(5)]
+        db_session.add_all(roots)
+        db_session.commit()
+        db_session.add_all([Activity(name=f"Дочерняя {root.id}", level=2, parent_id=root.id) for root in roots])
+        db_session.commit()
+        
+        response = client.get("/api/v1/activities/", headers={**headers, **NDJSON_HEADERS})
+        tree = parse_ndjson(response)
+        assert [activity["name"] for activity in tree] == [root.name for root in roots]
+        assert [activity["children"][0]["name"] for activity in tree] == [f"Дочерняя {root.id}" for root in roots]
+        
+        response = client.get("/api/v1/activities/", params={"flat": True}, headers={**headers, **NDJSON_HEADERS})
+        assert len(parse_ndjson(response)) == 10
+    
+    def test_stream_by_ids_skips_deleted_rows(self, db_session: Session):
+        """Тест пропуска записей, удаленных после отбора ID, без обрыва потока"""
+        building, _ = self.create_data(db_session, count=0)
+        
+        async def load(session, ids):
+            result = await session.execute(select(Building).where(Building.id.in_(ids)))
+            return result.scalars().all()
+        
+        async def collect():
+            async with TestingAsyncSessionLocal() as db:
+                return [line async for line in stream_by_ids(db, [building.id, 999], load, BuildingSchema)]
+        
+        lines = asyncio.run(collect())
+        assert [json.loads(line)["id"] for line in lines] == [building.id]
+    
+    def test_etag_depends_on_representation(self, client: TestClient, headers: dict, db_session: Session):
+        """Тест различия ETag для JSON и NDJSON"""
+        json_etag = client.get("/api/v1/buildings/", headers=headers).headers["etag"]
+        response = client.get("/api/v1/buildings/", headers={**headers, **NDJSON_HEADERS, "If-None-Match": json_etag})
+        assert response.status_code == 200
@@ -0,0 +1,139 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from config import settings
+from models import Organization, Building, Activity
+from suggest_index import SuggestIndex
+from text_search import normalize_name
+
+
+class TestSuggestAPI:
+    """Тесты для подсказок при вводе"""
+    
+    def create_data(self, db_session: Session):
+        """Создает здание, организации и деятельность"""
+        building = Building(
+            name="Ленина",
+            address="г. Москва, ул. Ленина 1",
+            latitude=55.7558,
+            longitude=37.6176
+        )
+        food = Activity(name="Ёлочные игрушки", level=1)
+        db_session.add_all([building, food])
+        db_session.commit()
+        db_session.add_all([
+            Organization(name="ООО 'Рога и Копыта'", building_id=building.id),
+            Organization(name="ИП 'Копыта и Рога'", building_id=building.id),
+            Organization(name="ООО 'Ромашка'", building_id=building.id),
+        ])
+        db_session.commit()
+        return building, food
+    
+    def test_normalize_name(self):
+        """Тест нормализации названий"""
+        assert normalize_name("ООО 'Рога и Копыта'") == "ооо рога и копыта"
+        assert normalize_name("  Ёлка-2 ") == "елка 2"
+    
+    def test_suggest_index(self):
+        """Тест поиска, добавления и удаления в префиксном индексе"""
+        index = SuggestIndex()
+        index.build([
+            ("organization", 1, "ООО 'Рога и Копыта'"),
+            ("organization", 2, "ООО 'Ромашка'"),
+            ("activity", 1, "Молочная продукция"),
+        ])
+        
+        assert [item_id for _, item_id, _ in index.suggest("ро", 10)] == [1, 2]
+        assert index.suggest("КОП", 10) == [("organization", 1, "ООО 'Рога и Копыта'")]
+        assert index.suggest("ооо", 1) == [("organization", 1, "ООО 'Рога и Копыта'")]
+        assert index.suggest("!!!", 10) == []
+        
+        index.add("organization", 3, "Молоко")
+        assert [item_id for _, item_id, _ in index.suggest("мол", 10)] == [3, 1]
+        
+        index.remove("organization", 1)
+        assert [item_id for _, item_id, _ in index.suggest("ро", 10)] == [2]
+        assert len(index) == 3
+    
+    def test_suggest_without_index(self, client: TestClient, headers: dict, db_session: Session):
+        """Тест подсказок через БД, когда индекс в памяти выключен"""
+        self.create_data(db_session)
+        
+        response = client.get("/api/v1/organizations/suggest", params={"q": "Рога"}, headers=headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] == 2
+        assert {suggestion["type"] for suggestion in data["suggestions"]} == {"organization"}
+    
+    def test_suggest_without_index_matches_memory_index(self, client: TestClient, headers: dict, db_session: Session, monkeypatch):
+        """Тест совпадения подсказок через БД с подсказками индекса: начало слов, нормализация, спецсимволы LIKE"""
+        building, food = self.create_data(db_session)
+        db_session.add(Organization(name="100% Натурально", building_id=building.id))
+        db_session.commit()
+        
+        index = SuggestIndex()
+        index.build(
+            [("organization", org.id, org.name) for org in db_session.query(Organization).all()]
+            + [("activity", food.id, food.name)]
+        )
+        
+        for q in ["рога", "РОГ", "ёлоч", "елочные игр", "копыта и", "ога", "%", "_", "100%", "'", "н"]:
+            response = client.get("/api/v1/organizations/suggest", params={"q": q, "limit": 10}, headers=headers)
+            assert response.status_code == 200
+            suggestions = [(item["type"], item["id"]) for item in response.json()["suggestions"]]
+            assert suggestions == [(kind, item_id) for kind, item_id, _ in index.suggest(q, 10)], q
+        
+        # Ключи читаются диапазоном по первичному ключу, без просмотра таблицы
+        plan = db_session.execute(text(
+            "EXPLAIN QUERY PLAN SELECT kind, item_id FROM suggest_keys "
+            "WHERE key >= 'ро' AND key < 'рп' ORDER BY key, kind, item_id"
+        )).all()
+        assert all(row[-1].startswith("SEARCH") for row in plan), plan
+        
+        # Ключи обновляются при переименовании и удалении
+        organization = db_session.query(Organization).filter(Organization.name == "ООО 'Ромашка'").one()
+        organization.name = "ООО 'Василек'"
+        db_session.commit()
+        response = client.get("/api/v1/organizations/suggest", params={"q": "васил"}, headers=headers)
+        assert [item["id"] for item in response.json()["suggestions"]] == [organization.id]
+        db_session.delete(organization)
+        db_session.commit()
+        response = client.get("/api/v1/organizations/suggest", params={"q": "васил"}, headers=headers)
+        assert response.json()["total"] == 0
+    
+    def test_suggest_with_memory_index(self, client: TestClient, headers: dict, db_session: Session, monkeypatch):
+        """Тест подсказок через индекс в памяти и его обновления при создании"""
+        building, food = self.create_data(db_session)
+        
+        index = SuggestIndex()
+        index.build(
+            [("organization", org.id, org.name) for org in db_session.query(Organization).all()]
+            + [("activity", food.id, food.name)]
+        )
+        monkeypatch.setattr("routers.organizations.suggest_index", index)
+        monkeypatch.setattr("routers.activities.suggest_index", index)
+        monkeypatch.setattr(settings, "SUGGEST_INDEX_ENABLED", True)
+        
+        response = client.get("/api/v1/organizations/suggest", params={"q": "елоч"}, headers=headers)
+        assert response.status_code == 200
+        assert response.json()["suggestions"] == [{"id": food.id, "name": "Ёлочные игрушки", "type": "activity"}]
+        
+        # Новые организации и деятельности попадают в индекс при создании
+        org_data = {
+            "name": "ООО 'Рогатка'",
+            "building_id": building.id,
+            "phones": [],
+            "activity_ids": []
+        }
+        response = client.post("/api/v1/organizations", json=org_data, headers=headers)
+        assert response.status_code == 201
+        response = client.post("/api/v1/activities", json={"name": "Рогалики"}, headers=headers)
+        assert response.status_code == 201
+        
+        response = client.get("/api/v1/organizations/suggest", params={"q": "рога", "limit": 10}, headers=headers)
+        names = [suggestion["name"] for suggestion in response.json()["suggestions"]]
+        assert sorted(names) == sorted(["ООО 'Рога и Копыта'", "ИП 'Копыта и Рога'", "ООО 'Рогатка'", "Рогалики"])
+        
+        response = client.get("/api/v1/organizations/suggest", params={"q": "рога", "limit": 2}, headers=headers)
+        assert response.json()["total"] == 2
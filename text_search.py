@@ -0,0 +1,106 @@
+import re
+from typing import List, Optional, Set
+
+
+# Символы, не являющиеся буквами или цифрами, при нормализации заменяются пробелами
+NON_WORD_PATTERN = re.compile(r"[\W_]+")
+
+# Максимальное число опечаток в слове нечеткого поиска
+FUZZY_MAX_EDIT_DISTANCE = 2
+
+
+def normalize_name(name: str) -> str:
+    """Приводит название к виду для поиска: нижний регистр, ё -> е, только слова"""
+    return NON_WORD_PATTERN.sub(" ", name.lower().replace("ё", "е")).strip()
+
+
+def name_keys(name: str) -> List[str]:
+    """
+    Ключи подсказок для названия: нормализованное название, начиная с каждого слова,
+    чтобы префикс находил название не только с начала ("рога" -> "ООО 'Рога и Копыта'")
+    """
+    words = normalize_name(name).split()
+    return [" ".join(words[position:]) for position in range(len(words))]
+
+
+def prefix_upper_bound(prefix: str) -> str:
+    """Наименьшая строка больше всех строк с префиксом (при побайтовом сравнении)"""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def word_trigrams(word: str) -> Set[str]:
+    """Триграммы слова с дополнением пробелами по краям (как в pg_trgm)"""
+    padded = f"  {word} "
+    return {padded[position:position + 3] for position in range(len(padded) - 2)}
+
+
+def name_trigrams(name: str) -> Set[str]:
+    """Триграммы всех слов нормализованного названия"""
+    trigrams = set()
+    for word in normalize_name(name).split():
+        trigrams |= word_trigrams(word)
+    return trigrams
+
+
+def allowed_edit_distance(word: str) -> int:
+    """Допустимое число опечаток в слове: короткие слова должны совпадать точно"""
+    if len(word) <= 3:
+        return 0
+    if len(word) <= 6:
+        return 1
+    return FUZZY_MAX_EDIT_DISTANCE
+
+
+def bounded_edit_distance(source: str, target: str, max_distance: int) -> Optional[int]:
+    """
+    Расстояние Левенштейна между строками, если оно не превышает max_distance,
+    иначе None; вычисление прерывается, как только порог гарантированно превышен
+    """
+    if abs(len(source) - len(target)) > max_distance:
+        return None
+
+    previous = list(range(len(target) + 1))
+    for row, source_char in enumerate(source, 1):
+        current = [row]
+        for column, target_char in enumerate(target, 1):
+            current.append(min(
+                previous[column] + 1,
+                current[column - 1] + 1,
+                previous[column - 1] + (source_char != target_char)
+            ))
+        if min(current) > max_distance:
+            return None
+        previous = current
+
+    return previous[-1] if previous[-1] <= max_distance else None
+
+
+def fuzzy_match_distance(query_words: List[str], name: str) -> Optional[int]:
+    """
+    Суммарное число опечаток, при котором каждое слово запроса совпадает
+    с каким-либо словом названия; None, если название не подходит
+    """
+    name_words = normalize_name(name).split()
+    total = 0
+    for query_word in query_words:
+        max_distance = allowed_edit_distance(query_word)
+        distances = [
+            distance
+            for distance in (bounded_edit_distance(query_word, word, max_distance) for word in name_words)
+            if distance is not None
+        ]
+        if not distances:
+            return None
+        total += min(distances)
+    return total
+
+
+def min_shared_trigrams(query_words: List[str]) -> int:
+    """
+    Нижняя граница числа общих триграмм запроса и подходящего названия:
+    каждая опечатка затрагивает не более трех триграмм слова
+    """
+    trigrams = set()
+    for word in query_words:
+        trigrams |= word_trigrams(word)
+    return max(1, len(trigrams) - 3 * sum(allowed_edit_distance(word) for word in query_words))
@@ -1,7 +1,22 @@
 import math
-from typing import List
-from sqlalchemy.orm import Session
-from models import Organization, Building, Activity
+from collections import defaultdict
+from typing import Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import Organization, Building, Activity, activity_closure, organization_activity
+from loaders import organization_load_options
+from geo import (
+    MAX_SEARCH_RADIUS_KM,
+    NEAREST_START_RADIUS_KM,
+    grid_cell_filter,
+    grid_cell_ranges,
+    radius_bounding_box
+)
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPy необязателен
+    np = None
 
 
 def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
@@ -29,39 +44,268 @@ def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
     return R * c
 
 
-def get_organizations_by_activity_hierarchy(db: Session, activity_id: int) -> List[Organization]:
+def calculate_distances(
+    lat: float,
+    lon: float,
+    latitudes: Sequence[float],
+    longitudes: Sequence[float]
+):
     """
-    Получает все организации, связанные с деятельностью и её дочерними деятельностями
+    Вычисляет расстояния в километрах от точки до набора точек одним
+    векторизованным вызовом (NumPy); без NumPy возвращает список,
+    посчитанный через calculate_distance
     """
-    # Получаем деятельность и все её дочерние деятельности
-    activity = db.query(Activity).filter(Activity.id == activity_id).first()
-    if not activity:
-        return []
+    if np is None:
+        return [
+            calculate_distance(lat, lon, point_lat, point_lon)
+            for point_lat, point_lon in zip(latitudes, longitudes)
+        ]
     
-    # Получаем все дочерние деятельности (рекурсивно)
-    child_activity_ids = get_child_activity_ids(db, activity_id)
-    all_activity_ids = [activity_id] + child_activity_ids
+    # Радиус Земли в километрах
+    R = 6371.0
     
-    # Получаем организации, связанные с этими деятельностями
-    organizations = db.query(Organization).join(
-        Organization.activities
-    ).filter(Activity.id.in_(all_activity_ids)).distinct().all()
+    lat_rad = math.radians(lat)
+    lon_rad = math.radians(lon)
+    latitudes_rad = np.radians(np.asarray(latitudes, dtype=np.float64))
+    longitudes_rad = np.radians(np.asarray(longitudes, dtype=np.float64))
     
-    return organizations
+    # Формула гаверсинуса
+    a = (
+        np.sin((latitudes_rad - lat_rad) / 2) ** 2
+        + math.cos(lat_rad) * np.cos(latitudes_rad) * np.sin((longitudes_rad - lon_rad) / 2) ** 2
+    )
+    return 2 * R * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def within_radius_mask(
+    lat: float,
+    lon: float,
+    latitudes: Sequence[float],
+    longitudes: Sequence[float],
+    radius_km: float
+):
+    """
+    Маска точек, находящихся не дальше radius_km от заданной точки
+    """
+    distances = calculate_distances(lat, lon, latitudes, longitudes)
+    if np is None:
+        return [distance <= radius_km for distance in distances]
+    return distances <= radius_km
 
 
-def get_child_activity_ids(db: Session, parent_id: int, max_level: int = 3) -> List[int]:
+def sort_by_distance(
+    lat: float,
+    lon: float,
+    points: Iterable[Tuple[int, float, float]],
+    radius_km: float
+) -> List[Tuple[int, float]]:
     """
-    Рекурсивно получает ID всех дочерних деятельностей до указанного уровня
+    Отбирает точки (id, широта, долгота) не дальше radius_km и возвращает
+    пары (id, расстояние), отсортированные по расстоянию
     """
-    if max_level <= 0:
+    points = list(points)
+    if not points:
         return []
     
-    children = db.query(Activity).filter(Activity.parent_id == parent_id).all()
-    child_ids = [child.id for child in children]
+    point_ids, latitudes, longitudes = zip(*points)
+    distances = calculate_distances(lat, lon, latitudes, longitudes)
+    return sorted(
+        (
+            (point_id, float(distance))
+            for point_id, distance in zip(point_ids, distances)
+            if distance <= radius_km
+        ),
+        key=lambda item: (item[1], item[0])
+    )
+
+
+async def get_organization_by_id(db: AsyncSession, organization_id: int) -> Optional[Organization]:
+    """
+    Получает организацию со всеми связями, необходимыми для сериализации
+    """
+    result = await db.execute(
+        select(Organization)
+        .options(*organization_load_options())
+        .filter(Organization.id == organization_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
+
+async def get_organizations_by_ids(db: AsyncSession, organization_ids: List[int]) -> List[Organization]:
+    """
+    Получает организации по списку ID одним запросом (в порядке возрастания ID)
+    """
+    if not organization_ids:
+        return []
     
-    # Рекурсивно получаем дочерние элементы дочерних элементов
-    for child_id in child_ids:
-        child_ids.extend(get_child_activity_ids(db, child_id, max_level - 1))
+    result = await db.execute(
+        select(Organization)
+        .options(*organization_load_options())
+        .filter(Organization.id.in_(organization_ids))
+        .order_by(Organization.id)
+    )
+    return list(result.scalars().all())
+
+
+async def get_nearest_organization_ids(
+    db: AsyncSession,
+    lat: float,
+    lon: float,
+    k: int,
+    activity_id: Optional[int] = None
+) -> List[Tuple[int, float]]:
+    """
+    Ищет k ближайших организаций расширяющимся кругом: радиус удваивается,
+    пока в круг не попадет k организаций или он не покроет всю Землю.
+    Возвращает пары (id, расстояние в км), отсортированные по расстоянию
+    """
+    radius_km = NEAREST_START_RADIUS_KM
+    while True:
+        min_lat, max_lat, longitude_ranges = radius_bounding_box(lat, lon, radius_km)
+        query = select(Organization.id, Organization.latitude, Organization.longitude).filter(
+            grid_cell_filter(Organization.geo_cell, grid_cell_ranges(min_lat, max_lat, longitude_ranges))
+        )
+        if activity_id is not None:
+            query = query.join(
+                organization_activity, organization_activity.c.organization_id == Organization.id
+            ).filter(organization_activity.c.activity_id == activity_id)
+        
+        result = await db.execute(query)
+        nearest = sort_by_distance(lat, lon, result.all(), radius_km)
+        if len(nearest) >= k or radius_km >= MAX_SEARCH_RADIUS_KM:
+            return nearest[:k]
+        radius_km *= 2
+
+
+def activity_rows_query():
+    """Запрос деятельностей плоскими строками (без загрузки ORM-объектов)"""
+    return select(
+        Activity.id,
+        Activity.name,
+        Activity.description,
+        Activity.parent_id,
+        Activity.level
+    )
+
+
+async def get_activity_rows(
+    db: AsyncSession,
+    activity_ids: Optional[List[int]] = None,
+    depth: Optional[int] = None
+) -> list:
+    """
+    Получает деятельности плоским списком одним запросом: всю таблицу либо
+    поддеревья activity_ids до глубины depth (через таблицу замыкания)
+    """
+    query = activity_rows_query().order_by(Activity.id)
+    if activity_ids is not None:
+        query = query.join(
+            activity_closure, activity_closure.c.descendant_id == Activity.id
+        ).filter(activity_closure.c.ancestor_id.in_(activity_ids))
+        if depth is not None:
+            query = query.filter(activity_closure.c.depth <= depth)
+    
+    result = await db.execute(query)
+    return list(result.all())
+
+
+def build_activity_tree(rows: list, root_ids: Iterable[int], depth: int) -> List[dict]:
+    """
+    Собирает дерево деятельностей в памяти из плоского списка строк.
+    Дочерние деятельности вкладываются на depth уровней ниже корней
+    """
+    rows_by_id = {row.id: row for row in rows}
+    children_by_parent = defaultdict(list)
+    for row in rows:
+        children_by_parent[row.parent_id].append(row.id)
+    
+    def build(activity_id: int, remaining_depth: int) -> dict:
+        row = rows_by_id[activity_id]
+        return {
+            "id": row.id,
+            "name": row.name,
+            "description": row.description,
+            "parent_id": row.parent_id,
+            "level": row.level,
+            "children": [
+                build(child_id, remaining_depth - 1)
+                for child_id in children_by_parent[activity_id]
+            ] if remaining_depth > 0 else []
+        }
+    
+    return [build(activity_id, depth) for activity_id in root_ids if activity_id in rows_by_id]
+
+
+def activity_hierarchy_organization_ids(activity_id: int, max_depth: int):
+    """
+    Подзапрос ID организаций (без повторов), у которых есть деятельность из
+    поддерева activity_id, включая саму деятельность, до глубины max_depth
+    """
+    return (
+        select(organization_activity.c.organization_id)
+        .join(activity_closure, activity_closure.c.descendant_id == organization_activity.c.activity_id)
+        .filter(
+            activity_closure.c.ancestor_id == activity_id,
+            activity_closure.c.depth <= max_depth
+        )
+        .distinct()
+    )
+
+
+def organizations_by_activity_hierarchy_query(activity_id: int, level: int = 3):
+    """Запрос организаций по иерархии деятельностей в порядке возрастания ID"""
+    return (
+        select(Organization)
+        .options(*organization_load_options())
+        .filter(Organization.id.in_(activity_hierarchy_organization_ids(activity_id, level)))
+        .order_by(Organization.id)
+    )
+
+
+async def get_organizations_by_activity_hierarchy(
+    db: AsyncSession,
+    activity_id: int,
+    level: int = 3,
+    limit: Optional[int] = None,
+    after_id: Optional[int] = None
+) -> List[Organization]:
+    """
+    Получает организации, связанные с деятельностью и её дочерними деятельностями
+    до уровня level, одним запросом; каждая организация возвращается один раз,
+    в порядке возрастания ID (после after_id, не более limit)
+    """
+    query = organizations_by_activity_hierarchy_query(activity_id, level)
+    if after_id is not None:
+        query = query.filter(Organization.id > after_id)
+    if limit is not None:
+        query = query.limit(limit)
     
-    return child_ids 
\ No newline at end of file
+    result = await db.execute(query)
+    return list(result.scalars().all())
+
+
+async def count_organizations_by_activity_hierarchy(db: AsyncSession, activity_id: int, level: int = 3) -> int:
+    """
+    Подсчитывает организации по иерархии деятельностей без загрузки строк
+    """
+    result = await db.execute(
+        select(func.count()).select_from(activity_hierarchy_organization_ids(activity_id, level).subquery())
+    )
+    return result.scalar_one()
+
+
+async def get_child_activity_ids(db: AsyncSession, parent_id: int, max_level: int = 3) -> List[int]:
+    """
+    Получает ID всех дочерних деятельностей до указанного уровня
+    одним запросом к таблице замыкания
+    """
+    result = await db.execute(
+        select(activity_closure.c.descendant_id)
+        .filter(
+            activity_closure.c.ancestor_id == parent_id,
+            activity_closure.c.depth.between(1, max_level)
+        )
+        .order_by(activity_closure.c.depth, activity_closure.c.descendant_id)
+    )
+    return list(result.scalars().all())